@@ -0,0 +1,233 @@
+"""
+Admission control for the Feed Products API
+Splits requests into an LLM-bound lane and a direct-DB lane, each with its own
+concurrency and bounded queue, applies per-client token-bucket rate limits,
+and rejects overload immediately with 429 and Retry-After
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import (
+    ADMISSION_DIRECT_CONCURRENCY, ADMISSION_DIRECT_QUEUE, ADMISSION_LLM_CONCURRENCY,
+    ADMISSION_LLM_QUEUE, ADMISSION_QUEUE_TIMEOUT_S, RATE_LIMIT_DIRECT_BURST,
+    RATE_LIMIT_DIRECT_PER_SECOND, RATE_LIMIT_LLM_BURST, RATE_LIMIT_LLM_PER_MINUTE
+)
+from metrics import ADMISSION, ADMISSION_WAIT
+
+# Paths whose handlers wait on Gemini (planning a natural language query)
+LLM_PATHS = ("/query", "/export/query")
+
+# Paths never queued or limited: probes, metrics, docs and long-lived streams
+EXEMPT_PATHS = ("/health", "/metrics", "/subscribe", "/docs", "/redoc", "/openapi.json")
+
+# Lanes whose handlers take a slot themselves, once per distinct computation,
+# so requests coalesced onto a query already in flight never queue for one
+HANDLER_ADMITTED_LANES = ("llm",)
+
+# Rate limiter state is kept for at most this many clients (least recently seen dropped)
+MAX_CLIENTS = 10000
+
+
+class Rejected(Exception):
+    """Request refused by admission control; retry after the given seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; each request takes one"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """0 if a token was taken, else seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-client token buckets for one lane (rate <= 0 disables)"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = MAX_CLIENTS):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_clients = max_clients
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def check(self, client: str) -> float:
+        """0 if the client may proceed, else seconds to wait"""
+        if self.rate <= 0:
+            return 0.0
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = TokenBucket(self.rate, self.burst)
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+        return bucket.take(time.monotonic())
+
+
+class Lane:
+    """
+    A bounded pool of request slots with a bounded wait queue.
+
+    At most `concurrency` requests run at once and at most `queue_size`
+    wait; anything beyond is rejected at once rather than queued behind
+    work it cannot overtake. Retry-After is estimated from the queue depth
+    and a moving average of how long a slot is held.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int,
+                 queue_timeout_s: float = ADMISSION_QUEUE_TIMEOUT_S):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout_s = queue_timeout_s
+        self.active = 0
+        self.waiting = 0
+        self.service_s = 0.1
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def retry_after(self) -> float:
+        return max(1.0, (self.waiting + 1) / self.concurrency * self.service_s)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._slots is None:
+            # Created lazily so it binds to the serving event loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+        # Waiting counts requests from arrival, before acquire yields to the loop
+        if self.active + self.waiting >= self.concurrency + self.queue_size:
+            ADMISSION.inc(self.name, "queue_full")
+            raise Rejected("queue_full", self.retry_after())
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            ADMISSION.inc(self.name, "queue_timeout")
+            raise Rejected("queue_timeout", self.retry_after())
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        ADMISSION.inc(self.name, "admitted")
+        ADMISSION_WAIT.observe(started - queued, self.name)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+            self.service_s = 0.8 * self.service_s + 0.2 * (time.perf_counter() - started)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency, "queue_size": self.queue_size,
+            "active": self.active, "waiting": self.waiting,
+            "avg_service_ms": round(self.service_s * 1000, 1),
+        }
+
+
+class AdmissionController:
+    """The lanes and rate limiters, and which lane a request path belongs to"""
+
+    def __init__(self, llm_paths: Iterable[str] = LLM_PATHS, exempt_paths: Iterable[str] = EXEMPT_PATHS,
+                 handler_admitted: Iterable[str] = HANDLER_ADMITTED_LANES):
+        self.llm_paths = tuple(llm_paths)
+        self.exempt_paths = tuple(exempt_paths)
+        self.handler_admitted = set(handler_admitted)
+        self.lanes = {
+            "llm": Lane("llm", ADMISSION_LLM_CONCURRENCY, ADMISSION_LLM_QUEUE),
+            "direct": Lane("direct", ADMISSION_DIRECT_CONCURRENCY, ADMISSION_DIRECT_QUEUE),
+        }
+        self.limiters = {
+            "llm": RateLimiter(RATE_LIMIT_LLM_PER_MINUTE / 60, RATE_LIMIT_LLM_BURST),
+            "direct": RateLimiter(RATE_LIMIT_DIRECT_PER_SECOND, RATE_LIMIT_DIRECT_BURST),
+        }
+
+    def lane_for(self, path: str) -> Optional[str]:
+        """'llm', 'direct', or None for exempt paths"""
+        if path == "/" or path.startswith(self.exempt_paths):
+            return None
+        return "llm" if path in self.llm_paths else "direct"
+
+    @asynccontextmanager
+    async def admit(self, lane_name: str, client: str):
+        """
+        Rate-limit the client's request and hold a slot in its lane for it,
+        or raise Rejected. Handler-admitted lanes are only rate-limited here.
+        """
+        wait = self.limiters[lane_name].check(client)
+        if wait:
+            ADMISSION.inc(lane_name, "rate_limited")
+            raise Rejected("rate_limited", wait)
+        if lane_name in self.handler_admitted:
+            yield
+            return
+        async with self.lanes[lane_name].slot():
+            yield
+
+    def slot(self, lane_name: str):
+        """A slot in a handler-admitted lane, taken inside the handler (raises Rejected)"""
+        return self.lanes[lane_name].slot()
+
+    def status(self) -> Dict[str, Any]:
+        return {name: lane.status() for name, lane in self.lanes.items()}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting each HTTP request to its lane.
+
+    Implemented at the ASGI level, not as a BaseHTTPMiddleware, so a slot
+    is held until a streamed response has been sent and rejected requests
+    never reach the application. Rejected raised by a handler taking its
+    own slot propagates here too and gets the same 429.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        lane = self.controller.lane_for(scope["path"]) if scope["type"] == "http" else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+        client = (scope.get("client") or ("unknown",))[0]
+        try:
+            async with self.controller.admit(lane, client):
+                await self.app(scope, receive, send)
+        except Rejected as e:
+            await _reject(send, lane, e)
+
+
+async def _reject(send, lane: str, rejection: Rejected):
+    body = json.dumps({"detail": f"Too many requests ({rejection.reason}); retry later", "lane": lane}).encode()
+    headers: Tuple[Tuple[bytes, bytes], ...] = (
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(math.ceil(rejection.retry_after)).encode()),
+    )
+    await send({"type": "http.response.start", "status": 429, "headers": list(headers)})
+    await send({"type": "http.response.body", "body": body})
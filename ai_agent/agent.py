@@ -6,29 +6,39 @@ Supports Arabic and English queries
 
 import os
 import json
+import time
 import sqlite3
+from contextlib import contextmanager
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 # Import configuration
 from config import (
+    DATABASE_READ_ONLY,
+    HISTORY_CHART_POINTS,
+    HISTORY_MAX_ROWS,
     GOOGLE_API_KEY, 
     GEMINI_MODEL, 
+    GEMINI_API_ENDPOINT,
     DATABASE_SCHEMA, 
     EXAMPLE_QUERIES,
-    ARABIC_TRANSLATIONS,
-    PRODUCT_TRANSLATIONS,
-    COUNTRY_TRANSLATIONS
+    PRODUCT_TRANSLATIONS
 )
-from database import initialize_database, execute_query, get_database_stats
+from database import initialize_database, open_read_only, execute_query, get_database_stats
+from sql_governor import SQLGovernor
+from query_cache import open_query_cache, database_fingerprint
+from eligibility_index import EligibilityIndex
+from genui import render as render_results
+from downsampling import downsample_rows, time_series_value
 from language_utils import (
     detect_language, 
     translate_arabic_to_english,
     translate_english_to_arabic,
     extract_product_from_query,
     extract_country_from_query,
-    BilingualFormatter
+    extract_animal_profile_from_query
 )
+from metrics import STAGE_LATENCY, SQL_GENERATION, LLM_ERRORS, QUERIES, SQL_ERRORS, RESULT_ROWS
 
 # Try to import Google Generative AI
 try:
@@ -39,6 +49,18 @@ except ImportError:
     print("Warning: google-generativeai not installed. Using fallback SQL generation.")
 
 
+@contextmanager
+def _stage(timings: Dict[str, float], name: str):
+    """Time a pipeline stage into the latency histogram and the query's own timings (ms)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, name)
+        timings[name] = round(elapsed * 1000, 3)
+
+
 class FeedProductsAgent:
     """
     AI Agent for querying feed products data
@@ -51,6 +73,8 @@ class FeedProductsAgent:
         # Initialize database
         if db_connection:
             self.db = db_connection
+        elif DATABASE_READ_ONLY:
+            self.db = open_read_only()
         else:
             self.db = initialize_database()
         
@@ -58,7 +82,14 @@ class FeedProductsAgent:
         self.model = None
         if GENAI_AVAILABLE and GOOGLE_API_KEY:
             try:
-                genai.configure(api_key=GOOGLE_API_KEY)
+                if GEMINI_API_ENDPOINT:
+                    genai.configure(
+                        api_key=GOOGLE_API_KEY,
+                        transport="rest",
+                        client_options={"api_endpoint": GEMINI_API_ENDPOINT}
+                    )
+                else:
+                    genai.configure(api_key=GOOGLE_API_KEY)
                 self.model = genai.GenerativeModel(GEMINI_MODEL)
                 print(f"✓ Gemini model ({GEMINI_MODEL}) initialized successfully")
             except Exception as e:
@@ -66,6 +97,13 @@ class FeedProductsAgent:
         elif not GOOGLE_API_KEY:
             print("Warning: GOOGLE_API_KEY not set. Using pattern-based SQL generation.")
         
+        # Limits applied to every generated statement
+        self.governor = SQLGovernor()
+        # Plan/result cache shared with the other API workers (None when disabled)
+        self.query_cache = open_query_cache()
+        # Restriction bitmaps answering "what can this animal eat" without SQL
+        self.eligibility = EligibilityIndex()
+        
         # Build system prompt for the AI
         self.system_prompt = self._build_system_prompt()
     
@@ -86,12 +124,13 @@ IMPORTANT RULES:
 2. Use LIKE with % for fuzzy matching on product names
 3. For current prices, filter by is_active = 1
 4. For historical data, look for product_code containing 'HIST'
-5. When asked about "cheapest" or "best price", ORDER BY cost_per_kg ASC
+5. When asked about "cheapest" or "best price", filter cost_per_kg_usd IS NOT NULL and ORDER BY cost_per_kg_usd ASC
 6. When asked about suppliers, filter where supplier IS NOT NULL
 7. Include relevant columns in SELECT for useful response
 8. Use strftime for date formatting from Unix timestamps
 9. Limit results to prevent huge outputs (LIMIT 10-20)
 10. Handle both exact and partial product name matches
+11. Return a single read-only SELECT; writes, multiple statements and plans that fully scan more than one table are rejected
 
 EXAMPLE QUERIES:
 {examples_text}
@@ -140,16 +179,47 @@ Return only the JSON response with sql, explanation, and response_template field
                 response_text = response_text.split("```")[1].split("```")[0]
             
             result = json.loads(response_text)
+            result["source"] = "gemini"
             return result
             
         except Exception as e:
             print(f"Gemini error: {e}")
+            LLM_ERRORS.inc()
             return self._generate_sql_fallback(query, language)
     
+    def _eligibility_plan(self, query: str) -> Optional[Dict[str, Any]]:
+        """Plan for "which products are allowed for <animal profile>" questions, or None"""
+        keywords = ['eligible', 'allowed', 'permitted', 'can i feed', 'suitable for', 'safe for',
+                    'مسموح', 'مناسب', 'يمكن إطعام']
+        if not any(word in query.lower() for word in keywords):
+            return None
+        profile = extract_animal_profile_from_query(query)
+        if "species" not in profile:
+            return None
+        
+        product = extract_product_from_query(query)
+        described = ", ".join(f"{k}={v:g}" if isinstance(v, float) else f"{k}={v}" for k, v in profile.items())
+        return {
+            "sql": "",
+            "eligibility": {
+                "profile": profile,
+                "country": extract_country_from_query(query),
+                "product_name": product,
+            },
+            "explanation": f"Eligibility index lookup for {described}",
+            "response_template": "Eligible products (cheapest offer):",
+            "source": "index"
+        }
+    
     def _generate_sql_fallback(self, query: str, language: str) -> Dict[str, Any]:
         """Fallback SQL generation using pattern matching"""
         query_lower = query.lower()
         
+        # Animal-profile eligibility is answered from the eligibility index
+        plan = self._eligibility_plan(query)
+        if plan:
+            return plan
+        
         # Extract product and country from query
         product = extract_product_from_query(query)
         country = extract_country_from_query(query)
@@ -158,6 +228,7 @@ Return only the JSON response with sql, explanation, and response_template field
         sql = ""
         explanation = ""
         response_template = ""
+        max_rows = None
         
         # Check for "cheapest" queries
         if any(word in query_lower for word in ['cheapest', 'lowest price', 'best price', 'أرخص']):
@@ -166,13 +237,14 @@ Return only the JSON response with sql, explanation, and response_template field
             
             sql = f"""
 SELECT product_name, supplier, supplier_country, cost_per_kg, cost_currency, 
-       supplier_email, supplier_phone
+       cost_per_kg_usd, supplier_email, supplier_phone
 FROM feed_products_sample
 WHERE {product_filter}
   AND {country_filter}
   AND is_active = 1
   AND supplier IS NOT NULL
-ORDER BY cost_per_kg ASC
+  AND cost_per_kg_usd IS NOT NULL
+ORDER BY cost_per_kg_usd ASC
 LIMIT 10
 """
             explanation = f"Finding cheapest suppliers for {product or 'products'}"
@@ -188,19 +260,64 @@ SELECT supplier_country, cost_currency,
        ROUND(AVG(cost_per_kg), 2) as avg_price,
        ROUND(MIN(cost_per_kg), 2) as min_price,
        ROUND(MAX(cost_per_kg), 2) as max_price,
+       ROUND(AVG(cost_per_kg_usd), 4) as avg_price_usd,
        COUNT(*) as supplier_count
 FROM feed_products_sample
 WHERE {product_filter}
   AND {country_filter}
   AND is_active = 1
 GROUP BY supplier_country, cost_currency
-ORDER BY avg_price ASC
+ORDER BY avg_price_usd IS NULL, avg_price_usd ASC
 """
             explanation = f"Calculating average prices for {product or 'products'}"
             response_template = "Average prices by country:"
         
+        # Check for forecast queries (precomputed in price_forecasts)
+        elif any(word in query_lower for word in ['forecast', 'predict', 'next month', 'will the price', 'future price', 'توقع', 'تنبؤ']):
+            product_filter = f"LOWER(product_name) LIKE '%{product.lower()}%'" if product else "1=1"
+            country_filter = f"supplier_country = '{country}'" if country else "1=1"
+            
+            sql = f"""
+SELECT month, product_name, supplier_country, cost_currency,
+       ROUND(forecast, 2) as forecast,
+       ROUND(lower_80, 2) as lower_80,
+       ROUND(upper_80, 2) as upper_80,
+       forecast_usd, method
+FROM price_forecasts
+WHERE {product_filter}
+  AND {country_filter}
+ORDER BY product_name, supplier_country, month
+LIMIT 36
+"""
+            explanation = f"Forecasting prices for {product or 'products'}"
+            response_template = "Price forecast (80% range):"
+        
+        # Check for price trend queries (month series, downsampled for charts after execution)
+        elif any(word in query_lower for word in ['trend', 'price history', 'over time', 'اتجاه', 'تاريخ الأسعار']):
+            product_filter = f"LOWER(product_name) LIKE '%{product.lower()}%'" if product else "1=1"
+            country_filter = f"supplier_country = '{country}'" if country else "1=1"
+            
+            sql = f"""
+SELECT strftime('%Y-%m', created_at, 'unixepoch') as month,
+       supplier_country, cost_currency,
+       ROUND(AVG(cost_per_kg), 2) as avg_price,
+       ROUND(MIN(cost_per_kg), 2) as min_price,
+       ROUND(MAX(cost_per_kg), 2) as max_price,
+       ROUND(AVG(cost_per_kg_usd), 4) as avg_price_usd
+FROM feed_products_sample
+WHERE {product_filter}
+  AND {country_filter}
+  AND product_code LIKE '%HIST%'
+GROUP BY month, supplier_country, cost_currency
+ORDER BY month ASC
+"""
+            explanation = f"Price trend for {product or 'products'}"
+            response_template = "Price trends:"
+            # Read the whole history; downsampling (not the row cap) sizes the chart
+            max_rows = HISTORY_MAX_ROWS
+        
         # Check for "best time to buy" / historical queries
-        elif any(word in query_lower for word in ['best time', 'when to buy', 'historical', 'price trend', 'أفضل وقت', 'تاريخي']):
+        elif any(word in query_lower for word in ['best time', 'when to buy', 'historical', 'أفضل وقت', 'تاريخي']):
             product_filter = f"LOWER(product_name) LIKE '%{product.lower()}%'" if product else "1=1"
             country_filter = f"supplier_country = '{country}'" if country else "1=1"
             
@@ -208,13 +325,15 @@ ORDER BY avg_price ASC
 SELECT strftime('%Y-%m', created_at, 'unixepoch') as month,
        ROUND(AVG(cost_per_kg), 2) as avg_price,
        cost_currency,
+       ROUND(AVG(cost_per_kg_usd), 4) as avg_price_usd,
        supplier_country
 FROM feed_products_sample
 WHERE {product_filter}
   AND product_code LIKE '%HIST%'
+  AND cost_per_kg_usd IS NOT NULL
   {f"AND {country_filter}" if country else ""}
 GROUP BY month, supplier_country, cost_currency
-ORDER BY avg_price ASC
+ORDER BY avg_price_usd ASC
 LIMIT 10
 """
             explanation = f"Finding best time to buy {product or 'products'}"
@@ -227,7 +346,7 @@ LIMIT 10
             
             sql = f"""
 SELECT DISTINCT supplier, supplier_country, supplier_email, supplier_phone,
-       product_name, cost_per_kg, cost_currency
+       product_name, cost_per_kg, cost_currency, cost_per_kg_usd
 FROM feed_products_sample
 WHERE {product_filter}
   AND {country_filter}
@@ -255,7 +374,8 @@ LIMIT 15
             sql = f"""
 SELECT DISTINCT product_name, type, 
        ROUND(AVG(cost_per_kg), 2) as avg_price, 
-       cost_currency
+       cost_currency,
+       ROUND(AVG(cost_per_kg_usd), 4) as avg_price_usd
 FROM feed_products_sample
 WHERE {type_filter}
   AND {country_filter}
@@ -293,87 +413,71 @@ LIMIT 20
             
             sql = f"""
 SELECT product_name, type, supplier, supplier_country,
-       cost_per_kg, cost_currency
+       cost_per_kg, cost_currency, cost_per_kg_usd
 FROM feed_products_sample
 WHERE {product_filter}
   AND {country_filter}
   AND is_active = 1
-ORDER BY product_name, cost_per_kg
+ORDER BY product_name, cost_per_kg_usd IS NULL, cost_per_kg_usd
 LIMIT 15
 """
             explanation = "General product search"
             response_template = "Search results:"
         
-        return {
+        plan = {
             "sql": sql.strip(),
             "explanation": explanation,
-            "response_template": response_template
+            "response_template": response_template,
+            "source": "fallback"
         }
+        if max_rows:
+            plan["max_rows"] = max_rows
+        return plan
     
-    def _format_results(self, results: List[Dict], template: str, language: str) -> str:
-        """Format query results into a human-readable response"""
-        if not results:
-            if language == 'ar':
-                return "لم يتم العثور على نتائج"
-            return "No results found"
-        
-        formatter = BilingualFormatter(language)
-        
-        # Build response
-        lines = [formatter.format_header(template.replace(":", "")) + ":"]
-        lines.append("")
-        
-        for i, row in enumerate(results, 1):
-            line_parts = []
-            
-            # Format based on available columns
-            if 'supplier' in row and row['supplier']:
-                line_parts.append(f"{row['supplier']}")
-            if 'product_name' in row:
-                line_parts.append(f"{row['product_name']}")
-            if 'supplier_country' in row:
-                country = row['supplier_country']
-                if language == 'ar':
-                    country = COUNTRY_TRANSLATIONS.get(country, country)
-                line_parts.append(f"({country})")
-            if 'cost_per_kg' in row and row['cost_per_kg']:
-                currency = row.get('cost_currency', 'USD')
-                line_parts.append(f"- {currency} {row['cost_per_kg']:.2f}/kg")
-            if 'avg_price' in row:
-                currency = row.get('cost_currency', 'USD')
-                line_parts.append(f"Avg: {currency} {row['avg_price']:.2f}")
-            if 'min_price' in row:
-                line_parts.append(f"Min: {row['min_price']:.2f}")
-            if 'max_price' in row:
-                line_parts.append(f"Max: {row['max_price']:.2f}")
-            if 'month' in row:
-                line_parts.insert(0, f"{row['month']}")
-            if 'type' in row:
-                ptype = row['type']
-                if language == 'ar':
-                    type_trans = {'Fodder': 'علف خشن', 'Concentrate': 'علف مركز', 'Additive': 'مضافات'}
-                    ptype = type_trans.get(ptype, ptype)
-                line_parts.append(f"[{ptype}]")
-            if 'species' in row:
-                line_parts.append(f"Species: {row['species']}")
-            if 'max_perc_feed' in row and row['max_perc_feed']:
-                line_parts.append(f"Max feed %: {row['max_perc_feed']}")
-            if 'supplier_email' in row and row['supplier_email']:
-                line_parts.append(f"📧 {row['supplier_email']}")
-            if 'supplier_phone' in row and row['supplier_phone']:
-                line_parts.append(f"📞 {row['supplier_phone']}")
-            
-            lines.append(f"{i}. " + " ".join(line_parts))
-        
-        response = "\n".join(lines)
-        
-        # Translate to Arabic if needed
-        if language == 'ar':
-            # Keep the data but translate labels
-            for en, ar in ARABIC_TRANSLATIONS.items():
-                response = response.replace(en, ar)
+    def _plan(self, processed_query: str, language: str) -> Dict[str, Any]:
+        """Plan for an (English) query: eligibility index, shared plan cache, then Gemini/fallback"""
+        # Profile lookups never need the LLM: the eligibility index answers them exactly
+        sql_result = self._eligibility_plan(processed_query)
+        if sql_result is None:
+            sql_result = self.query_cache.get_plan(processed_query, language) if self.query_cache else None
+            if sql_result:
+                sql_result["source"] = "cache"
+            else:
+                sql_result = self._generate_sql_with_gemini(processed_query, language)
+                # Only LLM plans are worth sharing; the fallback is cheaper than a lookup
+                if self.query_cache and sql_result.get("source") == "gemini":
+                    self.query_cache.set_plan(processed_query, language, sql_result)
+        SQL_GENERATION.inc(sql_result.get("source", "gemini"))
+        return sql_result
+    
+    def plan_query(self, user_query: str) -> Dict[str, Any]:
+        """
+        Plan a natural language query without executing it.
         
-        return response
+        Returns the plan (sql, explanation, response_template, source) plus
+        the detected language; eligibility plans carry no SQL.
+        """
+        language = detect_language(user_query)
+        processed_query = translate_arabic_to_english(user_query) if language == 'ar' else user_query
+        return {**self._plan(processed_query, language), "language": language}
+    
+    def _chart_rows(self, data: List[Dict]) -> List[Dict]:
+        """
+        Month series go to charts: keep at most HISTORY_CHART_POINTS per series,
+        and no more than the governor's row cap in total. Plans with a larger
+        row allowance are brought back under the cap here, by downsampling
+        every series (endpoints included) rather than cutting off the newest
+        months; other results are returned as they are.
+        """
+        value = time_series_value(data)
+        if value:
+            data, _ = downsample_rows(data, HISTORY_CHART_POINTS, y=value, max_rows=self.governor.max_rows)
+        # More series than the cap holds at three points each: keep the latest months
+        return data[-self.governor.max_rows:]
+    
+    def _format_results(self, results: List[Dict], template: str, language: str) -> Tuple[str, Dict[str, Any]]:
+        """Format query results into a human-readable response and its GenUI component spec"""
+        return render_results(results, template, language)
     
     def process_query(self, user_query: str) -> Dict[str, Any]:
         """
@@ -383,52 +487,95 @@ LIMIT 15
             user_query: The user's question in English or Arabic
             
         Returns:
-            Dict with keys: success, response, sql, data, language, error
+            Dict with keys: success, response, sql, data, ui, language, error,
+            timings (milliseconds per stage, plus total)
         """
         result = {
             "success": False,
             "response": "",
             "sql": "",
             "data": [],
+            "ui": None,
             "language": "en",
-            "error": None
+            "error": None,
+            "timings": {}
         }
+        timings = result["timings"]
         
+        started = time.perf_counter()
         try:
             # Detect language
-            language = detect_language(user_query)
+            with _stage(timings, "detect_language"):
+                language = detect_language(user_query)
             result["language"] = language
+            QUERIES.inc(language)
             
             # Translate Arabic to English for processing
             processed_query = user_query
             if language == 'ar':
-                processed_query = translate_arabic_to_english(user_query)
+                with _stage(timings, "translate"):
+                    processed_query = translate_arabic_to_english(user_query)
             
             # Generate SQL query
-            sql_result = self._generate_sql_with_gemini(processed_query, language)
+            with _stage(timings, "generate_sql"):
+                sql_result = self._plan(processed_query, language)
             result["sql"] = sql_result.get("sql", "")
             
             # Execute the SQL query
-            data, error = execute_query(self.db, result["sql"])
+            with _stage(timings, "execute_sql"):
+                lookup = None
+                if "eligibility" in sql_result:
+                    request = sql_result["eligibility"]
+                    lookup = self.eligibility.snapshot(self.db).lookup(
+                        request["profile"], country=request["country"],
+                        product_name=request["product_name"], limit=20
+                    )
+                    data, error = lookup["products"], None
+                    fingerprint = None
+                else:
+                    fingerprint = database_fingerprint(self.db) if self.query_cache else None
+                    data = self.query_cache.get_result(fingerprint, result["sql"]) if fingerprint else None
+                    error = None
+                if data is None:
+                    data, error = self.governor.execute(
+                        self.db, result["sql"], origin=sql_result.get("source", "gemini"),
+                        max_rows=sql_result.get("max_rows")
+                    )
+                    if not error:
+                        data = self._chart_rows(data)
+                    if not error and fingerprint:
+                        self.query_cache.set_result(fingerprint, result["sql"], data)
             
             if error:
+                SQL_ERRORS.inc()
                 result["error"] = error
                 result["response"] = f"Database error: {error}" if language == 'en' else f"خطأ في قاعدة البيانات: {error}"
                 return result
             
             result["data"] = data
             result["success"] = True
+            RESULT_ROWS.observe(len(data))
             
             # Format the response
-            result["response"] = self._format_results(
-                data, 
-                sql_result.get("response_template", "Results"),
-                language
-            )
+            with _stage(timings, "format"):
+                result["response"], result["ui"] = self._format_results(
+                    data, 
+                    sql_result.get("response_template", "Results"),
+                    language
+                )
+                if lookup and lookup["ineligible"]:
+                    label = "غير مسموح" if language == 'ar' else "Not eligible"
+                    note = f"{label}: {', '.join(lookup['ineligible'][:10])}"
+                    result["response"] += f"\n\n{note}"
+                    result["ui"]["notes"] = [note]
             
         except Exception as e:
             result["error"] = str(e)
             result["response"] = f"Error processing query: {e}"
+        finally:
+            elapsed = time.perf_counter() - started
+            STAGE_LATENCY.observe(elapsed, "total")
+            timings["total"] = round(elapsed * 1000, 3)
         
         return result
     
@@ -440,6 +587,8 @@ LIMIT 15
         """Close database connection"""
         if self.db:
             self.db.close()
+        if self.query_cache:
+            self.query_cache.store.close()
 
 
 def create_agent() -> FeedProductsAgent:
@@ -0,0 +1,180 @@
+"""
+Price analytics for the Feed Products AI Agent
+Loads every product/country price history into one month-aligned matrix and
+computes moving averages, seasonality, volatility and percentile bands for
+all series at once with pandas/NumPy
+"""
+
+import calendar
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from database import get_data_version
+
+MOVING_AVERAGE_WINDOWS = (3, 6)
+PERCENTILES = (10, 25, 50, 75, 90)
+MONTH_NAMES = [calendar.month_abbr[m] for m in range(1, 13)]
+
+# Orderings accepted by the overview
+OVERVIEW_SORTS = ("volatility", "seasonal_discount", "current_percentile")
+
+
+def load_price_histories(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Monthly average prices for every historical product/country/currency series"""
+    return pd.read_sql_query("""
+    SELECT product_name, supplier_country, cost_currency,
+           strftime('%Y-%m', created_at, 'unixepoch') AS month,
+           AVG(cost_per_kg) AS price,
+           AVG(cost_per_kg_usd) AS price_usd
+    FROM feed_products_sample
+    WHERE product_code LIKE '%HIST%'
+      AND cost_per_kg IS NOT NULL
+    GROUP BY product_name, supplier_country, cost_currency, month
+    """, conn)
+
+
+def _round(value: float, digits: int = 4) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+class AnalyticsSnapshot:
+    """
+    Vectorized statistics for all series, aligned on a calendar month axis.
+
+    prices and usd are (series x months) arrays with NaN for missing months;
+    every statistic below is computed for all series in one pass.
+    """
+
+    def __init__(self, histories: pd.DataFrame):
+        if histories.empty:
+            self.series = pd.DataFrame(columns=["product_name", "supplier_country", "cost_currency"])
+            self.months: List[str] = []
+            self.prices = np.empty((0, 0))
+            self.usd = np.empty((0, 0))
+        else:
+            months = pd.period_range(histories["month"].min(), histories["month"].max(), freq="M").strftime("%Y-%m")
+            keys = ["product_name", "supplier_country", "cost_currency"]
+            wide = histories.pivot_table(index=keys, columns="month", values=["price", "price_usd"], aggfunc="mean")
+            self.series = wide.index.to_frame(index=False)
+            self.months = list(months)
+            self.prices = wide["price"].reindex(columns=months).to_numpy(dtype=float)
+            self.usd = wide["price_usd"].reindex(columns=months).to_numpy(dtype=float)
+
+        by_month = pd.DataFrame(self.prices.T)
+        self.observations = np.sum(~np.isnan(self.prices), axis=1)
+
+        # Trailing moving averages over calendar months (gaps shrink the window)
+        self.moving_averages = {
+            window: by_month.rolling(window, min_periods=1).mean().to_numpy().T
+            for window in MOVING_AVERAGE_WINDOWS
+        }
+
+        # Month-of-year seasonality index: calendar-month mean / overall mean
+        month_of_year = np.array([int(m[5:7]) - 1 for m in self.months], dtype=int)
+        overall = by_month.mean().to_numpy()
+        seasonal = by_month.groupby(month_of_year).mean().reindex(range(12)).to_numpy().T
+        self.seasonality = seasonal / overall[:, None] if len(overall) else seasonal
+
+        # Volatility: standard deviation of month-over-month log returns
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(self.prices), axis=1)
+        self.volatility = pd.DataFrame(returns.T).std().to_numpy() if returns.size else np.full(len(self.series), np.nan)
+
+        # Percentile bands over each series' own history
+        self.bands = (np.nanpercentile(self.prices, PERCENTILES, axis=1)
+                      if self.prices.size else np.empty((len(PERCENTILES), 0)))
+
+        # Latest observed month per series and where its price sits in the history
+        observed = ~np.isnan(self.prices)
+        self.latest_index = np.where(
+            observed.any(axis=1), self.prices.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1), -1
+        ) if self.prices.size else np.empty(0, dtype=int)
+        latest = self.prices[np.arange(len(self.latest_index)), self.latest_index] if self.prices.size else np.empty(0)
+        self.latest_percentile = (
+            np.sum(self.prices <= latest[:, None], axis=1) / np.maximum(self.observations, 1) * 100
+            if self.prices.size else np.empty(0)
+        )
+
+    def find(self, product_name: str, country: Optional[str] = None) -> List[int]:
+        """Indices of series whose product name contains product_name"""
+        mask = self.series["product_name"].str.lower().str.contains(product_name.lower(), regex=False)
+        if country:
+            mask &= self.series["supplier_country"] == country
+        return list(np.flatnonzero(mask.to_numpy()))
+
+    def _summary(self, i: int) -> Dict[str, Any]:
+        seasonal = self.seasonality[i]
+        known = ~np.isnan(seasonal)
+        order = [m for m in np.argsort(np.where(known, seasonal, np.inf)) if known[m]]
+        latest = self.latest_index[i]
+        return {
+            "product": self.series.at[i, "product_name"],
+            "country": self.series.at[i, "supplier_country"],
+            "currency": self.series.at[i, "cost_currency"],
+            "months": int(self.observations[i]),
+            "latest": {
+                "month": self.months[latest] if latest >= 0 else None,
+                "price": _round(self.prices[i, latest]) if latest >= 0 else None,
+                "price_usd": _round(self.usd[i, latest]) if latest >= 0 else None,
+                "percentile": _round(self.latest_percentile[i], 1),
+            },
+            "volatility": {
+                "monthly": _round(self.volatility[i]),
+                "annualized": _round(self.volatility[i] * np.sqrt(12)),
+            },
+            "seasonal_discount": _round(1 - seasonal[order[0]]) if order else None,
+            "best_months": [MONTH_NAMES[m] for m in order[:3]],
+            "worst_months": [MONTH_NAMES[m] for m in order[::-1][:3]],
+        }
+
+    def insights(self, i: int) -> Dict[str, Any]:
+        """Full insight payload for one series"""
+        result = self._summary(i)
+        result["bands"] = {f"p{p}": _round(self.bands[k, i]) for k, p in enumerate(PERCENTILES)}
+        result["seasonality"] = [
+            {"month": MONTH_NAMES[m], "index": _round(self.seasonality[i, m])}
+            for m in range(12) if not np.isnan(self.seasonality[i, m])
+        ]
+        history = []
+        for j, month in enumerate(self.months):
+            if np.isnan(self.prices[i, j]):
+                continue
+            point = {"month": month, "avg_price": _round(self.prices[i, j]), "avg_price_usd": _round(self.usd[i, j])}
+            for window, values in self.moving_averages.items():
+                point[f"ma_{window}"] = _round(values[i, j])
+            history.append(point)
+        result["history"] = history
+        return result
+
+    def overview(self, sort: str = "volatility", limit: int = 20) -> List[Dict[str, Any]]:
+        """Summaries of all series, ranked by the chosen statistic"""
+        if sort == "volatility":
+            key = -np.nan_to_num(self.volatility, nan=-np.inf)
+        elif sort == "seasonal_discount":
+            key = np.nan_to_num(np.nanmin(self.seasonality, axis=1, initial=np.inf), nan=np.inf)
+        else:
+            key = self.latest_percentile
+        # Series with a single month have no trend to rank
+        order = [i for i in np.argsort(key, kind="stable") if self.observations[i] > 1]
+        return [self._summary(i) for i in order[:limit]]
+
+
+class PriceAnalytics:
+    """Builds the snapshot once per data version and shares it between requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._snapshot: Optional[AnalyticsSnapshot] = None
+
+    def snapshot(self, conn: sqlite3.Connection) -> AnalyticsSnapshot:
+        version = get_data_version(conn)
+        with self._lock:
+            if self._snapshot is None or self._version != version:
+                self._snapshot = AnalyticsSnapshot(load_price_histories(conn))
+                self._version = version
+            return self._snapshot
@@ -6,15 +6,41 @@ Ready for integration with React/Flutter UI
 """
 
 import os
+import asyncio
+import sqlite3
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from agent import FeedProductsAgent, create_agent
+from admission import AdmissionController, AdmissionMiddleware, Rejected
+from batch import AgentPool
+from single_flight import SingleFlight, query_key
+from analytics import PriceAnalytics, OVERVIEW_SORTS
+from catalogue_snapshot import CatalogueIndex
+from eligibility_index import EligibilityIndex
+from ration_optimizer import RationOptimizer, SCIPY_AVAILABLE
+from price_ingest import GroupCommitWriter, database_file, read_observations
+from price_feed import PriceChangeFeed, stream_changes
+from export import (
+    FORMATS as EXPORT_FORMATS, PYARROW_AVAILABLE, catalogue_query, guarded_cursor,
+    open_export_connection, stream_export
+)
+from sql_governor import QueryRejected
+from config import (
+    ADMISSION_LLM_CONCURRENCY, DATABASE_READ_ONLY, DATABASE_IMMUTABLE, PRICE_INGEST_MAX_BATCH_ROWS, PRICE_FEED_HEARTBEAT_SECONDS,
+    HISTORY_CHART_POINTS
+)
+from database import ensure_database, get_data_version
+from downsampling import METHODS as DOWNSAMPLING_METHODS, downsample_rows
+from http_cache import ResponseCache
+from metrics import REGISTRY
+from slow_query_log import slow_query_log
 from language_utils import detect_language
 
 
@@ -42,6 +68,7 @@ class QueryResponse(BaseModel):
     sql_query: str
     data: List[Dict[str, Any]]
     result_count: int
+    ui: Optional[Dict[str, Any]] = Field(None, description="GenUI component spec (table, price_comparison, time_series_chart, supplier_contact_card) for data")
     error: Optional[str] = None
     timestamp: str
 
@@ -67,6 +94,47 @@ class ProductSearchRequest(BaseModel):
     limit: int = Field(20, ge=1, le=100)
 
 
+class RationRequest(BaseModel):
+    """Animal group profile and nutrient/inclusion constraints for a least-cost ration"""
+    name: Optional[str] = Field(None, description="Label echoed back in the result")
+    species: str = Field("cattle", description="cattle, sheep, goat or camel")
+    sex: Optional[str] = None
+    age_months: Optional[int] = Field(None, ge=0)
+    breeding_cycle: Optional[str] = None
+    lactation_cycle: Optional[str] = None
+    production_focus: Optional[str] = Field(None, description="e.g. dairy, beef, meat")
+    country: Optional[str] = Field(None, description="Only use offers from this supplier country")
+    min_cp: Optional[float] = Field(None, ge=0, description="Crude protein, % of dry matter")
+    max_cp: Optional[float] = Field(None, ge=0)
+    min_tdn: Optional[float] = Field(None, ge=0, description="Total digestible nutrients, % of dry matter")
+    max_tdn: Optional[float] = Field(None, ge=0)
+    min_ndf: Optional[float] = Field(None, ge=0, description="Neutral detergent fibre, % of dry matter")
+    max_ndf: Optional[float] = Field(None, ge=0)
+    min_forage_pct: Optional[float] = Field(None, ge=0, le=100)
+    max_concentrate_pct: Optional[float] = Field(None, ge=0, le=100)
+    max_inclusion: Optional[Dict[str, float]] = Field(None, description="Product name -> max % of dry matter")
+    exclude: Optional[List[str]] = Field(None, description="Product names to leave out")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "Early-lactation dairy cows",
+                "species": "cattle",
+                "sex": "female",
+                "age_months": 36,
+                "lactation_cycle": "early",
+                "production_focus": "dairy",
+                "country": "UAE"
+            }
+        }
+
+
+class RationBatchRequest(BaseModel):
+    """Many animal groups solved against shared feed matrices"""
+    country: Optional[str] = Field(None, description="Default supplier country for groups without one")
+    groups: List[RationRequest] = Field(..., min_length=1, max_length=1000)
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
@@ -78,17 +146,76 @@ class HealthResponse(BaseModel):
 # Global agent instance
 agent: Optional[FeedProductsAgent] = None
 
+# Agents answering natural language queries on their own threads, so waiting on
+# Gemini never blocks the event loop (one per LLM admission slot)
+llm_agents: Optional[AgentPool] = None
+
+# Agent whose connection backs the CPU-bound analytics, snapshot and ration
+# endpoints, on its own thread so rebuilds and solves never block the event loop.
+# One thread: snapshots are rebuilt when their connection's data version changes,
+# so every check must come from the same connection
+compute_agents: Optional[AgentPool] = None
+
+# Identical natural language queries in flight at the same time share one answer
+query_flights = SingleFlight()
+
+# Lanes, queues and rate limits in front of every endpoint
+admission = AdmissionController()
+
+# ETag/compression cache for catalogue endpoints polled by the UI
+response_cache = ResponseCache()
+
+# Vectorized price statistics, rebuilt when the data changes (compute thread only)
+price_analytics = PriceAnalytics()
+
+# Columnar snapshot of active products backing structured search (compute thread only)
+catalogue_index = CatalogueIndex()
+
+# Restriction bitmaps for animal-profile eligibility lookups (compute thread only)
+eligibility_index = EligibilityIndex()
+
+# Group-committing writer for /prices/bulk (None for read-only or in-memory databases)
+price_writer: Optional[GroupCommitWriter] = None
+
+# Live price-change fan-out for /subscribe (None for in-memory or immutable databases)
+price_feed: Optional[PriceChangeFeed] = None
+
+# Least-cost ration feed matrices, one per supplier country (compute thread only)
+ration_optimizer = RationOptimizer()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global agent
+    global agent, llm_agents, compute_agents, price_writer, price_feed
     # Startup
     print("🚀 Starting Feed Products AI Agent API...")
     agent = create_agent()
+    llm_agents = AgentPool(create_agent, ADMISSION_LLM_CONCURRENCY, name="llm")
+    llm_agents.warm()
+    compute_agents = AgentPool(create_agent, 1, name="compute")
+    compute_agents.warm()
+    db_file = database_file(agent.db)
+    if db_file and not DATABASE_READ_ONLY:
+        price_writer = GroupCommitWriter(db_file)
+    if db_file and not DATABASE_IMMUTABLE:
+        price_feed = PriceChangeFeed(db_file)
+        price_feed.start()
     print("✅ Agent initialized successfully")
     yield
     # Shutdown
+    if price_feed:
+        await price_feed.close()
+        price_feed = None
+    if price_writer:
+        price_writer.close()
+        price_writer = None
+    if llm_agents:
+        llm_agents.close()
+        llm_agents = None
+    if compute_agents:
+        compute_agents.close()
+        compute_agents = None
     if agent:
         agent.close()
         print("👋 Agent shutdown complete")
@@ -123,6 +250,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Admission control; added first so it runs inside CORS and 429s carry CORS headers
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 # Add CORS middleware for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -133,6 +263,43 @@ app.add_middleware(
 )
 
 
+async def run_on_llm_agent(fn, *args):
+    """Run fn(agent, *args) on a free LLM-lane agent thread"""
+    return await asyncio.wrap_future(llm_agents.submit(fn, *args))
+
+
+async def run_on_compute_agent(fn, *args):
+    """Run fn(agent, *args) on the compute thread (CPU-bound work off the event loop)"""
+    return await asyncio.wrap_future(compute_agents.submit(fn, *args))
+
+
+async def respond_from_compute_agent(request: Request, key: str, build):
+    """response_cache.respond, with the version check and build(agent) on the compute thread"""
+    def respond(compute_agent):
+        return response_cache.respond(
+            request, key, get_data_version(compute_agent.db), lambda: build(compute_agent)
+        )
+    return await run_on_compute_agent(respond)
+
+
+async def _process_in_llm_slot(query: str) -> Dict[str, Any]:
+    async with admission.slot("llm"):
+        return await run_on_llm_agent(FeedProductsAgent.process_query, query)
+
+
+async def answer_query(query: str) -> Dict[str, Any]:
+    """
+    process_query on an LLM-lane agent, shared with identical queries in flight.
+    
+    Only the first of a group of identical requests takes an LLM admission
+    slot; the rest wait on its task, so a spike of one question costs one
+    slot, one Gemini call and one SQL execution.
+    """
+    task = query_flights.submit(query_key(query), lambda: asyncio.ensure_future(_process_in_llm_slot(query)))
+    # Shielded: a disconnecting client must not cancel an answer others are waiting for
+    return await asyncio.shield(task)
+
+
 @app.get("/", response_model=Dict[str, str])
 async def root():
     """API root endpoint"""
@@ -158,6 +325,12 @@ async def health_check():
     )
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Per-stage latency and usage counters in Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/query", response_model=QueryResponse)
 async def process_query(request: QueryRequest):
     """
@@ -177,8 +350,8 @@ async def process_query(request: QueryRequest):
         # Override language detection if specified
         query = request.query
         
-        # Process the query
-        result = agent.process_query(query)
+        # Process the query off the event loop, coalesced with identical ones in flight
+        result = await answer_query(query)
         
         return QueryResponse(
             success=result["success"],
@@ -188,9 +361,13 @@ async def process_query(request: QueryRequest):
             sql_query=result["sql"],
             data=result["data"],
             result_count=len(result["data"]),
+            ui=result.get("ui"),
             error=result.get("error"),
             timestamp=datetime.utcnow().isoformat()
         )
+    except Rejected:
+        # Answered with 429 and Retry-After by the admission middleware
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -210,21 +387,23 @@ async def process_query_get(
 
 
 @app.get("/stats", response_model=StatsResponse)
-async def get_statistics():
+async def get_statistics(request: Request):
     """Get database statistics"""
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
-    stats = agent.get_stats()
+    def build():
+        stats = agent.get_stats()
+        return StatsResponse(
+            total_products=stats.get("total_products", 0),
+            active_products=stats.get("active_products", 0),
+            unique_suppliers=stats.get("unique_suppliers", 0),
+            total_restrictions=stats.get("total_restrictions", 0),
+            products_by_type=stats.get("products_by_type", {}),
+            products_by_country=stats.get("products_by_country", {})
+        ).model_dump()
     
-    return StatsResponse(
-        total_products=stats.get("total_products", 0),
-        active_products=stats.get("active_products", 0),
-        unique_suppliers=stats.get("unique_suppliers", 0),
-        total_restrictions=stats.get("total_restrictions", 0),
-        products_by_type=stats.get("products_by_type", {}),
-        products_by_country=stats.get("products_by_country", {})
-    )
+    return response_cache.respond(request, "stats", get_data_version(agent.db), build)
 
 
 @app.post("/search/products")
@@ -232,43 +411,26 @@ async def search_products(request: ProductSearchRequest):
     """
     Direct product search with filters.
     
-    More structured than natural language queries.
+    More structured than natural language queries. Answered from an
+    in-memory columnar snapshot of active products (rebuilt after writes),
+    cheapest first.
     """
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
-    # Build SQL query from filters
-    conditions = ["is_active = 1"]
-    
-    if request.product_name:
-        conditions.append(f"LOWER(product_name) LIKE '%{request.product_name.lower()}%'")
-    if request.product_type:
-        conditions.append(f"type = '{request.product_type}'")
-    if request.country:
-        conditions.append(f"supplier_country = '{request.country}'")
-    if request.supplier:
-        conditions.append(f"LOWER(supplier) LIKE '%{request.supplier.lower()}%'")
-    if request.min_price:
-        conditions.append(f"cost_per_kg >= {request.min_price}")
-    if request.max_price:
-        conditions.append(f"cost_per_kg <= {request.max_price}")
-    
-    where_clause = " AND ".join(conditions)
-    
-    sql = f"""
-    SELECT product_name, type, supplier, supplier_country, 
-           cost_per_kg, cost_currency, supplier_email, supplier_phone
-    FROM feed_products_sample
-    WHERE {where_clause}
-    ORDER BY cost_per_kg ASC
-    LIMIT {request.limit}
-    """
-    
-    from database import execute_query
-    data, error = execute_query(agent.db, sql)
+    def search(compute_agent):
+        return catalogue_index.snapshot(compute_agent.db).search(
+            product_name=request.product_name,
+            product_type=request.product_type,
+            country=request.country,
+            supplier=request.supplier,
+            min_price=request.min_price,
+            max_price=request.max_price,
+            limit=request.limit
+        )
     
-    if error:
-        raise HTTPException(status_code=400, detail=error)
+    # Snapshot rebuilds after writes are CPU-bound, so they run on the compute thread
+    data = await run_on_compute_agent(search)
     
     return {
         "success": True,
@@ -281,85 +443,105 @@ async def search_products(request: ProductSearchRequest):
 
 
 @app.get("/products/types")
-async def get_product_types():
+async def get_product_types(request: Request):
     """Get all product types"""
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
-    from database import execute_query
-    sql = "SELECT DISTINCT type FROM feed_products_sample WHERE is_active = 1 ORDER BY type"
-    data, error = execute_query(agent.db, sql)
-    
-    if error:
-        raise HTTPException(status_code=400, detail=error)
+    def build():
+        from database import execute_query
+        sql = "SELECT DISTINCT type FROM feed_products_sample WHERE is_active = 1 ORDER BY type"
+        data, error = execute_query(agent.db, sql)
+        
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        
+        return {"types": [row["type"] for row in data]}
     
-    return {"types": [row["type"] for row in data]}
+    return response_cache.respond(request, "types", get_data_version(agent.db), build)
 
 
 @app.get("/products/countries")
-async def get_countries():
+async def get_countries(request: Request):
     """Get all available countries"""
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
-    from database import execute_query
-    sql = """
-    SELECT DISTINCT supplier_country, COUNT(*) as product_count 
-    FROM feed_products_sample 
-    WHERE is_active = 1 
-    GROUP BY supplier_country 
-    ORDER BY product_count DESC
-    """
-    data, error = execute_query(agent.db, sql)
-    
-    if error:
-        raise HTTPException(status_code=400, detail=error)
+    def build():
+        from database import execute_query
+        sql = """
+        SELECT DISTINCT supplier_country, COUNT(*) as product_count 
+        FROM feed_products_sample 
+        WHERE is_active = 1 
+        GROUP BY supplier_country 
+        ORDER BY product_count DESC
+        """
+        data, error = execute_query(agent.db, sql)
+        
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        
+        return {"countries": data}
     
-    return {"countries": data}
+    return response_cache.respond(request, "countries", get_data_version(agent.db), build)
 
 
 @app.get("/products/suppliers")
 async def get_suppliers(
+    request: Request,
     country: Optional[str] = Query(None, description="Filter by country")
 ):
     """Get all suppliers, optionally filtered by country"""
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
-    from database import execute_query
-    
-    country_filter = f"AND supplier_country = '{country}'" if country else ""
-    
-    sql = f"""
-    SELECT DISTINCT supplier, supplier_country, supplier_email, supplier_phone,
-           COUNT(*) as product_count
-    FROM feed_products_sample 
-    WHERE is_active = 1 
-      AND supplier IS NOT NULL
-      {country_filter}
-    GROUP BY supplier, supplier_country
-    ORDER BY supplier_country, supplier
-    """
-    data, error = execute_query(agent.db, sql)
-    
-    if error:
-        raise HTTPException(status_code=400, detail=error)
+    def build():
+        from database import execute_query
+        
+        country_filter = "AND supplier_country = ?" if country else ""
+        
+        sql = f"""
+        SELECT DISTINCT supplier, supplier_country, supplier_email, supplier_phone,
+               COUNT(*) as product_count
+        FROM feed_products_sample 
+        WHERE is_active = 1 
+          AND supplier IS NOT NULL
+          {country_filter}
+        GROUP BY supplier, supplier_country
+        ORDER BY supplier_country, supplier
+        """
+        data, error = execute_query(agent.db, sql, params=(country,) if country else ())
+        
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        
+        return {"suppliers": data}
     
-    return {"suppliers": data}
+    return response_cache.respond(request, f"suppliers:{country or ''}", get_data_version(agent.db), build)
 
 
 @app.get("/products/{product_name}/history")
 async def get_price_history(
     product_name: str,
-    country: Optional[str] = Query(None, description="Filter by country")
+    country: Optional[str] = Query(None, description="Filter by country"),
+    points: int = Query(HISTORY_CHART_POINTS, ge=3, le=10000, description="Maximum points per country series"),
+    method: str = Query("lttb", description="Downsampling method: lttb (shape) or minmax (keeps extremes)")
 ):
-    """Get historical prices for a product"""
+    """
+    Get historical prices for a product.
+    
+    Each country/currency series is downsampled to at most `points` months,
+    so chart payloads stay bounded however dense the history is; `series`
+    reports how many points each series kept.
+    """
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
+    if method not in DOWNSAMPLING_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(DOWNSAMPLING_METHODS)}")
     
     from database import execute_query
     
-    country_filter = f"AND supplier_country = '{country}'" if country else ""
+    country_filter = "AND supplier_country = ?" if country else ""
     
     sql = f"""
     SELECT 
@@ -370,68 +552,449 @@ async def get_price_history(
         cost_currency,
         supplier_country
     FROM feed_products_sample
-    WHERE LOWER(product_name) LIKE '%{product_name.lower()}%'
+    WHERE LOWER(product_name) LIKE ?
       AND product_code LIKE '%HIST%'
       {country_filter}
     GROUP BY month, supplier_country, cost_currency
     ORDER BY month ASC
     """
-    data, error = execute_query(agent.db, sql)
+    params = [f"%{product_name.lower()}%"] + ([country] if country else [])
+    data, error = execute_query(agent.db, sql, params=params)
     
     if error:
         raise HTTPException(status_code=400, detail=error)
     
+    history, series = downsample_rows(data, points, method=method)
     return {
         "product": product_name,
-        "history": data,
-        "count": len(data)
+        "history": history,
+        "count": len(history),
+        "series": series,
+        "method": method
+    }
+
+
+@app.get("/products/{product_name}/history/insights")
+async def get_price_insights(
+    request: Request,
+    product_name: str,
+    country: Optional[str] = Query(None, description="Filter by country")
+):
+    """
+    Price insights for each matching product/country series: moving averages,
+    month-of-year seasonality, volatility, percentile bands and where the
+    latest price sits in its history
+    """
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    def build(compute_agent):
+        snapshot = price_analytics.snapshot(compute_agent.db)
+        matches = snapshot.find(product_name, country)
+        if not matches:
+            raise HTTPException(status_code=404, detail=f"No price history for '{product_name}'")
+        series = [snapshot.insights(i) for i in matches]
+        return {"product": product_name, "series": series, "count": len(series)}
+    
+    key = f"insights:{product_name.lower()}:{country or ''}"
+    return await respond_from_compute_agent(request, key, build)
+
+
+@app.get("/products/{product_name}/forecast")
+async def get_price_forecast(
+    request: Request,
+    product_name: str,
+    country: Optional[str] = Query(None, description="Filter by country")
+):
+    """
+    Precomputed monthly price forecasts with 80%/95% bands for each matching
+    product/country series (refreshed by `python main.py --forecast`)
+    """
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    def build(compute_agent):
+        from database import execute_query
+        
+        sql = """
+        SELECT product_name, supplier_country, cost_currency, month, horizon, method,
+               forecast, lower_80, upper_80, lower_95, upper_95, forecast_usd, generated_at
+        FROM price_forecasts
+        WHERE LOWER(product_name) LIKE ?
+        """
+        params = [f"%{product_name.lower()}%"]
+        if country:
+            sql += " AND supplier_country = ?"
+            params.append(country)
+        sql += " ORDER BY product_name, supplier_country, month"
+        data, error = execute_query(compute_agent.db, sql, params=params)
+        
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        if not data:
+            raise HTTPException(status_code=404, detail=f"No forecast for '{product_name}'")
+        
+        series: Dict[tuple, Dict[str, Any]] = {}
+        for row in data:
+            key = (row["product_name"], row["supplier_country"], row["cost_currency"])
+            entry = series.setdefault(key, {
+                "product": row["product_name"],
+                "country": row["supplier_country"],
+                "currency": row["cost_currency"],
+                "method": row["method"],
+                "generated_at": row["generated_at"],
+                "points": []
+            })
+            entry["points"].append({
+                k: row[k] for k in ("month", "horizon", "forecast", "lower_80", "upper_80",
+                                    "lower_95", "upper_95", "forecast_usd")
+            })
+        for entry in series.values():
+            entry["best_month"] = min(entry["points"], key=lambda p: p["forecast"])["month"]
+        
+        return {"product": product_name, "series": list(series.values()), "count": len(series)}
+    
+    key = f"forecast:{product_name.lower()}:{country or ''}"
+    return await respond_from_compute_agent(request, key, build)
+
+
+@app.get("/history/overview")
+async def get_history_overview(
+    request: Request,
+    sort: str = Query("volatility", description="volatility, seasonal_discount or current_percentile"),
+    limit: int = Query(20, ge=1, le=500)
+):
+    """Rank every product/country price series by volatility, seasonal swing or how cheap it is now"""
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    if sort not in OVERVIEW_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(OVERVIEW_SORTS)}")
+    
+    def build(compute_agent):
+        series = price_analytics.snapshot(compute_agent.db).overview(sort, limit)
+        return {"sort": sort, "series": series, "count": len(series)}
+    
+    return await respond_from_compute_agent(request, f"overview:{sort}:{limit}", build)
+
+
+@app.post("/prices/bulk")
+async def ingest_prices(request: Request):
+    """
+    Upsert a batch of price observations (JSON or CSV body).
+    
+    JSON is a list of objects (or {"observations": [...]}); CSV
+    (Content-Type: text/csv) needs a header row. Each observation needs
+    product_name, supplier_country, cost_per_kg and cost_currency, plus
+    optional supplier, observed_at (epoch or ISO date, default now) and
+    product metadata. A newer month rolls the offer's current row over to
+    history; the same month updates it in place. Batches from concurrent
+    requests are committed together in one transaction.
+    """
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    if not price_writer:
+        raise HTTPException(status_code=409, detail="Price ingestion needs the writable primary database")
+    
+    body = (await request.body()).decode("utf-8")
+    fmt = "csv" if "csv" in request.headers.get("content-type", "") else None
+    try:
+        observations = read_observations(body, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not observations:
+        raise HTTPException(status_code=400, detail="No price observations")
+    if len(observations) > PRICE_INGEST_MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {PRICE_INGEST_MAX_BATCH_ROWS} observations per request")
+    
+    return await asyncio.wrap_future(price_writer.submit(observations))
+
+
+@app.get("/subscribe")
+async def subscribe_price_changes(
+    request: Request,
+    product: Optional[List[str]] = Query(None, description="Product name contains (repeatable)"),
+    country: Optional[List[str]] = Query(None, description="Supplier country (repeatable)"),
+    supplier: Optional[List[str]] = Query(None, description="Supplier name contains (repeatable)"),
+    since: Optional[int] = Query(None, ge=0, description="Replay changes after this event id")
+):
+    """
+    Stream price changes as server-sent events.
+    
+    Each `price` event carries the product, supplier, country, old and new
+    price (plus USD and percent change) of an offer whose current price was
+    changed by bulk ingestion; only changes matching the filters are sent.
+    Reconnecting clients resume from their Last-Event-ID (or `since`).
+    """
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    if not price_feed or not price_feed.available:
+        raise HTTPException(status_code=409, detail="Price feed needs a file-backed, mutable database")
+    
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    subscription = price_feed.subscribe(product, country, supplier)
+    return StreamingResponse(
+        stream_changes(price_feed, subscription, since, PRICE_FEED_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _export_response(db_file: str, build_cursor, fmt: str, name: str) -> StreamingResponse:
+    """Stream a cursor from a dedicated read-only connection as Arrow IPC or Parquet"""
+    conn = open_export_connection(db_file)
+    try:
+        cursor = build_cursor(conn)
+    except QueryRejected as e:
+        conn.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.Error as e:
+        conn.close()
+        raise HTTPException(status_code=400, detail=f"Export query failed: {e}")
+    
+    def body():
+        try:
+            yield from stream_export(cursor, fmt)
+        finally:
+            conn.close()
+    
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+    )
+
+
+def _export_source(fmt: str) -> str:
+    """Database file to export from, after checking the format and pyarrow"""
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Export requires pyarrow: pip install pyarrow")
+    db_file = database_file(agent.db)
+    if not db_file:
+        raise HTTPException(status_code=409, detail="Export needs a file-backed database")
+    return db_file
+
+
+@app.get("/export/products")
+async def export_products(
+    format: str = Query("parquet", description="arrow (IPC stream) or parquet"),
+    product_name: Optional[str] = Query(None, description="Product name contains"),
+    product_type: Optional[str] = Query(None, description="Fodder, Concentrate or Additive"),
+    country: Optional[str] = Query(None, description="Supplier country"),
+    supplier: Optional[str] = Query(None, description="Supplier name contains"),
+    include_inactive: bool = Query(False, description="Include historical (inactive) price rows")
+):
+    """
+    Export a catalogue slice as an Arrow IPC stream or a Parquet file.
+    
+    Rows are streamed from the cursor in record batches, so slices of
+    millions of price rows never materialize as JSON. Load with
+    pandas.read_parquet or pyarrow.ipc.open_stream(...).read_pandas().
+    """
+    db_file = _export_source(format)
+    sql, params = catalogue_query(product_name, product_type, country, supplier, include_inactive)
+    return _export_response(db_file, lambda conn: conn.execute(sql, params), format, "products")
+
+
+@app.get("/export/query")
+async def export_query(
+    q: str = Query(..., description="Natural language query"),
+    format: str = Query("parquet", description="arrow (IPC stream) or parquet")
+):
+    """
+    Export the full result of a natural language query as Arrow or Parquet.
+    
+    The query is planned as for /query, then its SQL runs under the governor
+    with export limits (EXPORT_MAX_ROWS, EXPORT_TIME_BUDGET_MS) instead of
+    the interactive row cap.
+    """
+    db_file = _export_source(format)
+    async with admission.slot("llm"):
+        plan = await run_on_llm_agent(FeedProductsAgent.plan_query, q)
+    if not plan.get("sql"):
+        raise HTTPException(status_code=400, detail="This query is answered from the eligibility index; use /eligibility")
+    return _export_response(db_file, lambda conn: guarded_cursor(conn, plan["sql"]), format, "query")
+
+
+@app.get("/eligibility")
+async def get_eligible_products(
+    request: Request,
+    species: str = Query(..., description="cattle, sheep, goat or camel"),
+    sex: Optional[str] = Query(None, description="female or male"),
+    age_months: Optional[float] = Query(None, ge=0),
+    breeding_cycle: Optional[str] = Query(None, description="early, mid or late"),
+    lactation_cycle: Optional[str] = Query(None, description="early, mid or late"),
+    production_focus: Optional[str] = Query(None, description="e.g. dairy, beef, meat, wool"),
+    country: Optional[str] = Query(None, description="Only products offered in this supplier country"),
+    product_type: Optional[str] = Query(None, description="Fodder, Concentrate, or Additive"),
+    product_name: Optional[str] = Query(None, description="Product name contains"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Products allowed for an animal profile, cheapest current offer first.
+    
+    Answered from precomputed restriction bitmaps (rebuilt after writes):
+    each product carries the tightest max_perc_feed / max_perc_conc of the
+    restrictions matching the profile; products a matching restriction marks
+    ineligible are listed separately.
+    """
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    profile = {
+        "species": species,
+        "sex": sex,
+        "age_months": age_months,
+        "breeding_cycle": breeding_cycle,
+        "lactation_cycle": lactation_cycle,
+        "production_focus": production_focus,
+    }
+    
+    def build(compute_agent):
+        result = eligibility_index.snapshot(compute_agent.db).lookup(
+            profile, country=country, product_type=product_type, product_name=product_name, limit=limit
+        )
+        return {
+            "profile": {k: v for k, v in profile.items() if v is not None},
+            **result,
+            "count": len(result["products"])
+        }
+    
+    key = f"eligibility:{sorted(request.query_params.items())}"
+    return await respond_from_compute_agent(request, key, build)
+
+
+@app.post("/ration/optimize")
+async def optimize_ration(request: RationRequest):
+    """
+    Least-cost ration for one animal group.
+    
+    Mixes the cheapest current offer of every feed with reference nutrient
+    values, subject to the group's nutrient targets and the inclusion limits
+    in feed_product_restrictions. Shares are % of dry matter.
+    """
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    if not SCIPY_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Ration optimization requires scipy")
+    
+    group = request.model_dump()
+    return await run_on_compute_agent(
+        lambda compute_agent: ration_optimizer.matrix(compute_agent.db, request.country).solve(group)
+    )
+
+
+@app.post("/ration/batch")
+async def optimize_ration_batch(request: RationBatchRequest):
+    """Least-cost rations for many animal groups, reusing one feed matrix per country"""
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    if not SCIPY_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Ration optimization requires scipy")
+    
+    # Up to a thousand linprog solves: on the compute thread, never the event loop
+    groups = [g.model_dump() for g in request.groups]
+    results = await run_on_compute_agent(
+        lambda compute_agent: ration_optimizer.solve_batch(compute_agent.db, groups, request.country)
+    )
+    return {
+        "results": results,
+        "count": len(results),
+        "feasible": sum(1 for r in results if r["feasible"])
+    }
+
+
+@app.get("/admin/admission")
+async def get_admission_status():
+    """Current load on each admission lane (active, waiting, average service time)"""
+    return {**admission.status(), "queries_in_flight": query_flights.in_flight()}
+
+
+@app.get("/admin/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=500, description="Maximum entries to return"),
+    origin: Optional[str] = Query(None, description="Filter by origin (gemini, fallback, endpoint)"),
+    min_ms: float = Query(0.0, ge=0, description="Only entries slower than this many milliseconds")
+):
+    """Browse the slow-query log, newest first, with captured query plans"""
+    entries = slow_query_log.read(limit=limit, origin=origin, min_ms=min_ms)
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "entries": entries,
+        "count": len(entries)
     }
 
 
 # Example queries endpoint for UI
 @app.get("/examples")
-async def get_example_queries():
+async def get_example_queries(request: Request):
     """Get example queries for UI suggestions"""
-    return {
-        "examples": [
-            {
-                "en": "Who is selling the cheapest Wheat Straw?",
-                "ar": "من يبيع أرخص قش القمح؟",
-                "category": "price"
-            },
-            {
-                "en": "What is the average price of Barley in UAE?",
-                "ar": "ما هو متوسط سعر الشعير في الإمارات؟",
-                "category": "average"
-            },
-            {
-                "en": "Which suppliers sell Alfalfa hay in Saudi Arabia?",
-                "ar": "من يبيع تبن البرسيم في السعودية؟",
-                "category": "supplier"
-            },
-            {
-                "en": "When is the best time to buy Corn?",
-                "ar": "ما هو أفضل وقت لشراء الذرة؟",
-                "category": "historical"
-            },
-            {
-                "en": "List all concentrates in Egypt",
-                "ar": "قائمة بجميع المركزات في مصر",
-                "category": "list"
-            },
-            {
-                "en": "What restrictions apply to Urea for cattle?",
-                "ar": "ما هي قيود استخدام اليوريا للماشية؟",
-                "category": "restrictions"
-            }
-        ]
-    }
+    def build():
+        return {
+            "examples": [
+                {
+                    "en": "Who is selling the cheapest Wheat Straw?",
+                    "ar": "من يبيع أرخص قش القمح؟",
+                    "category": "price"
+                },
+                {
+                    "en": "What is the average price of Barley in UAE?",
+                    "ar": "ما هو متوسط سعر الشعير في الإمارات؟",
+                    "category": "average"
+                },
+                {
+                    "en": "Which suppliers sell Alfalfa hay in Saudi Arabia?",
+                    "ar": "من يبيع تبن البرسيم في السعودية؟",
+                    "category": "supplier"
+                },
+                {
+                    "en": "When is the best time to buy Corn?",
+                    "ar": "ما هو أفضل وقت لشراء الذرة؟",
+                    "category": "historical"
+                },
+                {
+                    "en": "List all concentrates in Egypt",
+                    "ar": "قائمة بجميع المركزات في مصر",
+                    "category": "list"
+                },
+                {
+                    "en": "What restrictions apply to Urea for cattle?",
+                    "ar": "ما هي قيود استخدام اليوريا للماشية؟",
+                    "category": "restrictions"
+                },
+                {
+                    "en": "Which feeds are allowed for female dairy cattle, 18 months, early lactation?",
+                    "ar": "ما الأعلاف المسموحة للأبقار الحلوب عمر 18 شهر؟",
+                    "category": "eligibility"
+                }
+            ]
+        }
+    
+    return response_cache.respond(request, "examples", app.version, build)
 
 
-def run_server(host: str = "0.0.0.0", port: int = 8000):
-    """Run the API server"""
+def run_server(host: str = "0.0.0.0", port: int = 8000, workers: int = 1):
+    """
+    Run the API server
+    
+    With workers > 1 uvicorn preforks that many processes; each builds its
+    own agent and database connection in the lifespan hook, and they share
+    generated plans and results through the on-disk query cache. A fresh
+    database is seeded here first, so the workers only ever open it.
+    """
     import uvicorn
-    uvicorn.run(app, host=host, port=port)
+    if workers > 1:
+        ensure_database()
+        uvicorn.run("api:app", host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
 
 
 if __name__ == "__main__":
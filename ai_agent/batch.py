@@ -0,0 +1,160 @@
+"""
+Batch query mode for the Feed Products AI Agent
+Answers a JSONL stream of questions with a pool of worker threads, each with
+its own agent (and SQLite connection) reused across questions, and writes one
+JSONL result per question in input order
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from config import BATCH_WORKERS
+
+# Questions in flight per worker; bounds memory when reading an endless stdin
+QUEUE_DEPTH = 4
+
+
+def read_questions(lines: Iterable[str]) -> Iterator[Tuple[Any, Optional[str], Optional[str]]]:
+    """
+    (id, query, error) per non-blank input line.
+
+    A line is a JSON object with "query" (or "question") and an optional
+    "id", a JSON string, or plain text. Lines without an id are numbered
+    from 1; unreadable lines yield an error instead of a query.
+    """
+    number = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = line if not line.startswith(("{", "[")) else None
+        if isinstance(record, str):
+            yield number, record, None
+        elif isinstance(record, dict) and isinstance(record.get("query", record.get("question")), str):
+            yield record.get("id", number), record.get("query", record.get("question")), None
+        else:
+            yield number, None, 'Expected a JSON object with "query", a JSON string or plain text'
+
+
+def result_record(question_id: Any, query: str, result: Dict[str, Any], worker: str) -> Dict[str, Any]:
+    """One output line: the agent result without its UI spec, plus id, row count and worker"""
+    return {
+        "id": question_id,
+        "query": query,
+        "success": result["success"],
+        "language": result["language"],
+        "response": result["response"],
+        "sql": result["sql"],
+        "row_count": len(result["data"]),
+        "data": result["data"],
+        "error": result.get("error"),
+        "timings": result.get("timings", {}),
+        "worker": worker,
+    }
+
+
+def _answer(agent, question_id: Any, query: str) -> Dict[str, Any]:
+    return result_record(question_id, query, agent.process_query(query), threading.current_thread().name)
+
+
+class AgentPool:
+    """
+    Worker threads that each own one agent for the life of the pool.
+
+    SQLite connections belong to the thread that opened them, so every
+    worker builds its own agent on first use (or up front with warm());
+    the Gemini client, the plan and result cache file and the process-wide
+    metrics are shared. Time is dominated by LLM round trips, so threads
+    overlap well despite the GIL.
+    """
+
+    def __init__(self, agent_factory: Callable[[], Any], workers: int = BATCH_WORKERS, name: str = "agent"):
+        self.agent_factory = agent_factory
+        self.workers = max(1, workers)
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+
+    def _agent(self):
+        agent = getattr(self._local, "agent", None)
+        if agent is None:
+            agent = self._local.agent = self.agent_factory()
+        return agent
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        """Run fn(agent, *args) on whichever worker is free"""
+        return self._pool.submit(lambda: fn(self._agent(), *args))
+
+    def _on_every_worker(self, action: Callable[[], None]):
+        barrier = threading.Barrier(self.workers)
+
+        def run():
+            action()
+            # Hold this thread until every worker has taken one task
+            barrier.wait()
+        for future in [self._pool.submit(run) for _ in range(self.workers)]:
+            future.result()
+
+    def warm(self):
+        """Build every worker's agent now instead of on its first question"""
+        self._on_every_worker(self._agent)
+
+    def close(self):
+        """Close each worker's agent on its own thread (the only one allowed to use its connection)"""
+        def close_local():
+            agent = getattr(self._local, "agent", None)
+            if agent is not None:
+                agent.close()
+                self._local.agent = None
+        self._on_every_worker(close_local)
+        self._pool.shutdown()
+
+
+class BatchRunner:
+    """Answers a stream of questions on an AgentPool, writing results in input order"""
+
+    def __init__(self, agent_factory: Callable[[], Any], workers: int = BATCH_WORKERS):
+        self.agent_factory = agent_factory
+        self.workers = max(1, workers)
+
+    def run(self, questions: Iterable[Tuple[Any, Optional[str], Optional[str]]],
+            out: TextIO, progress: Optional[TextIO] = None) -> Dict[str, Any]:
+        """Answer every question, writing JSONL to out in input order; returns a summary"""
+        summary = {"questions": 0, "succeeded": 0, "failed": 0, "invalid": 0, "seconds": 0.0}
+        started = time.perf_counter()
+        pending: "deque[Future]" = deque()
+
+        def write(record: Dict[str, Any]):
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            summary["questions"] += 1
+            summary["succeeded" if record["success"] else "failed"] += 1
+            if progress and summary["questions"] % 100 == 0:
+                print(f"  … {summary['questions']} answered", file=progress, flush=True)
+
+        agents = AgentPool(self.agent_factory, self.workers, name="batch")
+        try:
+            for question_id, query, error in questions:
+                if error:
+                    summary["invalid"] += 1
+                    done: Future = Future()
+                    done.set_result({"id": question_id, "query": None, "success": False, "error": error})
+                    pending.append(done)
+                else:
+                    pending.append(agents.submit(_answer, question_id, query))
+                while len(pending) >= self.workers * QUEUE_DEPTH or (pending and pending[0].done()):
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+        finally:
+            agents.close()
+        out.flush()
+
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        return summary
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Feed Products AI Agent
+Times ingestion, SQL generation, execution, formatting and end-to-end
+queries at several catalogue sizes and writes JSON comparable across commits
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import DB_DIR, HISTORY_CHART_POINTS
+from database import (
+    create_schema,
+    parse_tuple_values,
+    load_seed_data_simple,
+    load_historical_data,
+    load_restrictions,
+    initialize_database,
+    execute_query
+)
+from forecasting import run_forecasts
+from slow_query_log import slow_query_log
+
+# One representative question per fallback intent template
+INTENT_QUESTIONS = {
+    "cheapest": "Who is selling the cheapest Wheat Straw?",
+    "average": "What is the average price of Barley in UAE?",
+    "trend": "Show price trends for Wheat Straw in Saudi Arabia",
+    "best_time": "When is the best time to buy Alfalfa hay?",
+    "suppliers": "Which suppliers sell Alfalfa hay in Saudi Arabia?",
+    "list": "List all concentrates in Egypt",
+    "restrictions": "What restrictions apply to Urea?",
+    "forecast": "Forecast Wheat Straw prices",
+    "general": "Corn prices",
+}
+
+ARABIC_QUESTIONS = [
+    "من يبيع أرخص قش القمح؟",
+    "ما هو متوسط سعر الشعير في الإمارات؟",
+]
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiModel:
+    """Stands in for the Gemini client, answering with the fallback SQL as JSON"""
+
+    _QUESTION = re.compile(r'Convert this question to SQL: "(.*)"')
+
+    def __init__(self, agent, latency_s: float = 0.0):
+        self.agent = agent
+        self.latency_s = latency_s
+
+    def generate_content(self, parts, generation_config=None):
+        match = self._QUESTION.search(parts[-1])
+        question = match.group(1) if match else ""
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        result = self.agent._generate_sql_fallback(question, "en")
+        payload = {k: result[k] for k in ("sql", "explanation", "response_template")}
+        return _StubResponse("```json\n" + json.dumps(payload) + "\n```")
+
+
+def _quiet():
+    """Silence the loaders' progress prints while timing"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def time_it(fn: Callable[[], Any], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    """Run fn repeatedly and return timing statistics in milliseconds"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "min_ms": round(samples[0], 4),
+    }
+
+
+def build_seed_database() -> sqlite3.Connection:
+    """Build the seed catalogue in memory"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    with _quiet():
+        create_schema(conn)
+        load_seed_data_simple(conn)
+        load_historical_data(conn)
+        load_restrictions(conn)
+        run_forecasts(conn)
+    return conn
+
+
+def scale_catalogue(base: sqlite3.Connection, factor: int) -> sqlite3.Connection:
+    """
+    Copy the base catalogue and replicate its products factor times.
+
+    Copies get distinct product codes and deterministically perturbed prices
+    so index selectivity and sort work grow with the catalogue.
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    base.backup(conn)
+
+    max_id = conn.execute("SELECT MAX(id) FROM feed_products_sample").fetchone()[0]
+    for copy in range(1, factor):
+        conn.execute("""
+        INSERT INTO feed_products_sample
+        (product_name, product_code, name, type, cost_per_kg, cost_currency,
+         supplier, supplier_country, supplier_email, supplier_phone, supplier_address,
+         is_standard_product, created_at, is_active)
+        SELECT product_name, product_code || '-X' || ?, name, type,
+               ROUND(cost_per_kg * (1 + ((id * 7 + ?) % 21 - 10) / 100.0), 4), cost_currency,
+               supplier, supplier_country, supplier_email, supplier_phone, supplier_address,
+               is_standard_product, created_at, is_active
+        FROM feed_products_sample
+        WHERE id <= ?
+        """, (copy, copy, max_id))
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+def _sample_tuples(limit: int = 500) -> List[str]:
+    """Raw value tuples from the market seed file for the parser benchmark"""
+    content = (DB_DIR / "seed_data_market_products.sql").read_text(encoding="utf-8")
+    tuples = re.findall(r"^\((.*)\)[,;]\s*$", content, re.MULTILINE)
+    return tuples[:limit]
+
+
+def run_ingestion_benchmarks(iterations: int) -> List[Dict[str, Any]]:
+    """Benchmarks that do not depend on catalogue size"""
+    results = []
+
+    tuples = _sample_tuples()
+    stats = time_it(lambda: [parse_tuple_values(t) for t in tuples], iterations * 10)
+    results.append({"name": "parse_tuple_values", "size": len(tuples), **stats})
+
+    def load_seed():
+        conn = sqlite3.connect(":memory:")
+        with _quiet():
+            create_schema(conn)
+            load_seed_data_simple(conn)
+        conn.close()
+
+    results.append({"name": "load_seed_data_simple", "size": 1, **time_it(load_seed, iterations)})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+
+        def init_db():
+            with _quiet():
+                initialize_database(force_recreate=True, db_path=db_path).close()
+
+        results.append({"name": "initialize_database", "size": 1, **time_it(init_db, iterations)})
+
+    # Chart downsampling: ten years of daily prices for ten countries, down to HISTORY_CHART_POINTS each
+    from downsampling import downsample_rows
+    days = [str(day) for day in np.arange("2016-01-01", "2026-01-01", dtype="datetime64[D]")]
+    walk = np.cumsum(np.random.default_rng(0).normal(size=len(days))) + 100
+    rows = [{"month": day, "supplier_country": f"C{c}", "cost_currency": "USD", "avg_price": float(walk[d] + c)}
+            for d, day in enumerate(days) for c in range(10)]
+    for method in ("lttb", "minmax"):
+        stats = time_it(lambda method=method: downsample_rows(rows, HISTORY_CHART_POINTS, method=method), iterations)
+        results.append({"name": f"downsample_rows[{method}]", "size": len(rows), **stats})
+
+    return results
+
+
+def build_synthetic_database(rows: int, seed: int) -> sqlite3.Connection:
+    """Build a generated catalogue of about `rows` price rows in memory"""
+    from catalogue_generator import generate_catalogue
+
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    generate_catalogue(conn, rows, seed=seed)
+    run_forecasts(conn)
+    return conn
+
+
+def run_sized_benchmarks(conn: sqlite3.Connection, iterations: int) -> List[Dict[str, Any]]:
+    """Benchmarks on one catalogue; closes the connection when done"""
+    with _quiet():
+        from agent import FeedProductsAgent
+
+    rows = conn.execute("SELECT COUNT(*) FROM feed_products_sample").fetchone()[0]
+    results = []
+
+    with _quiet():
+        agent = FeedProductsAgent(db_connection=conn)
+    agent.model = None
+    # Time generation and execution, not lookups in a cache warmed by earlier runs
+    agent.query_cache = None
+
+    # SQL generation (pattern-based fallback)
+    questions = list(INTENT_QUESTIONS.values())
+    stats = time_it(lambda: [agent._generate_sql_fallback(q, "en") for q in questions], iterations * 10)
+    results.append({"name": "generate_sql_fallback", "size": rows, **stats})
+
+    # Execution of each intent template
+    result_sets = {}
+    for intent, question in INTENT_QUESTIONS.items():
+        sql = agent._generate_sql_fallback(question, "en")["sql"]
+        result_sets[intent] = execute_query(conn, sql, origin="fallback")[0]
+        stats = time_it(lambda sql=sql: execute_query(conn, sql, origin="fallback"), iterations)
+        results.append({"name": f"execute_query[{intent}]", "size": rows, **stats})
+
+    # Response formatting in both languages
+    for language in ("en", "ar"):
+        stats = time_it(
+            lambda language=language: [
+                agent._format_results(data, "Results:", language) for data in result_sets.values()
+            ],
+            iterations
+        )
+        results.append({"name": f"format_results[{language}]", "size": rows, **stats})
+
+    # Structured search on the columnar snapshot
+    from catalogue_snapshot import CatalogueSnapshot, load_active_products
+    catalogue = CatalogueSnapshot([tuple(row) for row in load_active_products(conn)])
+    stats = time_it(lambda: catalogue.search(product_name="straw", country="UAE", max_price=5.0, limit=20), iterations * 10)
+    results.append({"name": "search_snapshot", "size": rows, **stats})
+    
+    # Animal-profile eligibility on the restriction bitmaps
+    from eligibility_index import EligibilitySnapshot, load_restriction_rules
+    eligibility = EligibilitySnapshot([tuple(row) for row in load_restriction_rules(conn)],
+                                      [tuple(row) for row in load_active_products(conn)])
+    profile = {"species": "cattle", "sex": "female", "age_months": 18, "lactation_cycle": "early", "production_focus": "dairy"}
+    stats = time_it(lambda: eligibility.lookup(profile, limit=20), iterations * 10)
+    results.append({"name": "eligibility_lookup", "size": rows, **stats})
+    
+    # Price analytics: full snapshot build, then per-request lookups on it
+    from analytics import AnalyticsSnapshot, load_price_histories
+    stats = time_it(lambda: AnalyticsSnapshot(load_price_histories(conn)), iterations)
+    results.append({"name": "analytics_snapshot", "size": rows, **stats})
+    snapshot = AnalyticsSnapshot(load_price_histories(conn))
+    stats = time_it(lambda: [snapshot.insights(i) for i in snapshot.find("wheat straw")], iterations * 10)
+    results.append({"name": "analytics_insights", "size": rows, **stats})
+    stats = time_it(lambda: run_forecasts(conn), iterations)
+    results.append({"name": "run_forecasts", "size": rows, **stats})
+    
+    # Columnar export of every price row, current and historical
+    from export import PYARROW_AVAILABLE, catalogue_query, stream_export
+    if PYARROW_AVAILABLE:
+        sql, params = catalogue_query(include_inactive=True)
+        for fmt in ("arrow", "parquet"):
+            stats = time_it(lambda fmt=fmt: sum(len(chunk) for chunk in stream_export(conn.execute(sql, params), fmt)),
+                            iterations)
+            results.append({"name": f"export[{fmt}]", "size": rows, **stats})
+
+    # End-to-end with the LLM stubbed out
+    agent.model = StubGeminiModel(agent)
+    all_questions = questions + ARABIC_QUESTIONS
+    stats = time_it(lambda: [agent.process_query(q) for q in all_questions], iterations)
+    results.append({"name": "process_query[stub_llm]", "size": rows, **stats})
+    
+    # Bulk price ingestion: roll every active offer over to a new month (mutates the catalogue, so last)
+    from price_ingest import apply_price_updates
+    offers = conn.execute("""
+    SELECT DISTINCT product_name, supplier, supplier_country, cost_per_kg, cost_currency
+    FROM feed_products_sample WHERE is_active = 1 AND cost_per_kg IS NOT NULL LIMIT 1000
+    """).fetchall()
+    months = iter(range(1, 10_000))
+    
+    def ingest():
+        observed_at = 1798761600 + next(months) * 31 * 86400
+        batch = [dict(zip(("product_name", "supplier", "supplier_country", "cost_per_kg", "cost_currency"), offer),
+                      observed_at=observed_at) for offer in offers]
+        apply_price_updates(conn, [batch])
+    stats = time_it(ingest, iterations)
+    results.append({"name": f"apply_price_updates[{len(offers)}]", "size": rows, **stats})
+
+    conn.close()
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return descriptions of benchmarks whose median regressed beyond tolerance"""
+    previous = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["name"], result["size"]))
+        if not before or before["median_ms"] <= 0:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1
+        if change > tolerance:
+            regressions.append(
+                f"{result['name']} (size {result['size']}): "
+                f"{before['median_ms']:.3f}ms -> {result['median_ms']:.3f}ms (+{change:.0%})"
+            )
+    return regressions
+
+
+def run_benchmarks(sizes: List[int], iterations: int, synthetic: bool = False, seed: int = 42) -> Dict[str, Any]:
+    """
+    Run the full suite and return a JSON-serializable report
+    
+    Sizes are multiples of the seed catalogue, or generated row counts
+    when synthetic is set.
+    """
+    # Keep benchmark statements out of the production slow-query log
+    slow_query_log.threshold_ms = -1
+
+    results = run_ingestion_benchmarks(iterations)
+    base = None if synthetic else build_seed_database()
+    for size in sizes:
+        if synthetic:
+            print(f"⏱️  Benchmarking synthetic catalogue of {size:,} rows...", file=sys.stderr)
+            conn = build_synthetic_database(size, seed)
+        else:
+            print(f"⏱️  Benchmarking catalogue x{size}...", file=sys.stderr)
+            conn = scale_catalogue(base, size)
+        results.extend(run_sized_benchmarks(conn, iterations))
+    if base:
+        base.close()
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "sizes": sizes,
+        "synthetic": synthetic,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Feed Products AI Agent hot paths")
+    parser.add_argument("--sizes", type=str, default="1,10,50",
+                        help="Comma-separated catalogue multipliers of the seed data (default: 1,10,50)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Treat sizes as row counts for the synthetic catalogue generator")
+    parser.add_argument("--seed", type=int, default=42, help="Generator seed for --synthetic (default: 42)")
+    parser.add_argument("--iterations", "-n", type=int, default=5, help="Timed iterations per benchmark (default: 5)")
+    parser.add_argument("--output", "-o", type=str, help="Write the JSON report to this file")
+    parser.add_argument("--compare", type=str, help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed median slowdown before failing the comparison (default: 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run_benchmarks(sizes, args.iterations, synthetic=args.synthetic, seed=args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+        print(f"✅ Wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ No regressions beyond tolerance", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
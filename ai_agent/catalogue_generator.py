@@ -0,0 +1,260 @@
+"""
+Synthetic catalogue generator for scale testing
+Produces suppliers, products, seasonal monthly price histories and
+restrictions at a chosen size and seed through the bulk-insert path
+"""
+
+import math
+import random
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from database import create_schema, bulk_load, bulk_insert_products, bulk_insert_restrictions
+
+# Country, code, currency, units per USD, phone prefix, email TLD, cities
+COUNTRIES = [
+    ("UAE", "UAE", "AED", 3.67, "+971", "ae", ["Dubai", "Abu Dhabi", "Sharjah", "Al Ain", "Ras Al Khaimah"]),
+    ("Saudi Arabia", "KSA", "SAR", 3.75, "+966", "sa", ["Riyadh", "Jeddah", "Dammam", "Qassim", "Al Kharj"]),
+    ("Qatar", "QAT", "QAR", 3.64, "+974", "qa", ["Doha", "Al Wakrah", "Al Khor"]),
+    ("Egypt", "EGY", "EGP", 30.9, "+20", "eg", ["Cairo", "Alexandria", "Giza", "Mansoura", "Beni Suef"]),
+    ("Bahrain", "BHR", "USD", 1.0, "+973", "bh", ["Manama", "Muharraq"]),
+    ("Kuwait", "KWT", "USD", 1.0, "+965", "kw", ["Kuwait City", "Jahra"]),
+    ("Oman", "OMN", "USD", 1.0, "+968", "om", ["Muscat", "Salalah", "Sohar"]),
+    ("Jordan", "JOR", "USD", 1.0, "+962", "jo", ["Amman", "Irbid", "Zarqa"]),
+    ("Lebanon", "LBN", "USD", 1.0, "+961", "lb", ["Beirut", "Zahle"]),
+    ("Iraq", "IRQ", "USD", 1.0, "+964", "iq", ["Baghdad", "Basra", "Erbil"]),
+    ("Morocco", "MAR", "USD", 1.0, "+212", "ma", ["Casablanca", "Meknes", "Fes"]),
+    ("Tunisia", "TUN", "USD", 1.0, "+216", "tn", ["Tunis", "Sfax"]),
+    ("Algeria", "DZA", "USD", 1.0, "+213", "dz", ["Algiers", "Oran", "Setif"]),
+    ("Libya", "LBY", "USD", 1.0, "+218", "ly", ["Tripoli", "Benghazi"]),
+]
+
+# Relative share of suppliers per country (Gulf markets dominate)
+COUNTRY_WEIGHTS = [8, 8, 3, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+
+# Standard products from the seed data: code, name, type
+PRODUCTS = [
+    ("FP-001", "Alfalfa hay (mid-bloom)", "Fodder"), ("FP-002", "Wheat Straw", "Fodder"),
+    ("FP-003", "Triticale Silage", "Fodder"), ("FP-004", "Oat Hay", "Fodder"),
+    ("FP-005", "Barley", "Fodder"), ("FP-006", "Corn", "Fodder"),
+    ("FP-007", "Soybean", "Fodder"), ("FP-008", "Wheat", "Fodder"),
+    ("FP-009", "Cotton Seed", "Fodder"), ("FP-010", "Beet Pulp", "Fodder"),
+    ("FP-011", "Wheat Bran", "Fodder"), ("FP-012", "White Hay", "Fodder"),
+    ("FP-013", "Red Hay", "Fodder"), ("FP-014", "Alfalfa", "Fodder"),
+    ("FP-015", "Fermented Corn", "Fodder"), ("FP-016", "Soybean Hulls", "Fodder"),
+    ("FP-017", "Barley - raw", "Concentrate"), ("FP-018", "Barley - Flakes", "Concentrate"),
+    ("FP-019", "Soya Bean Meal", "Concentrate"), ("FP-020", "Steamed Corn Flake", "Concentrate"),
+    ("FP-021", "Steamed Barley Flakes", "Concentrate"), ("FP-022", "Barley grain", "Concentrate"),
+    ("FP-023", "Soybean husk", "Concentrate"), ("FP-024", "Molasses", "Additive"),
+    ("FP-025", "Alfalfa Hay", "Fodder"), ("FP-026", "Wheat grain", "Concentrate"),
+    ("FP-027", "Cotton meal", "Concentrate"), ("FP-028", "Beetroot pellets", "Concentrate"),
+    ("FP-029", "Limestone", "Additive"), ("FP-030", "Maize grain", "Concentrate"),
+    ("FP-031", "Corn Silage", "Concentrate"), ("FP-032", "Corn Gluten Meal", "Concentrate"),
+    ("FP-033", "Sesame seed husk", "Concentrate"), ("FP-034", "Salt", "Additive"),
+    ("FP-035", "Urea", "Additive"),
+]
+
+# USD price range per kg by product type
+PRICE_RANGES = {
+    "Fodder": (0.25, 0.50),
+    "Concentrate": (0.50, 0.75),
+    "Additive": (0.75, 1.50),
+}
+
+# Known seasonal patterns: (name keyword, amplitude, peak month)
+SEASONALITY = [
+    ("wheat straw", 0.08, 12),   # cheapest around harvest (May-July)
+    ("barley", 0.07, 1),         # dearer in winter (Dec-Feb)
+    ("alfalfa", 0.08, 7),        # dearer in summer (Jun-Aug)
+]
+
+MARKET_QUALIFIERS = ["", "", "Premium ", "Organic ", "Imported ", "Local ", "Grade A "]
+SUPPLIER_SUFFIXES = ["Feed Company", "Agri Trading", "Fodder Supplies", "Livestock Nutrition", "Feed Mills", "Grain Traders"]
+
+# Restriction templates: (name keyword, species, sex, min_age, max_age, lactation, focus, max_feed, max_conc)
+RESTRICTION_RULES = [
+    ("barley - raw", "cattle", None, 0, 12, None, None, 30.0, None),
+    ("barley - raw", "sheep", None, None, None, None, None, 20.0, None),
+    ("barley - raw", "goat", None, None, None, None, None, 20.0, None),
+    ("soya bean meal", "cattle", "female", None, None, "early", "dairy", None, 25.0),
+    ("urea", "cattle", None, 12, None, None, None, 1.0, None),
+    ("molasses", "cattle", None, None, None, None, None, 10.0, None),
+]
+
+SPECIES = ["cattle", "sheep", "goat", "camel"]
+CYCLES = [None, "early", "mid", "late"]
+FOCUS = {"cattle": [None, "dairy", "beef"], "sheep": [None, "meat", "wool"], "goat": [None, "dairy", "meat"], "camel": [None, "dairy"]}
+
+# Last month of generated history (matches the seed data)
+END_YEAR, END_MONTH = 2026, 1
+
+
+def month_timestamps(months: int) -> List[Tuple[int, int]]:
+    """Unix timestamps and month-of-year for months ending at the END month"""
+    stamps = []
+    year, month = END_YEAR, END_MONTH
+    for _ in range(months):
+        stamps.append((int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp()), month))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return list(reversed(stamps))
+
+
+def seasonal_profile(product_name: str, rng: random.Random) -> List[float]:
+    """Multiplier for each month of the year (index 1-12)"""
+    amplitude, peak = rng.uniform(0.02, 0.05), rng.randint(1, 12)
+    lowered = product_name.lower()
+    for keyword, known_amplitude, known_peak in SEASONALITY:
+        if keyword in lowered:
+            amplitude, peak = known_amplitude, known_peak
+            break
+    return [0.0] + [1 + amplitude * math.cos(2 * math.pi * (m - peak) / 12) for m in range(1, 13)]
+
+
+class CatalogueGenerator:
+    """Deterministic generator of synthetic catalogue rows"""
+
+    def __init__(self, rows: int, seed: int = 42, months: int = 25):
+        self.target_rows = max(1, rows)
+        self.months = max(1, months)
+        self.rng = random.Random(seed)
+        self.timestamps = month_timestamps(self.months)
+        self.base_prices = {code: self.rng.uniform(*PRICE_RANGES[ptype]) for code, _, ptype in PRODUCTS}
+        self.seasonality = {code: seasonal_profile(name, self.rng) for code, name, _ in PRODUCTS}
+        self.suppliers_created = 0
+        self._supplier_names = set()
+
+    def _code(self, base: str) -> str:
+        return f"{base}-HIST" if self.months > 1 else base
+
+    def _series(self, product: Tuple[str, str, str], country: tuple, markup: float,
+                code: str, name: str, supplier_fields: Tuple) -> Iterator[Tuple]:
+        """Monthly price rows for one product/country/supplier series"""
+        rng = self.rng
+        product_code, _, ptype = product
+        _, _, currency, rate, _, _, _ = country
+        base = self.base_prices[product_code] * rate * markup
+        season = self.seasonality[product_code]
+        drift = rng.uniform(-0.05, 0.10) / max(1, self.months - 1)
+        last = self.months - 1
+        supplier, country_name, email, phone, address, is_standard = supplier_fields
+
+        for index, (ts, month) in enumerate(self.timestamps):
+            price = base * season[month] * (1 + drift * index) * (1 + rng.gauss(0, 0.015))
+            yield (name, code, name, ptype, round(price, 2), currency,
+                   supplier, country_name, email, phone, address,
+                   is_standard, ts, 1 if index == last else 0)
+
+    def _new_supplier(self, country: tuple) -> Tuple[str, str, str, str]:
+        """Create a unique supplier name with contact details"""
+        country_name, _, _, _, dial, tld, cities = country
+        while True:
+            city = self.rng.choice(cities)
+            name = f"{city} {self.rng.choice(SUPPLIER_SUFFIXES)}"
+            if name in self._supplier_names:
+                name = f"{name} {len(self._supplier_names) + 1}"
+            if name not in self._supplier_names:
+                break
+        self._supplier_names.add(name)
+        slug = re.sub(r"[^a-z0-9]", "", name.lower())[:24]
+        phone = f"{dial}-{self.rng.randint(1, 9)}-{self.rng.randint(100, 999)}-{self.rng.randint(1000, 9999)}"
+        return name, f"sales@{slug}.{tld}", phone, f"{city} Industrial Area, {country_name}"
+
+    def product_rows(self) -> Iterator[Tuple]:
+        """Yield product tuples in PRODUCT_COLUMNS order until the target is reached"""
+        series_budget = max(1, self.target_rows // self.months)
+
+        # Standard reference products for every country
+        for country in COUNTRIES:
+            for product in PRODUCTS:
+                if series_budget <= 0:
+                    return
+                series_budget -= 1
+                yield from self._series(
+                    product, country, 1.0, self._code(product[0]), product[1],
+                    (None, country[0], None, None, None, 1)
+                )
+
+        # Market suppliers with 10-35 products each
+        while series_budget > 0:
+            country = self.rng.choices(COUNTRIES, weights=COUNTRY_WEIGHTS)[0]
+            self.suppliers_created += 1
+            supplier, email, phone, address = self._new_supplier(country)
+            markup = self.rng.uniform(0.95, 1.25)
+            count = min(series_budget, self.rng.randint(10, len(PRODUCTS)))
+            series_budget -= count
+
+            for index, product in enumerate(self.rng.sample(PRODUCTS, count), 1):
+                name = f"{self.rng.choice(MARKET_QUALIFIERS)}{product[1]}"
+                code = self._code(f"MP-{country[1]}-{self.suppliers_created:05d}-{index:03d}")
+                yield from self._series(
+                    product, country, markup * self.rng.uniform(0.97, 1.05), code, name,
+                    (supplier, country[0], email, phone, address, 0)
+                )
+
+    def restriction_rows(self, conn: sqlite3.Connection) -> Iterator[Tuple]:
+        """Yield restriction tuples for current concentrate and additive products"""
+        products = conn.execute("""
+        SELECT id, product_name FROM feed_products_sample
+        WHERE is_active = 1 AND type IN ('Concentrate', 'Additive')
+        """).fetchall()
+        rng = self.rng
+        for product_id, product_name in products:
+            lowered = product_name.lower()
+            for keyword, species, sex, min_age, max_age, lactation, focus, max_feed, max_conc in RESTRICTION_RULES:
+                if keyword in lowered:
+                    yield (product_id, species, sex, min_age, max_age, None, lactation, focus, 1, max_feed, max_conc, 1)
+
+            if rng.random() < 0.5:
+                species = rng.choice(SPECIES)
+                min_age = rng.choice([None, 0, 6, 12, 24])
+                max_age = None if min_age is None or rng.random() < 0.5 else min_age + rng.choice([6, 12, 24])
+                sex = rng.choice([None, None, "male", "female"])
+                lactation = rng.choice(CYCLES) if sex == "female" else None
+                yield (product_id, species, sex, min_age, max_age, rng.choice(CYCLES), lactation,
+                       rng.choice(FOCUS[species]), 1, round(rng.uniform(2, 40), 1),
+                       round(rng.uniform(5, 50), 1) if rng.random() < 0.5 else None, 1)
+
+
+def generate_catalogue(conn: sqlite3.Connection, rows: int, seed: int = 42, months: int = 25) -> Dict[str, int]:
+    """Fill an empty database with a synthetic catalogue of about `rows` price rows"""
+    generator = CatalogueGenerator(rows, seed=seed, months=months)
+    create_schema(conn)
+    with bulk_load(conn):
+        products = bulk_insert_products(conn, generator.product_rows())
+        restrictions = bulk_insert_restrictions(conn, generator.restriction_rows(conn))
+    return {
+        "products": products,
+        "suppliers": generator.suppliers_created,
+        "restrictions": restrictions,
+        "months": generator.months,
+    }
+
+
+def generate_database(db_path: Path, rows: int, seed: int = 42, months: int = 25) -> Dict[str, int]:
+    """Create (or replace) a database file holding a synthetic catalogue"""
+    db_path = Path(db_path)
+    if db_path.exists():
+        db_path.unlink()
+        print(f"Removed existing database {db_path.name}.")
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        print(f"Generating ~{rows:,} price rows (seed={seed}, months={months})...")
+        stats = generate_catalogue(conn, rows, seed=seed, months=months)
+        from forecasting import run_forecasts
+        stats["forecasts"] = run_forecasts(conn)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Inserted {stats['products']:,} product rows from {stats['suppliers']:,} suppliers "
+          f"and {stats['restrictions']:,} restrictions in {elapsed:.1f}s "
+          f"({stats['products'] / max(elapsed, 1e-9):,.0f} rows/s).")
+    return stats
@@ -0,0 +1,139 @@
+"""
+In-memory columnar snapshot of active products for structured search
+Answers /search/products filters, price ordering and limits with NumPy masks
+over dictionary-encoded columns instead of a SQL round trip
+"""
+
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from database import get_data_version
+
+# Columns returned by structured search, in output order
+RESULT_FIELDS = (
+    "product_name", "type", "supplier", "supplier_country",
+    "cost_per_kg", "cost_currency", "cost_per_kg_usd", "supplier_email", "supplier_phone",
+)
+
+
+class ProductRecord:
+    """One active product row as returned by search"""
+
+    __slots__ = RESULT_FIELDS
+
+    def __init__(self, values: Tuple):
+        for field, value in zip(RESULT_FIELDS, values):
+            setattr(self, field, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in RESULT_FIELDS}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _encode(values: List[Optional[str]]) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """Dictionary-encode a string column into int32 codes and its distinct values"""
+    dictionary: Dict[Optional[str], int] = {}
+    codes = np.fromiter((dictionary.setdefault(v, len(dictionary)) for v in values), dtype=np.int32, count=len(values))
+    return codes, list(dictionary)
+
+
+class CatalogueSnapshot:
+    """
+    Column arrays for every active product.
+
+    Strings are interned and dictionary-encoded, so equality filters are
+    integer comparisons and substring filters run once per distinct value.
+    Rows are kept pre-sorted by cost_per_kg (NULLs first, as SQLite orders
+    them), so a query is one boolean mask over that order plus a slice.
+    """
+
+    def __init__(self, rows: List[Tuple]):
+        columns = list(zip(*rows)) if rows else [()] * len(RESULT_FIELDS)
+        name, ptype, supplier, country, price, currency, price_usd, _, _ = columns
+
+        price = np.array([np.nan if p is None else p for p in price], dtype=np.float64)
+        order = np.argsort(np.where(np.isnan(price), -np.inf, price), kind="stable")
+
+        # Store everything in price order so results come out already sorted
+        self.records = [ProductRecord(tuple(_intern(v) if isinstance(v, str) else v for v in rows[i])) for i in order]
+        self.price = price[order]
+        self.name_codes, self.names = _encode([name[i] for i in order])
+        self.type_codes, self.types = _encode([ptype[i] for i in order])
+        self.supplier_codes, self.suppliers = _encode([supplier[i] for i in order])
+        self.country_codes, self.countries = _encode([country[i] for i in order])
+        self.lower_names = [n.lower() if n else "" for n in self.names]
+        self.lower_suppliers = [s.lower() if s else "" for s in self.suppliers]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _equals(codes: np.ndarray, dictionary: List[Optional[str]], value: str) -> np.ndarray:
+        try:
+            return codes == dictionary.index(value)
+        except ValueError:
+            return np.zeros(len(codes), dtype=bool)
+
+    @staticmethod
+    def _contains(codes: np.ndarray, lowered: List[str], needle: str) -> np.ndarray:
+        matches = np.fromiter((needle in value for value in lowered), dtype=bool, count=len(lowered))
+        return matches[codes]
+
+    def search(
+        self,
+        product_name: Optional[str] = None,
+        product_type: Optional[str] = None,
+        country: Optional[str] = None,
+        supplier: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Filter like the structured search SQL and return the cheapest `limit` rows"""
+        mask = np.ones(len(self.records), dtype=bool)
+        if product_name:
+            mask &= self._contains(self.name_codes, self.lower_names, product_name.lower())
+        if product_type:
+            mask &= self._equals(self.type_codes, self.types, product_type)
+        if country:
+            mask &= self._equals(self.country_codes, self.countries, country)
+        if supplier:
+            mask &= self._contains(self.supplier_codes, self.lower_suppliers, supplier.lower())
+        if min_price:
+            mask &= self.price >= min_price
+        if max_price:
+            mask &= self.price <= max_price
+        return [self.records[i].to_dict() for i in np.flatnonzero(mask)[:limit]]
+
+
+def load_active_products(conn: sqlite3.Connection) -> List[Tuple]:
+    """Active product rows in RESULT_FIELDS order"""
+    return conn.execute(f"""
+    SELECT {', '.join(RESULT_FIELDS)}
+    FROM feed_products_sample
+    WHERE is_active = 1
+    """).fetchall()
+
+
+class CatalogueIndex:
+    """Holds the snapshot for the current data version, rebuilding it after writes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._snapshot: Optional[CatalogueSnapshot] = None
+
+    def snapshot(self, conn: sqlite3.Connection) -> CatalogueSnapshot:
+        version = get_data_version(conn)
+        with self._lock:
+            if self._snapshot is None or self._version != version:
+                self._snapshot = CatalogueSnapshot([tuple(row) for row in load_active_products(conn)])
+                self._version = version
+            return self._snapshot
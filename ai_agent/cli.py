@@ -21,17 +21,17 @@ except ImportError:
     RICH_AVAILABLE = False
     print("Note: Install 'rich' for better terminal formatting: pip install rich")
 
-from agent import create_agent, FeedProductsAgent
-from language_utils import detect_language
+from daemon import DaemonUnavailable, connect as connect_daemon
 
 
 class FeedProductsCLI:
     """Interactive CLI for the Feed Products AI Agent"""
     
-    def __init__(self):
+    def __init__(self, use_daemon: bool = True):
         if RICH_AVAILABLE:
             self.console = Console()
         self.agent = None
+        self.use_daemon = use_daemon
         
     def _print(self, text: str, style: str = None):
         """Print with optional rich formatting"""
@@ -113,13 +113,41 @@ Type your question below | اكتب سؤالك أدناه
 """
         self._print_panel(welcome_text, title="Welcome | مرحبا", style="green")
     
+    def _start_agent(self):
+        """The daemon's warm agent when one is running, else a fresh local agent"""
+        client = connect_daemon() if self.use_daemon else None
+        if client:
+            self._print("\n⚡ Connected to the agent daemon\n", style="green")
+            return client
+        self._print("\n⏳ Initializing agent...", style="yellow")
+        from agent import create_agent
+        agent = create_agent()
+        self._print("✅ Agent ready!\n", style="green")
+        return agent
+    
+    def _ask(self, method: str, *args):
+        """
+        Call the agent; if the daemon went away, reconnect (or start a local
+        agent) and retry once, so losing the daemon never ends the session
+        """
+        try:
+            if self.agent is None:
+                self.agent = self._start_agent()
+            return getattr(self.agent, method)(*args)
+        except DaemonUnavailable:
+            self._print("\n⚠️ Lost the agent daemon", style="yellow")
+            self.agent.close()
+            self.agent = None
+            self.agent = self._start_agent()
+            return getattr(self.agent, method)(*args)
+    
     def show_stats(self):
         """Display database statistics"""
         if not self.agent:
             self._print("Agent not initialized", style="red")
             return
         
-        stats = self.agent.get_stats()
+        stats = self._ask("get_stats")
         
         stats_text = f"""
 📊 Database Statistics | إحصائيات قاعدة البيانات
@@ -202,11 +230,9 @@ Tips | نصائح:
         """Run the interactive CLI"""
         self.show_welcome()
         
-        # Initialize agent
-        self._print("\n⏳ Initializing agent...", style="yellow")
+        # Use the resident daemon's warm agent when one is running
         try:
-            self.agent = create_agent()
-            self._print("✅ Agent ready!\n", style="green")
+            self.agent = self._start_agent()
         except Exception as e:
             self._print(f"❌ Failed to initialize agent: {e}", style="red")
             return
@@ -234,7 +260,7 @@ Tips | نصائح:
                 
                 # Process the query
                 self._print("\n⏳ Processing...", style="yellow")
-                result = self.agent.process_query(user_input)
+                result = self._ask("process_query", user_input)
                 
                 # Store SQL for 'sql' command
                 last_sql = result.get('sql', '')
@@ -279,9 +305,9 @@ Tips | نصائح:
             self.agent.close()
 
 
-def main():
+def main(use_daemon: bool = True):
     """Main entry point"""
-    cli = FeedProductsCLI()
+    cli = FeedProductsCLI(use_daemon)
     cli.run()
 
 
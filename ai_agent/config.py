@@ -12,11 +12,145 @@ load_dotenv()
 # Base paths
 BASE_DIR = Path(__file__).parent
 DB_DIR = BASE_DIR.parent / "db"
-DATABASE_PATH = BASE_DIR / "feed_products.db"
+DATABASE_PATH = Path(os.getenv("DATABASE_PATH", str(BASE_DIR / "feed_products.db")))
 
 # Google Gemini API Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# Optional override, e.g. http://127.0.0.1:8765 for the local Gemini stand-in used in load tests
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+
+# Reference FX rates as (currency, effective from, local units per USD), seeded
+# into the fx_rates table. Add a row with a later date to record a rate change;
+# each price converts at the latest rate effective at its created_at.
+FX_RATES = [
+    ("USD", "2020-01-01", 1.0),
+    ("AED", "2020-01-01", 3.67),
+    ("SAR", "2020-01-01", 3.75),
+    ("QAR", "2020-01-01", 3.64),
+    ("EGP", "2020-01-01", 30.9),
+]
+
+# Read-only serving mode for API replicas that never write
+DATABASE_READ_ONLY = os.getenv("DATABASE_READ_ONLY", "").lower() in ("1", "true", "yes")
+# Promise the file never changes while serving (skips all locking; only for static snapshots)
+DATABASE_IMMUTABLE = os.getenv("DATABASE_IMMUTABLE", "").lower() in ("1", "true", "yes")
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(1024 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", str(16 * 1024)))
+
+# Bulk price ingestion: batches arriving within the window share one transaction/commit
+PRICE_INGEST_COMMIT_WINDOW_MS = float(os.getenv("PRICE_INGEST_COMMIT_WINDOW_MS", "5"))
+PRICE_INGEST_MAX_GROUP_ROWS = int(os.getenv("PRICE_INGEST_MAX_GROUP_ROWS", "20000"))
+PRICE_INGEST_MAX_BATCH_ROWS = int(os.getenv("PRICE_INGEST_MAX_BATCH_ROWS", "10000"))
+
+# Live price-change feed (/subscribe): how often each API process checks for new
+# changes, how many are kept for replay, and how far a subscriber may fall behind
+PRICE_FEED_POLL_MS = float(os.getenv("PRICE_FEED_POLL_MS", "250"))
+PRICE_FEED_RETENTION = int(os.getenv("PRICE_FEED_RETENTION", "100000"))
+PRICE_FEED_QUEUE_SIZE = int(os.getenv("PRICE_FEED_QUEUE_SIZE", "1000"))
+PRICE_FEED_HEARTBEAT_SECONDS = float(os.getenv("PRICE_FEED_HEARTBEAT_SECONDS", "15"))
+
+# Chart payloads: price histories and trend results are downsampled to at most
+# this many points per series (LTTB), however dense the stored history is
+HISTORY_CHART_POINTS = int(os.getenv("HISTORY_CHART_POINTS", "120"))
+# Rows a trend query may fetch before downsampling; what is returned still fits SQL_MAX_ROWS
+HISTORY_MAX_ROWS = int(os.getenv("HISTORY_MAX_ROWS", "100000"))
+
+# Arrow/Parquet export (/export and --export): rows per record batch, and the
+# row cap and time budget for exported query results (catalogue slices are uncapped)
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "65536"))
+EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", "10000000"))
+EXPORT_TIME_BUDGET_MS = float(os.getenv("EXPORT_TIME_BUDGET_MS", "120000"))
+
+# Batch query mode (--batch): worker threads, each with its own agent and connection
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+
+# Resident agent daemon (--daemon): Unix socket the CLI and --query connect to when
+# it is running (empty disables), and warm agents answering its clients
+AGENT_SOCKET_PATH = os.getenv("AGENT_SOCKET_PATH", str(BASE_DIR / "agent.sock"))
+AGENT_DAEMON_WORKERS = int(os.getenv("AGENT_DAEMON_WORKERS", "2"))
+
+# API admission control: LLM-bound requests (/query, /export/query) and direct
+# database requests get separate concurrency limits and bounded queues, so a
+# Gemini backlog cannot starve structured endpoints; the LLM lane's concurrency
+# is also the number of agents answering natural language queries
+ADMISSION_LLM_CONCURRENCY = int(os.getenv("ADMISSION_LLM_CONCURRENCY", "4"))
+ADMISSION_LLM_QUEUE = int(os.getenv("ADMISSION_LLM_QUEUE", "32"))
+ADMISSION_DIRECT_CONCURRENCY = int(os.getenv("ADMISSION_DIRECT_CONCURRENCY", "64"))
+ADMISSION_DIRECT_QUEUE = int(os.getenv("ADMISSION_DIRECT_QUEUE", "256"))
+ADMISSION_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "10"))
+
+# Per-client token buckets, per lane (0 disables)
+RATE_LIMIT_LLM_PER_MINUTE = float(os.getenv("RATE_LIMIT_LLM_PER_MINUTE", "60"))
+RATE_LIMIT_LLM_BURST = float(os.getenv("RATE_LIMIT_LLM_BURST", "10"))
+RATE_LIMIT_DIRECT_PER_SECOND = float(os.getenv("RATE_LIMIT_DIRECT_PER_SECOND", "50"))
+RATE_LIMIT_DIRECT_BURST = float(os.getenv("RATE_LIMIT_DIRECT_BURST", "100"))
+
+# HTTP caching for catalogue endpoints
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "30"))
+# Payloads kept in memory per process (keys include query parameters, so this is bounded)
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "512"))
+HTTP_COMPRESSION_MIN_BYTES = int(os.getenv("HTTP_COMPRESSION_MIN_BYTES", "1024"))
+
+# Shared plan/result cache (one SQLite file shared by all API workers; empty path disables)
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", str(BASE_DIR / "query_cache.db"))
+QUERY_PLAN_CACHE_TTL = int(os.getenv("QUERY_PLAN_CACHE_TTL", str(24 * 3600)))
+QUERY_RESULT_CACHE_TTL = int(os.getenv("QUERY_RESULT_CACHE_TTL", "30"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "10000"))
+
+# Slow-query log (statements over the threshold are logged with their plan; negative disables)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_LOG_PATH = Path(os.getenv("SLOW_QUERY_LOG_PATH", str(BASE_DIR / "slow_queries.jsonl")))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "3"))
+
+# SQL governor limits for generated (LLM/fallback) queries
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "500"))
+SQL_TIME_BUDGET_MS = float(os.getenv("SQL_TIME_BUDGET_MS", "2000"))
+SQL_MAX_VM_STEPS = int(os.getenv("SQL_MAX_VM_STEPS", "50000000"))
+SQL_MAX_FULL_SCANS = int(os.getenv("SQL_MAX_FULL_SCANS", "1"))
+
+# Reference feed composition for ration formulation, matched by keyword on
+# product_name (most specific first): (dry matter %, crude protein % DM,
+# TDN % DM, NDF % DM). Approximate book values; products without a match
+# are left out of rations.
+FEED_NUTRIENTS = [
+    ("corn gluten", (90, 65, 86, 7)),
+    ("corn silage", (35, 8, 70, 45)),
+    ("fermented corn", (35, 8, 70, 45)),
+    ("triticale silage", (35, 11, 60, 55)),
+    ("soya bean meal", (89, 49, 84, 13)),
+    ("soybean meal", (89, 49, 84, 13)),
+    ("soybean hull", (90, 12, 77, 66)),
+    ("soybean husk", (90, 12, 77, 66)),
+    ("soybean", (90, 40, 94, 15)),
+    ("cotton meal", (90, 45, 75, 28)),
+    ("cotton seed", (90, 23, 90, 47)),
+    ("sesame seed husk", (90, 10, 45, 50)),
+    ("wheat straw", (91, 4, 43, 78)),
+    ("wheat bran", (89, 17, 70, 42)),
+    ("wheat", (89, 14, 88, 12)),
+    ("beet", (90, 10, 75, 45)),
+    ("barley", (89, 12, 84, 19)),
+    ("maize", (88, 9, 88, 10)),
+    ("corn", (88, 9, 88, 10)),
+    ("alfalfa", (89, 18, 58, 45)),
+    ("oat hay", (90, 9, 55, 63)),
+    ("hay", (88, 8, 52, 65)),
+    ("molasses", (75, 5, 72, 0)),
+    ("urea", (99, 281, 0, 0)),
+]
+
+# Default ration targets by (species, production focus), overridable per request:
+# min crude protein % DM, min TDN % DM, min NDF % DM, min forage (Fodder) % DM
+RATION_TARGETS = {
+    ("cattle", "dairy"): {"min_cp": 16.0, "min_tdn": 68.0, "min_ndf": 28.0, "min_forage_pct": 40.0},
+    ("cattle", "beef"): {"min_cp": 12.5, "min_tdn": 70.0, "min_ndf": 20.0, "min_forage_pct": 20.0},
+    ("cattle", None): {"min_cp": 12.0, "min_tdn": 62.0, "min_ndf": 30.0, "min_forage_pct": 40.0},
+    ("sheep", None): {"min_cp": 14.0, "min_tdn": 65.0, "min_ndf": 25.0, "min_forage_pct": 40.0},
+    ("goat", None): {"min_cp": 14.0, "min_tdn": 65.0, "min_ndf": 25.0, "min_forage_pct": 40.0},
+    ("camel", None): {"min_cp": 10.0, "min_tdn": 55.0, "min_ndf": 35.0, "min_forage_pct": 60.0},
+}
 
 # Supported languages
 SUPPORTED_LANGUAGES = {
@@ -40,6 +174,7 @@ Columns:
   - type: TEXT (one of: 'Fodder', 'Concentrate', 'Additive')
   - cost_per_kg: REAL (price per kilogram)
   - cost_currency: TEXT (e.g., 'AED', 'SAR', 'QAR', 'EGP', 'USD')
+  - cost_per_kg_usd: REAL (cost_per_kg converted to USD at the rate effective on created_at; indexed)
   - supplier: TEXT (supplier company name, NULL for standard products)
   - supplier_country: TEXT (e.g., 'UAE', 'Saudi Arabia', 'Egypt', 'Qatar')
   - supplier_email: TEXT
@@ -65,6 +200,19 @@ Columns:
   - max_perc_conc: REAL (maximum percentage in concentrate)
   - is_active: BOOLEAN
 
+Table: fx_rates
+  - currency: TEXT
+  - effective_from: INTEGER (Unix timestamp the rate applies from)
+  - units_per_usd: REAL (local currency units per 1 USD)
+
+Table: price_forecasts (precomputed monthly forecasts per product/country series)
+  - product_name, supplier_country, cost_currency: TEXT (series identity)
+  - month: TEXT ('YYYY-MM', future months)
+  - horizon: INTEGER (months ahead, 1 = next month)
+  - method: TEXT ('holt_winters', 'seasonal_naive' or 'naive')
+  - forecast, lower_80, upper_80, lower_95, upper_95: REAL (price per kg in cost_currency)
+  - forecast_usd: REAL (forecast converted to USD)
+
 Key Information:
 - Prices are stored in local currencies (AED for UAE, SAR for Saudi Arabia, EGP for Egypt, QAR for Qatar, USD for others)
 - Historical prices have is_active = false and different created_at timestamps
@@ -72,12 +220,13 @@ Key Information:
 - Market products (is_standard_product = false) have supplier details
 - Product types: Fodder (roughage), Concentrate (energy-dense feeds), Additive (supplements)
 - created_at is Unix timestamp (seconds since Jan 1, 1970)
+- For future prices, predictions or "will the price go up" questions, read price_forecasts; never extrapolate in SQL
 
-Currency Conversion Rates (approximate):
-- 1 USD = 3.67 AED
-- 1 USD = 3.75 SAR
-- 1 USD = 3.64 QAR
-- 1 USD = 30.9 EGP
+Currency Conversion:
+- Never compare or sort cost_per_kg across countries; it is in local currency
+- Use cost_per_kg_usd for cross-country comparisons (cheapest in the region, averages across countries)
+- Rates live in fx_rates; cost_per_kg_usd is already converted, so no join is needed
+- cost_per_kg_usd is NULL for currencies without a rate; filter cost_per_kg_usd IS NOT NULL when ranking by it (NULL sorts first)
 
 Common Products:
 - Fodders: Alfalfa hay, Wheat Straw, Barley, Corn, Soybean, Oat Hay, Triticale Silage, Wheat Bran, Cotton Seed, Beet Pulp
@@ -92,15 +241,16 @@ EXAMPLE_QUERIES = [
     {
         "question": "Who is selling the cheapest Wheat Straw?",
         "sql": """
-SELECT supplier, supplier_country, cost_per_kg, cost_currency
+SELECT supplier, supplier_country, cost_per_kg, cost_currency, cost_per_kg_usd
 FROM feed_products_sample
 WHERE LOWER(product_name) LIKE '%wheat straw%'
   AND is_active = 1
   AND supplier IS NOT NULL
-ORDER BY cost_per_kg ASC
+  AND cost_per_kg_usd IS NOT NULL
+ORDER BY cost_per_kg_usd ASC
 LIMIT 5
 """,
-        "explanation": "Find market products (with suppliers) for wheat straw, ordered by price ascending"
+        "explanation": "Find market products (with suppliers) for wheat straw, ordered by USD price ascending"
     },
     {
         "question": "Which supplier is selling Alfalfa hay?",
@@ -123,13 +273,14 @@ SELECT
   ROUND(AVG(cost_per_kg), 2) as avg_price,
   ROUND(MIN(cost_per_kg), 2) as min_price,
   ROUND(MAX(cost_per_kg), 2) as max_price,
+  ROUND(AVG(cost_per_kg_usd), 4) as avg_price_usd,
   COUNT(*) as supplier_count
 FROM feed_products_sample
 WHERE LOWER(product_name) LIKE '%barley%'
   AND type = 'Fodder'
   AND is_active = 1
 GROUP BY supplier_country, cost_currency
-ORDER BY supplier_country
+ORDER BY avg_price_usd IS NULL, avg_price_usd
 """,
         "explanation": "Calculate average, min, max prices for barley by country"
     },
@@ -0,0 +1,175 @@
+"""
+Resident agent daemon for the Feed Products AI Agent
+Keeps warm agents (open database, snapshots, caches, Gemini client) behind a
+Unix socket so the CLI and --query skip startup; clients speak one JSON
+request and one JSON response per line
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from batch import AgentPool
+from config import AGENT_DAEMON_WORKERS, AGENT_SOCKET_PATH
+from database import ensure_database
+from single_flight import SingleFlight, query_key
+
+# How long a client waits for the daemon to accept before starting its own agent
+CONNECT_TIMEOUT_S = 0.5
+
+# Requests the daemon answers, as agent calls
+OPERATIONS: Dict[str, Callable[..., Any]] = {
+    "query": lambda agent, request: agent.process_query(request["query"]),
+    "stats": lambda agent, request: agent.get_stats(),
+    "ping": lambda agent, request: {"pid": os.getpid()},
+}
+
+
+class DaemonUnavailable(Exception):
+    """The daemon is not running or stopped answering"""
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection: a JSON request per line, answered in order"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                op = request.get("op", "query")
+                operation = OPERATIONS[op]
+                if op == "query":
+                    # Identical questions from several clients share one answer
+                    future = self.server.flights.submit(
+                        query_key(request["query"]), lambda: self.server.agents.submit(operation, request)
+                    )
+                else:
+                    future = self.server.agents.submit(operation, request)
+                result = future.result()
+                response = {"ok": True, "result": result}
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                response = {"ok": False, "error": f"Bad request: {e}"}
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(response, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class AgentDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server in front of an AgentPool.
+
+    Each connection gets its own thread, so an interactive session can stay
+    connected while scripts come and go; questions run on the pool's warm
+    agents. The socket is created owner-only (0600) and removed on exit.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, agent_factory: Callable[[], Any], socket_path: str = AGENT_SOCKET_PATH,
+                 workers: int = AGENT_DAEMON_WORKERS):
+        if is_running(socket_path):
+            raise RuntimeError(f"An agent daemon is already listening on {socket_path}")
+        if os.path.exists(socket_path):
+            # Left behind by a daemon that did not shut down cleanly
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.agents = AgentPool(agent_factory, workers, name="daemon")
+        self.flights = SingleFlight()
+        # Seed a fresh database once; the workers then only open it
+        ensure_database()
+        self.agents.warm()
+        previous = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _Handler)
+        finally:
+            os.umask(previous)
+
+    def serve(self):
+        """Serve until SIGINT/SIGTERM, then close the agents and remove the socket"""
+        def stop(signum, frame):
+            threading.Thread(target=self.shutdown, daemon=True).start()
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
+            self.agents.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+class DaemonClient:
+    """
+    A connection to a running daemon, usable wherever an agent is.
+
+    process_query and get_stats return what the daemon's agent returned;
+    close only disconnects.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.file = sock.makefile("rwb")
+
+    def _call(self, op: str, **params) -> Any:
+        try:
+            self.file.write((json.dumps({"op": op, **params}, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.file.flush()
+            line = self.file.readline()
+        except OSError as e:
+            raise DaemonUnavailable(str(e))
+        if not line.endswith(b"\n"):
+            raise DaemonUnavailable("Agent daemon closed the connection")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def process_query(self, user_query: str) -> Dict[str, Any]:
+        return self._call("query", query=user_query)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._call("stats")
+
+    def ping(self) -> Dict[str, Any]:
+        return self._call("ping")
+
+    def close(self):
+        try:
+            self.file.close()
+        except OSError:
+            # Unsent bytes to a daemon that has gone away
+            pass
+        self.sock.close()
+
+
+def connect(socket_path: str = AGENT_SOCKET_PATH) -> Optional[DaemonClient]:
+    """Client for the daemon on socket_path, or None if none is running (or sockets are disabled)"""
+    if not socket_path or not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT_S)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    # Queries may wait on the LLM; only connecting is time-boxed
+    sock.settimeout(None)
+    return DaemonClient(sock)
+
+
+def is_running(socket_path: str = AGENT_SOCKET_PATH) -> bool:
+    client = connect(socket_path)
+    if client is None:
+        return False
+    client.close()
+    return True
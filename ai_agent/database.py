@@ -5,9 +5,76 @@ Uses SQLite for local storage and easy deployment
 
 import sqlite3
 import re
+import time
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
-from config import DATABASE_PATH, DB_DIR
+from urllib.parse import quote
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Sequence
+from datetime import datetime, timezone
+from config import DATABASE_PATH, DB_DIR, DATABASE_IMMUTABLE, DATABASE_READ_ONLY, DB_MMAP_SIZE, DB_CACHE_SIZE_KB, FX_RATES
+from slow_query_log import slow_query_log
+
+
+# Secondary indexes, kept here so bulk loads can drop and rebuild them
+INDEXES = {
+    "idx_product_name": "feed_products_sample(product_name)",
+    "idx_product_type": "feed_products_sample(type)",
+    "idx_product_code": "feed_products_sample(product_code)",
+    "idx_supplier_country": "feed_products_sample(supplier_country)",
+    "idx_is_active": "feed_products_sample(is_active)",
+    "idx_supplier": "feed_products_sample(supplier)",
+    "idx_created_at": "feed_products_sample(created_at)",
+    "idx_active_cost_usd": "feed_products_sample(is_active, cost_per_kg_usd)",
+    "idx_restrictions_product": "feed_product_restrictions(product_id)",
+    "idx_forecasts_series": "price_forecasts(product_name, supplier_country, month)",
+}
+
+# Seed files loaded into a fresh database (products, then the restrictions they define)
+SEED_FILES = ("seed_data.sql", "seed_data_market_products.sql")
+
+# Column order expected by the bulk insert helpers
+PRODUCT_COLUMNS = (
+    "product_name", "product_code", "name", "type", "cost_per_kg", "cost_currency",
+    "supplier", "supplier_country", "supplier_email", "supplier_phone", "supplier_address",
+    "is_standard_product", "created_at", "is_active",
+)
+
+# USD price of a row from the latest rate effective at its created_at (falling
+# back to the earliest known rate for rows older than every rate); {row} is
+# the alias of the product row, e.g. NEW in a trigger
+USD_PRICE_SQL = """
+ROUND({row}.cost_per_kg / COALESCE(
+    (SELECT units_per_usd FROM fx_rates
+     WHERE currency = {row}.cost_currency AND effective_from <= COALESCE({row}.created_at, 0)
+     ORDER BY effective_from DESC LIMIT 1),
+    (SELECT units_per_usd FROM fx_rates
+     WHERE currency = {row}.cost_currency
+     ORDER BY effective_from ASC LIMIT 1)
+), 4)
+"""
+
+# Triggers keeping cost_per_kg_usd current on every ingest path
+TRIGGERS = {
+    "trg_products_usd_insert": f"""
+    AFTER INSERT ON feed_products_sample
+    BEGIN
+        UPDATE feed_products_sample SET cost_per_kg_usd = {USD_PRICE_SQL.format(row="NEW")}
+        WHERE id = NEW.id;
+    END""",
+    "trg_products_usd_update": f"""
+    AFTER UPDATE OF cost_per_kg, cost_currency, created_at ON feed_products_sample
+    BEGIN
+        UPDATE feed_products_sample SET cost_per_kg_usd = {USD_PRICE_SQL.format(row="NEW")}
+        WHERE id = NEW.id;
+    END""",
+}
+
+RESTRICTION_COLUMNS = (
+    "product_id", "species", "sex", "min_age_months", "max_age_months",
+    "breeding_cycle", "lactation_cycle", "production_focus", "is_eligible",
+    "max_perc_feed", "max_perc_conc", "is_active",
+)
 
 
 def create_schema(conn: sqlite3.Connection) -> None:
@@ -31,7 +98,65 @@ def create_schema(conn: sqlite3.Connection) -> None:
         supplier_address TEXT,
         is_standard_product INTEGER DEFAULT 0,
         created_at INTEGER,
-        is_active INTEGER DEFAULT 1
+        is_active INTEGER DEFAULT 1,
+        cost_per_kg_usd REAL
+    )
+    """)
+    
+    # Databases created before the USD column existed
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(feed_products_sample)")}
+    added_usd_column = "cost_per_kg_usd" not in columns
+    if added_usd_column:
+        cursor.execute("ALTER TABLE feed_products_sample ADD COLUMN cost_per_kg_usd REAL")
+    
+    # FX rates with effective dates (local currency units per USD)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS fx_rates (
+        currency TEXT NOT NULL,
+        effective_from INTEGER NOT NULL,
+        units_per_usd REAL NOT NULL,
+        PRIMARY KEY (currency, effective_from)
+    )
+    """)
+    cursor.executemany(
+        "INSERT OR IGNORE INTO fx_rates (currency, effective_from, units_per_usd) VALUES (?, ?, ?)",
+        [(currency, _timestamp(effective), rate) for currency, effective, rate in FX_RATES]
+    )
+    if added_usd_column:
+        refresh_usd_prices(conn)
+    
+    # Precomputed forecasts per product/country/currency series (see forecasting.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS price_forecasts (
+        product_name TEXT NOT NULL,
+        supplier_country TEXT,
+        cost_currency TEXT,
+        month TEXT NOT NULL,
+        horizon INTEGER NOT NULL,
+        method TEXT NOT NULL,
+        forecast REAL,
+        lower_80 REAL,
+        upper_80 REAL,
+        lower_95 REAL,
+        upper_95 REAL,
+        forecast_usd REAL,
+        generated_at INTEGER
+    )
+    """)
+    
+    # Price changes written by bulk ingestion, tailed by the live feed (see price_feed.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS price_changes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_name TEXT NOT NULL,
+        supplier TEXT,
+        supplier_country TEXT,
+        cost_currency TEXT,
+        old_cost_per_kg REAL,
+        new_cost_per_kg REAL,
+        cost_per_kg_usd REAL,
+        observed_at INTEGER,
+        changed_at INTEGER
     )
     """)
     
@@ -56,17 +181,111 @@ def create_schema(conn: sqlite3.Connection) -> None:
     """)
     
     # Create indexes for better query performance
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_name ON feed_products_sample(product_name)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_type ON feed_products_sample(type)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_supplier_country ON feed_products_sample(supplier_country)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_is_active ON feed_products_sample(is_active)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_supplier ON feed_products_sample(supplier)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON feed_products_sample(created_at)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_restrictions_product ON feed_product_restrictions(product_id)")
+    for index_name, target in INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {target}")
+    
+    for trigger_name, body in TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}")
     
     conn.commit()
 
 
+def _timestamp(date_text: str) -> int:
+    """Unix timestamp for a YYYY-MM-DD date (UTC midnight)"""
+    return int(datetime.strptime(date_text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+
+def refresh_usd_prices(conn: sqlite3.Connection, only_missing: bool = False) -> int:
+    """
+    Recompute cost_per_kg_usd in one set-based UPDATE.
+    
+    Run after changing fx_rates; bulk loads call it with only_missing to
+    fill rows inserted while the triggers were dropped.
+    """
+    where = "WHERE cost_per_kg_usd IS NULL AND cost_per_kg IS NOT NULL" if only_missing else ""
+    cursor = conn.execute(f"""
+    UPDATE feed_products_sample
+    SET cost_per_kg_usd = {USD_PRICE_SQL.format(row="feed_products_sample")}
+    {where}
+    """)
+    conn.commit()
+    return cursor.rowcount
+
+
+def set_fx_rate(conn: sqlite3.Connection, currency: str, effective_from: str, units_per_usd: float) -> int:
+    """Record a rate (effective from a YYYY-MM-DD date) and reprice affected rows; returns rows updated"""
+    conn.execute(
+        "INSERT OR REPLACE INTO fx_rates (currency, effective_from, units_per_usd) VALUES (?, ?, ?)",
+        (currency, _timestamp(effective_from), units_per_usd)
+    )
+    cursor = conn.execute(f"""
+    UPDATE feed_products_sample
+    SET cost_per_kg_usd = {USD_PRICE_SQL.format(row="feed_products_sample")}
+    WHERE cost_currency = ?
+    """, (currency,))
+    conn.commit()
+    return cursor.rowcount
+
+
+@contextmanager
+def bulk_load(conn: sqlite3.Connection):
+    """
+    Prepare a connection for large inserts.
+    
+    Relaxes durability pragmas and drops the secondary indexes and USD
+    price triggers for the duration of the block, then fills the USD
+    prices, rebuilds the indexes and refreshes planner statistics once at
+    the end instead of per row.
+    """
+    previous_sync = conn.execute("PRAGMA synchronous").fetchone()[0]
+    previous_journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MB
+    for index_name in INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+    for trigger_name in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        refresh_usd_prices(conn, only_missing=True)
+        create_schema(conn)
+        conn.execute("ANALYZE")
+        conn.execute(f"PRAGMA journal_mode = {previous_journal}")
+        conn.execute(f"PRAGMA synchronous = {previous_sync}")
+        conn.commit()
+
+
+def _bulk_insert(conn: sqlite3.Connection, table: str, columns: Sequence[str],
+                 rows: Iterable[Sequence], batch_size: int) -> int:
+    """Insert rows with executemany in fixed-size batches inside one transaction"""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    cursor = conn.cursor()
+    iterator = iter(rows)
+    inserted = 0
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        cursor.executemany(sql, batch)
+        inserted += len(batch)
+    conn.commit()
+    return inserted
+
+
+def bulk_insert_products(conn: sqlite3.Connection, rows: Iterable[Sequence], batch_size: int = 50000) -> int:
+    """Insert product tuples ordered as PRODUCT_COLUMNS; returns the row count"""
+    return _bulk_insert(conn, "feed_products_sample", PRODUCT_COLUMNS, rows, batch_size)
+
+
+def bulk_insert_restrictions(conn: sqlite3.Connection, rows: Iterable[Sequence], batch_size: int = 50000) -> int:
+    """Insert restriction tuples ordered as RESTRICTION_COLUMNS; returns the row count"""
+    return _bulk_insert(conn, "feed_product_restrictions", RESTRICTION_COLUMNS, rows, batch_size)
+
+
 def parse_sql_values(sql_content: str) -> List[Dict[str, Any]]:
     """Parse INSERT statements from SQL files and extract values"""
     records = []
@@ -238,13 +457,7 @@ def load_seed_data_simple(conn: sqlite3.Connection) -> int:
     cursor = conn.cursor()
     total_inserted = 0
     
-    # Define seed files to load
-    seed_files = [
-        DB_DIR / "seed_data.sql",
-        DB_DIR / "seed_data_market_products.sql",
-    ]
-    
-    for seed_file in seed_files:
+    for seed_file in (DB_DIR / name for name in SEED_FILES):
         if not seed_file.exists():
             print(f"Warning: Seed file not found: {seed_file}")
             continue
@@ -338,100 +551,130 @@ def load_seed_data_simple(conn: sqlite3.Connection) -> int:
     return total_inserted
 
 
+# Product columns a seed restriction may select its product by (WHERE col = literal AND ...),
+# most selective first: the first key of a shape drives the index lookup in load_restrictions
+RESTRICTION_KEY_COLUMNS = ("product_code", "product_name", "type", "supplier_country", "is_standard_product")
+
+# Restriction columns, in staging/insert order, with their defaults when a seed INSERT omits them
+SEED_RESTRICTION_DEFAULTS = {
+    "species": None, "sex": None, "min_age_months": None, "max_age_months": None,
+    "breeding_cycle": None, "lactation_cycle": None, "production_focus": None,
+    "is_eligible": 1, "max_perc_feed": None, "max_perc_conc": None, "is_active": 1,
+}
+
+# INSERT INTO public.feed_product_restrictions (cols) SELECT id, values FROM public.feed_products_sample WHERE ... [LIMIT n];
+RESTRICTION_INSERT_PATTERN = re.compile(
+    r"INSERT INTO public\.feed_product_restrictions\s*\(([^)]+)\)\s*"
+    r"SELECT\s+id\s*,(.+?)\s+FROM\s+public\.feed_products_sample\s+"
+    r"WHERE\s+(.+?)(?:\s+LIMIT\s+\d+)?\s*;",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def _sql_literal(token: str) -> Any:
+    """Convert one SQL literal (quoted string, number, NULL, TRUE/FALSE) to a Python value"""
+    token = token.strip()
+    keyword = token.upper()
+    if keyword == "NULL":
+        return None
+    if keyword in ("TRUE", "FALSE"):
+        return 1 if keyword == "TRUE" else 0
+    if token.startswith("'") and token.endswith("'"):
+        return token[1:-1].replace("''", "'")
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+def parse_seed_restrictions(content: str) -> List[Tuple[Tuple[str, ...], Tuple, Tuple]]:
+    """
+    Parse the subquery-based restriction INSERTs of a seed file.
+    
+    Returns (key columns, key values, restriction values) per statement, where
+    the keys are the WHERE equalities that pick the product and the values
+    follow SEED_RESTRICTION_DEFAULTS. Statements with any other WHERE shape are
+    skipped with a warning.
+    """
+    rules = []
+    for columns, select_list, where in RESTRICTION_INSERT_PATTERN.findall(content):
+        names = [c.strip() for c in columns.split(",")]
+        literals = [_sql_literal(t) for t in re.findall(r"'(?:[^']|'')*'|[^,\s][^,]*", select_list)]
+        conditions = [re.fullmatch(r"(\w+)\s*=\s*(.+)", c.strip()) for c in re.split(r"\s+AND\s+", where, flags=re.IGNORECASE)]
+        if (names[:1] != ["product_id"] or len(literals) != len(names) - 1
+                or not all(c and c.group(1) in RESTRICTION_KEY_COLUMNS for c in conditions)):
+            print(f"Warning: skipping unsupported restriction INSERT (WHERE {' '.join(where.split())})")
+            continue
+        values = dict(zip(names[1:], literals))
+        keys = sorted(((c.group(1), _sql_literal(c.group(2))) for c in conditions),
+                      key=lambda kv: RESTRICTION_KEY_COLUMNS.index(kv[0]))
+        rules.append((
+            tuple(k for k, _ in keys),
+            tuple(v for _, v in keys),
+            tuple(values.get(column, default) for column, default in SEED_RESTRICTION_DEFAULTS.items())
+        ))
+    return rules
+
+
 def load_restrictions(conn: sqlite3.Connection) -> int:
-    """Load feed product restrictions from seed data"""
-    cursor = conn.cursor()
-    inserted = 0
-    
-    seed_file = DB_DIR / "seed_data.sql"
-    if not seed_file.exists():
+    """
+    Load feed product restrictions from the seed files.
+    
+    The seed INSERTs find their product with a subquery, so they are parsed
+    into a temporary staging table and applied with one set-based
+    INSERT ... SELECT per WHERE shape (e.g. product_code + supplier_country),
+    joined on indexed equality, in a single transaction. Each rule covers
+    every product row its WHERE matches.
+    """
+    rules = []
+    for name in SEED_FILES:
+        seed_file = DB_DIR / name
+        if seed_file.exists():
+            rules.extend(parse_seed_restrictions(seed_file.read_text(encoding="utf-8")))
+    if not rules:
         return 0
     
-    with open(seed_file, 'r', encoding='utf-8') as f:
-        content = f.read()
+    shapes = sorted({keys for keys, _, _ in rules})
+    columns = list(SEED_RESTRICTION_DEFAULTS)
+    staging = ["shape"] + [f"k_{k}" for k in RESTRICTION_KEY_COLUMNS] + columns
+    staged_rows = []
+    for keys, key_values, values in rules:
+        key_map = dict(zip(keys, key_values))
+        staged_rows.append((shapes.index(keys), *(key_map.get(k) for k in RESTRICTION_KEY_COLUMNS), *values))
     
-    # Find restriction INSERT statements
-    # These use subqueries, so we need to handle them differently
-    # For simplicity, we'll create sample restrictions based on the schema
-    
-    # Get some product IDs for creating restrictions
-    cursor.execute("""
-    SELECT id, product_code, product_name, type, supplier_country 
-    FROM feed_products_sample 
-    WHERE type IN ('Concentrate', 'Additive') AND is_active = 1
-    LIMIT 50
-    """)
-    
-    products = cursor.fetchall()
-    
-    # Create sample restrictions
-    restrictions = [
-        # Barley - raw: max 30% for young cattle
-        {'species': 'cattle', 'min_age': 0, 'max_age': 12, 'max_perc_feed': 30.0},
-        # Soya Bean Meal: max 25% of concentrate for lactating cows
-        {'species': 'cattle', 'sex': 'female', 'lactation': 'early', 'max_perc_conc': 25.0},
-        # Urea: max 1% for adult cattle only
-        {'species': 'cattle', 'min_age': 12, 'max_perc_feed': 1.0},
-        # Molasses: max 10% of feed
-        {'species': 'cattle', 'max_perc_feed': 10.0},
-    ]
-    
-    for prod in products:
-        prod_id, code, name, ptype, country = prod
-        
-        # Apply appropriate restriction based on product type
-        if 'barley' in name.lower() and ptype == 'Concentrate':
-            cursor.execute("""
-            INSERT INTO feed_product_restrictions 
-            (product_id, species, min_age_months, max_age_months, max_perc_feed, is_active)
-            VALUES (?, 'cattle', 0, 12, 30.0, 1)
-            """, (prod_id,))
-            inserted += 1
-            
-            cursor.execute("""
-            INSERT INTO feed_product_restrictions 
-            (product_id, species, max_perc_feed, is_active)
-            VALUES (?, 'sheep', 20.0, 1)
-            """, (prod_id,))
-            inserted += 1
-            
-        elif 'soya' in name.lower() or 'soybean' in name.lower():
-            cursor.execute("""
-            INSERT INTO feed_product_restrictions 
-            (product_id, species, sex, lactation_cycle, production_focus, max_perc_conc, is_active)
-            VALUES (?, 'cattle', 'female', 'early', 'dairy', 25.0, 1)
-            """, (prod_id,))
-            inserted += 1
-            
-        elif 'urea' in name.lower():
-            cursor.execute("""
-            INSERT INTO feed_product_restrictions 
-            (product_id, species, min_age_months, max_perc_feed, is_active)
-            VALUES (?, 'cattle', 12, 1.0, 1)
-            """, (prod_id,))
-            inserted += 1
-            
-        elif 'molasses' in name.lower():
-            cursor.execute("""
-            INSERT INTO feed_product_restrictions 
-            (product_id, species, max_perc_feed, is_active)
-            VALUES (?, 'cattle', 10.0, 1)
-            """, (prod_id,))
-            inserted += 1
-    
-    conn.commit()
+    inserted = 0
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp.seed_restrictions")
+        conn.execute(f"CREATE TEMP TABLE seed_restrictions ({', '.join(staging)})")
+        conn.executemany(
+            f"INSERT INTO seed_restrictions VALUES ({', '.join('?' * len(staging))})", staged_rows
+        )
+        for shape, keys in enumerate(shapes):
+            # Unary + keeps the planner on the leading (most selective) key's index
+            join = " AND ".join(f"{'+' if i else ''}p.{k} = r.k_{k}" for i, k in enumerate(keys))
+            cursor = conn.execute(f"""
+            INSERT INTO feed_product_restrictions (product_id, {', '.join(columns)})
+            SELECT p.id, {', '.join('r.' + c for c in columns)}
+            FROM seed_restrictions r
+            JOIN feed_products_sample p ON {join}
+            WHERE r.shape = ?
+            ORDER BY r.rowid, p.id
+            """, (shape,))
+            inserted += cursor.rowcount
+        conn.execute("DROP TABLE temp.seed_restrictions")
     return inserted
 
 
-def initialize_database(force_recreate: bool = False) -> sqlite3.Connection:
+def initialize_database(force_recreate: bool = False, db_path: Optional[Path] = None) -> sqlite3.Connection:
     """Initialize the database with schema and seed data"""
+    db_path = Path(db_path) if db_path else DATABASE_PATH
     
-    if force_recreate and DATABASE_PATH.exists():
-        DATABASE_PATH.unlink()
+    if force_recreate and db_path.exists():
+        db_path.unlink()
         print("Removed existing database.")
     
-    db_exists = DATABASE_PATH.exists()
-    conn = sqlite3.connect(DATABASE_PATH)
+    db_exists = db_path.exists()
+    conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
     
     if not db_exists or force_recreate:
@@ -450,33 +693,108 @@ def initialize_database(force_recreate: bool = False) -> sqlite3.Connection:
         restrictions_count = load_restrictions(conn)
         print(f"Created {restrictions_count} product restrictions.")
         
+        print("Forecasting prices...")
+        from forecasting import run_forecasts
+        forecast_count = run_forecasts(conn)
+        print(f"Stored {forecast_count} forecast points.")
+        
         print("Database initialization complete!")
     else:
         print("Using existing database.")
+        # Brings older databases up to date (e.g. the USD price column)
+        create_schema(conn)
     
     return conn
 
 
-def execute_query(conn: sqlite3.Connection, query: str) -> Tuple[List[Dict], Optional[str]]:
-    """Execute a SQL query and return results"""
+def ensure_database(db_path: Optional[Path] = None) -> None:
+    """
+    Create and seed the database once, before several agents open it.
+    
+    initialize_database seeds a file that does not exist yet; agents built
+    concurrently (pool threads, prefork workers) would each see a missing or
+    half-seeded file. Read-only replicas never create one.
+    """
+    if not DATABASE_READ_ONLY:
+        initialize_database(db_path=db_path).close()
+
+
+def open_read_only(db_path: Optional[Path] = None, immutable: bool = DATABASE_IMMUTABLE,
+                   mmap_size: int = DB_MMAP_SIZE, cache_size_kb: int = DB_CACHE_SIZE_KB) -> sqlite3.Connection:
+    """
+    Open an existing database for read-only serving.
+    
+    The file is opened through a mode=ro URI (plus immutable=1 for static
+    snapshots, which also skips locking) with query_only set. A large
+    mmap_size lets reads come straight from the OS page cache, shared by
+    every process that maps the same file, instead of copying pages into
+    each connection's private cache.
+    """
+    db_path = Path(db_path) if db_path else DATABASE_PATH
+    if not db_path.exists():
+        raise FileNotFoundError(f"Read-only mode needs an existing database: {db_path} (run --init-db first)")
+    
+    uri = f"file:{quote(str(db_path.resolve()))}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    
+    conn = sqlite3.connect(uri, uri=True)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    conn.execute(f"PRAGMA cache_size = -{int(cache_size_kb)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    print(f"Opened {db_path.name} read-only (mmap {mmap_size // (1024 * 1024)} MB{', immutable' if immutable else ''}).")
+    return conn
+
+
+def execute_query(conn: sqlite3.Connection, query: str, origin: str = "endpoint",
+                  max_rows: Optional[int] = None, params: Sequence = ()) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Execute a SQL query and return results
+    
+    Statements slower than the configured threshold are written to the
+    slow-query log with their origin ('gemini', 'fallback' or 'endpoint').
+    When max_rows is given, at most that many rows are fetched.
+    """
+    started = time.perf_counter()
+    results = []
+    error = None
     try:
         cursor = conn.cursor()
-        cursor.execute(query)
+        cursor.execute(query, params)
         
         # Get column names
         columns = [description[0] for description in cursor.description] if cursor.description else []
         
-        # Fetch all results
-        rows = cursor.fetchall()
+        # Fetch all results (or up to the cap)
+        rows = cursor.fetchmany(max_rows) if max_rows else cursor.fetchall()
         
         # Convert to list of dictionaries
-        results = []
         for row in rows:
             results.append(dict(zip(columns, row)))
-        
-        return results, None
     except Exception as e:
-        return [], str(e)
+        results, error = [], str(e)
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if slow_query_log.is_slow(elapsed_ms):
+        try:
+            slow_query_log.record(conn, query, origin, elapsed_ms, len(results), error, params)
+        except Exception as e:
+            print(f"Warning: could not write slow-query log: {e}")
+    
+    return results, error
+
+
+def get_data_version(conn: sqlite3.Connection) -> str:
+    """
+    Return a cheap token that changes whenever the database content changes.
+    
+    Combines SQLite's data_version (bumped by commits from other connections)
+    with this connection's own change counter, so no table is scanned.
+    """
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    return f"{data_version}.{conn.total_changes}"
 
 
 def get_database_stats(conn: sqlite3.Connection) -> Dict[str, Any]:
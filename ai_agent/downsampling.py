@@ -0,0 +1,129 @@
+"""
+Time-series downsampling for chart payloads
+Reduces dense price histories to a target number of points per series with
+Largest-Triangle-Three-Buckets (shape-preserving) or min/max bucketing
+(spike-preserving), always keeping real rows and both endpoints
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Downsampling methods accepted by the history endpoint
+METHODS = ("lttb", "minmax")
+
+# Columns that identify a series within a result set, when present
+SERIES_KEYS = ("product_name", "supplier", "supplier_country", "cost_currency")
+
+# Price columns a time-series result is charted by, in order of preference
+VALUE_COLUMNS = ("avg_price", "cost_per_kg", "price", "forecast")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, target: int) -> np.ndarray:
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept; each bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    count = len(x)
+    if target >= count or target < 3:
+        return np.arange(count)
+    edges = np.linspace(1, count - 1, target - 1).astype(int)
+    kept = np.empty(target, dtype=int)
+    kept[0], kept[-1] = 0, count - 1
+    previous = 0
+    for b in range(target - 2):
+        start, end = edges[b], edges[b + 1]
+        following = slice(end, edges[b + 2]) if b + 2 < len(edges) else slice(count - 1, count)
+        next_x, next_y = x[following].mean(), y[following].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[b + 1] = previous
+    return kept
+
+
+def min_max(y: np.ndarray, target: int) -> np.ndarray:
+    """Indices of the lowest and highest point of each of (target - 2) // 2 buckets, plus both endpoints"""
+    count = len(y)
+    if target >= count or target < 4:
+        return np.arange(count)
+    edges = np.linspace(1, count - 1, (target - 2) // 2 + 1).astype(int)
+    kept = [0]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            bucket = y[start:end]
+            kept.extend(sorted((start + int(np.argmin(bucket)), start + int(np.argmax(bucket)))))
+    kept.append(count - 1)
+    return np.unique(kept)
+
+
+def _x_values(values: Sequence[Any]) -> np.ndarray:
+    """Seconds since the epoch for month/date strings or numbers"""
+    try:
+        return np.array(values, dtype="datetime64[s]").astype(np.int64).astype(float)
+    except (TypeError, ValueError):
+        return np.array(values, dtype=float)
+
+
+def downsample(x: Sequence[Any], y: Sequence[Optional[float]], target: int, method: str = "lttb") -> np.ndarray:
+    """Indices (in order) of the points to keep from one series sorted by x"""
+    values = np.array([np.nan if v is None else v for v in y], dtype=float)
+    observed = np.flatnonzero(~np.isnan(values))
+    if len(observed) <= target:
+        return np.arange(len(values))
+    if method == "minmax":
+        kept = min_max(values[observed], target)
+    else:
+        kept = lttb(_x_values([x[i] for i in observed]), values[observed], target)
+    return observed[kept]
+
+
+def downsample_rows(
+    rows: List[Dict[str, Any]],
+    target: int,
+    x: str = "month",
+    y: str = "avg_price",
+    method: str = "lttb",
+    max_rows: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Downsample each series in a result set to at most target points.
+
+    Rows are split into series by the SERIES_KEYS columns they have and must
+    already be in x order within each series. With max_rows, the per-series
+    target shrinks so all series together fit in max_rows (never below three
+    points, so both endpoints survive). Returns the kept rows in their
+    original order and one summary per series.
+    """
+    if not rows:
+        return rows, []
+    keys = [key for key in SERIES_KEYS if key in rows[0]]
+    series: Dict[Tuple, List[int]] = {}
+    for i, row in enumerate(rows):
+        series.setdefault(tuple(row[key] for key in keys), []).append(i)
+
+    if max_rows:
+        target = max(3, min(target, max_rows // len(series)))
+    kept: List[int] = []
+    summaries = []
+    for identity, indices in series.items():
+        chosen = downsample([rows[i][x] for i in indices], [rows[i][y] for i in indices], target, method)
+        kept.extend(indices[j] for j in chosen)
+        summaries.append({**dict(zip(keys, identity)), "points": len(chosen), "original_points": len(indices)})
+    return [rows[i] for i in sorted(kept)], summaries
+
+
+def time_series_value(rows: List[Dict[str, Any]], x: str = "month") -> Optional[str]:
+    """The value column of a chartable result (an x column ascending across rows), or None"""
+    if not rows or x not in rows[0]:
+        return None
+    value = next((column for column in VALUE_COLUMNS if column in rows[0]), None)
+    values = [row[x] for row in rows]
+    if value and all(a is not None and b is not None and a <= b for a, b in zip(values, values[1:])):
+        return value
+    return None
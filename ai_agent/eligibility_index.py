@@ -0,0 +1,251 @@
+"""
+Eligibility index for animal-profile product lookups
+Precomputes bitmaps over feed_product_restrictions rules (per species, sex,
+cycle and production focus value, plus an age interval table) so finding the
+products allowed for a profile is a handful of bitmap intersections
+"""
+
+import sqlite3
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from catalogue_snapshot import RESULT_FIELDS, load_active_products
+from database import get_data_version
+
+# Categorical profile columns; a NULL restriction column matches any value
+PROFILE_DIMENSIONS = ("species", "sex", "breeding_cycle", "lactation_cycle", "production_focus")
+
+# Columns of a restriction rule, as load_restriction_rules returns them
+RULE_COLUMNS = ("product_name", *PROFILE_DIMENSIONS, "min_age_months", "max_age_months",
+                "is_eligible", "max_perc_feed", "max_perc_conc")
+
+
+def _bits(bitmap: int):
+    """Indices of the set bits of a bitmap, lowest first"""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+def _normalize(value: Optional[str]) -> Optional[str]:
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+def restriction_applies(rule: Dict[str, Any], profile: Dict[str, Any]) -> bool:
+    """
+    Whether a restriction rule covers an animal profile.
+
+    The one matching rule shared by the eligibility index and the ration
+    optimizer: a NULL (or blank) rule column matches any value, otherwise
+    values compare case-insensitively and a profile without the value is not
+    covered; age bounds are inclusive and a bounded rule does not cover a
+    profile of unknown age.
+    """
+    for dimension in PROFILE_DIMENSIONS:
+        required = _normalize(rule[dimension])
+        if required is not None and required != _normalize(profile.get(dimension)):
+            return False
+    low, high, age = rule["min_age_months"], rule["max_age_months"], profile.get("age_months")
+    if low is not None and (age is None or age < low):
+        return False
+    if high is not None and (age is None or age > high):
+        return False
+    return True
+
+
+class EligibilitySnapshot:
+    """
+    Bitmaps over distinct restriction rules and over products.
+
+    Rule bitmaps (bit i = rule i) exist per value of every profile dimension,
+    plus a wildcard bitmap of rules that leave the dimension NULL. Ages are
+    split at every rule bound into slots whose bitmaps hold the rules
+    covering that slot. A profile's matching rules are the AND of one bitmap
+    per dimension; product bitmaps (by type and country) then narrow the
+    eligible set the same way.
+    """
+
+    def __init__(self, rules: List[Tuple], offers: List[Tuple]):
+        # Products and their cheapest current offer, overall and per country
+        self.products: List[str] = []
+        self.types: List[Optional[str]] = []
+        self.cheapest: List[Optional[Tuple]] = []
+        self.cheapest_by_country: List[Dict[str, Tuple]] = []
+        index: Dict[str, int] = {}
+        price = RESULT_FIELDS.index("cost_per_kg_usd")
+        country = RESULT_FIELDS.index("supplier_country")
+
+        def cheaper(offer: Tuple, current: Optional[Tuple]) -> bool:
+            return current is None or (offer[price] is not None and (current[price] is None or offer[price] < current[price]))
+
+        for offer in offers:
+            name = offer[0]
+            if name is None:
+                continue
+            if name not in index:
+                index[name] = len(self.products)
+                self.products.append(name)
+                self.types.append(offer[1])
+                self.cheapest.append(None)
+                self.cheapest_by_country.append({})
+            j = index[name]
+            if cheaper(offer, self.cheapest[j]):
+                self.cheapest[j] = offer
+                self.types[j] = offer[1]
+            by_country = self.cheapest_by_country[j]
+            if cheaper(offer, by_country.get(offer[country])):
+                by_country[offer[country]] = offer
+
+        self.all_products = (1 << len(self.products)) - 1
+        self.type_bitmaps: Dict[str, int] = {}
+        self.country_bitmaps: Dict[str, int] = {}
+        for j in range(len(self.products)):
+            if self.types[j]:
+                self.type_bitmaps[self.types[j]] = self.type_bitmaps.get(self.types[j], 0) | 1 << j
+            for name in self.cheapest_by_country[j]:
+                self.country_bitmaps[name] = self.country_bitmaps.get(name, 0) | 1 << j
+
+        # Distinct rules for products that are currently offered
+        self.rules: List[Tuple] = []
+        seen = set()
+        for rule in rules:
+            if rule[0] in index and rule not in seen:
+                seen.add(rule)
+                self.rules.append(rule)
+        self.rule_product = [index[rule[0]] for rule in self.rules]
+        self.all_rules = (1 << len(self.rules)) - 1
+
+        # Per-dimension value bitmaps and wildcards
+        self.wildcards: Dict[str, int] = {dimension: 0 for dimension in PROFILE_DIMENSIONS}
+        self.values: Dict[str, Dict[str, int]] = {dimension: {} for dimension in PROFILE_DIMENSIONS}
+        for i, rule in enumerate(self.rules):
+            for k, dimension in enumerate(PROFILE_DIMENSIONS, start=1):
+                value = _normalize(rule[k])
+                if value is None:
+                    self.wildcards[dimension] |= 1 << i
+                else:
+                    self.values[dimension][value] = self.values[dimension].get(value, 0) | 1 << i
+
+        # Age interval table: exact bound points and the open gaps between them
+        low_col, high_col = len(PROFILE_DIMENSIONS) + 1, len(PROFILE_DIMENSIONS) + 2
+        self.age_wildcard = 0
+        bounded = []
+        for i, rule in enumerate(self.rules):
+            low, high = rule[low_col], rule[high_col]
+            if low is None and high is None:
+                self.age_wildcard |= 1 << i
+            else:
+                bounded.append((i, float("-inf") if low is None else low, float("inf") if high is None else high))
+        self.age_bounds = sorted({b for _, low, high in bounded for b in (low, high) if b not in (float("-inf"), float("inf"))})
+        self.age_points = [0] * len(self.age_bounds)
+        self.age_gaps = [0] * (len(self.age_bounds) + 1)
+        for i, low, high in bounded:
+            for s, bound in enumerate(self.age_bounds):
+                if low <= bound <= high:
+                    self.age_points[s] |= 1 << i
+            for s in range(len(self.age_gaps)):
+                # Gap s lies strictly between bound s-1 and bound s
+                left = self.age_bounds[s - 1] if s > 0 else float("-inf")
+                right = self.age_bounds[s] if s < len(self.age_bounds) else float("inf")
+                if low <= left and right <= high:
+                    self.age_gaps[s] |= 1 << i
+
+    def _age_bitmap(self, age: Optional[float]) -> int:
+        if age is None:
+            return self.age_wildcard
+        s = bisect_left(self.age_bounds, age)
+        if s < len(self.age_bounds) and self.age_bounds[s] == age:
+            return self.age_wildcard | self.age_points[s]
+        return self.age_wildcard | self.age_gaps[s]
+
+    def matching_rules(self, profile: Dict[str, Any]) -> int:
+        """Bitmap of the restriction rules that apply to a profile (those restriction_applies accepts)"""
+        match = self.all_rules & self._age_bitmap(profile.get("age_months"))
+        for dimension in PROFILE_DIMENSIONS:
+            value = _normalize(profile.get(dimension))
+            match &= self.wildcards[dimension] | (self.values[dimension].get(value, 0) if value else 0)
+        return match
+
+    def lookup(
+        self,
+        profile: Dict[str, Any],
+        country: Optional[str] = None,
+        product_type: Optional[str] = None,
+        product_name: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Products allowed for a profile, cheapest first.
+
+        A product is excluded when any matching rule marks it ineligible;
+        otherwise it carries the tightest max_perc_feed / max_perc_conc of its
+        matching rules (None when unrestricted).
+        """
+        caps: Dict[int, List[Optional[float]]] = {}
+        ineligible = 0
+        for i in _bits(self.matching_rules(profile)):
+            rule, j = self.rules[i], self.rule_product[i]
+            if not rule[-3]:
+                ineligible |= 1 << j
+            feed, conc = caps.setdefault(j, [None, None])
+            if rule[-2] is not None:
+                caps[j][0] = rule[-2] if feed is None else min(feed, rule[-2])
+            if rule[-1] is not None:
+                caps[j][1] = rule[-1] if conc is None else min(conc, rule[-1])
+
+        candidates = self.all_products
+        if country:
+            candidates &= self.country_bitmaps.get(country, 0)
+        if product_type:
+            candidates &= self.type_bitmaps.get(product_type, 0)
+        if product_name:
+            needle = product_name.lower()
+            candidates &= sum(1 << j for j, name in enumerate(self.products) if needle in name.lower())
+        eligible = candidates & ~ineligible
+
+        rows = []
+        for j in _bits(eligible):
+            offer = self.cheapest_by_country[j][country] if country else self.cheapest[j]
+            row = dict(zip(RESULT_FIELDS, offer))
+            row["type"] = self.types[j]
+            row["max_perc_feed"], row["max_perc_conc"] = caps.get(j, (None, None))
+            rows.append(row)
+        rows.sort(key=lambda r: (r["cost_per_kg_usd"] is None, r["cost_per_kg_usd"] or 0, r["product_name"]))
+
+        return {
+            "products": rows[:limit] if limit else rows,
+            "eligible_count": len(rows),
+            "ineligible": sorted(self.products[j] for j in _bits(candidates & ineligible)),
+        }
+
+
+def load_restriction_rules(conn: sqlite3.Connection) -> List[Tuple]:
+    """Active restriction rules keyed by product name, in RULE_COLUMNS order"""
+    return conn.execute(f"""
+    SELECT p.{RULE_COLUMNS[0]}, {', '.join('r.' + column for column in RULE_COLUMNS[1:])}
+    FROM feed_product_restrictions r
+    JOIN feed_products_sample p ON p.id = r.product_id
+    WHERE r.is_active = 1
+    """).fetchall()
+
+
+class EligibilityIndex:
+    """Holds the eligibility snapshot for the current data version, rebuilding it after writes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._snapshot: Optional[EligibilitySnapshot] = None
+
+    def snapshot(self, conn: sqlite3.Connection) -> EligibilitySnapshot:
+        version = get_data_version(conn)
+        with self._lock:
+            if self._snapshot is None or self._version != version:
+                self._snapshot = EligibilitySnapshot(
+                    [tuple(row) for row in load_restriction_rules(conn)],
+                    [tuple(row) for row in load_active_products(conn)]
+                )
+                self._version = version
+            return self._snapshot
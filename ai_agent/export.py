@@ -0,0 +1,179 @@
+"""
+Columnar export for the Feed Products AI Agent
+Streams catalogue slices and query results from a SQLite cursor as Arrow IPC
+or Parquet record batches, column by column, without building a dict per row
+"""
+
+import sqlite3
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from config import EXPORT_BATCH_ROWS, EXPORT_MAX_ROWS, EXPORT_TIME_BUDGET_MS
+from database import PRODUCT_COLUMNS
+from metrics import EXPORT_ROWS
+from sql_governor import SQLGovernor
+
+# Try to import PyArrow for Arrow IPC / Parquet output
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Export formats: media type and file extension
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Columns of a catalogue slice
+CATALOGUE_COLUMNS = ("id",) + PRODUCT_COLUMNS + ("cost_per_kg_usd",)
+
+# Arrow types of known columns; anything else is inferred from its first batch
+COLUMN_TYPES = {
+    "id": "int64", "created_at": "int64", "is_active": "int64", "is_standard_product": "int64",
+    "cost_per_kg": "float64", "cost_per_kg_usd": "float64", "avg_price": "float64", "avg_price_usd": "float64",
+    "min_price": "float64", "max_price": "float64", "forecast": "float64", "forecast_usd": "float64",
+    "lower_80": "float64", "upper_80": "float64", "lower_95": "float64", "upper_95": "float64",
+    "max_perc_feed": "float64", "max_perc_conc": "float64",
+    "min_age_months": "int64", "max_age_months": "int64",
+}
+
+# Exported query results run under the governor with export-sized limits
+EXPORT_GOVERNOR = SQLGovernor(max_rows=EXPORT_MAX_ROWS, time_budget_ms=EXPORT_TIME_BUDGET_MS, max_vm_steps=10 ** 15)
+
+
+def format_for_path(path: str) -> str:
+    """Export format implied by a file name (.parquet, otherwise Arrow IPC stream)"""
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "arrow"
+
+
+def open_export_connection(db_path: str) -> sqlite3.Connection:
+    """Dedicated read-only connection for one export (usable from the streaming thread)"""
+    return sqlite3.connect(f"file:{quote(db_path)}?mode=ro", uri=True, check_same_thread=False)
+
+
+def catalogue_query(
+    product_name: Optional[str] = None,
+    product_type: Optional[str] = None,
+    country: Optional[str] = None,
+    supplier: Optional[str] = None,
+    include_inactive: bool = False
+) -> Tuple[str, List[Any]]:
+    """SQL and parameters for a catalogue slice (filters as in structured search)"""
+    conditions, params = [], []
+    if not include_inactive:
+        conditions.append("is_active = 1")
+    if product_name:
+        conditions.append("LOWER(product_name) LIKE ?")
+        params.append(f"%{product_name.lower()}%")
+    if product_type:
+        conditions.append("type = ?")
+        params.append(product_type)
+    if country:
+        conditions.append("supplier_country = ?")
+        params.append(country)
+    if supplier:
+        conditions.append("LOWER(supplier) LIKE ?")
+        params.append(f"%{supplier.lower()}%")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT {', '.join(CATALOGUE_COLUMNS)} FROM feed_products_sample {where} ORDER BY id", params
+
+
+def guarded_cursor(conn: sqlite3.Connection, sql: str) -> sqlite3.Cursor:
+    """Cursor over generated SQL, read-only and budgeted (raises QueryRejected)"""
+    return conn.execute(EXPORT_GOVERNOR.guard(conn, sql))
+
+
+class _Sink:
+    """Write-only file object whose bytes are drained after every batch"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def _schema(names: Sequence[str], rows: List[Tuple]) -> "pa.Schema":
+    fields = []
+    for k, name in enumerate(names):
+        if name in COLUMN_TYPES:
+            kind = getattr(pa, COLUMN_TYPES[name])()
+        else:
+            kind = pa.array([row[k] for row in rows]).type if rows else pa.string()
+            if pa.types.is_null(kind):
+                kind = pa.string()
+            elif pa.types.is_integer(kind):
+                # SQLite types values, not columns: later rows of a computed column may be reals
+                kind = pa.float64()
+        fields.append(pa.field(name, kind))
+    return pa.schema(fields)
+
+
+def stream_export(cursor: sqlite3.Cursor, fmt: str, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """
+    Encode a cursor's rows as an Arrow IPC stream or a Parquet file.
+
+    Rows are fetched batch_rows at a time, transposed into columns and
+    written as one record batch (one Parquet row group); the encoded bytes
+    are yielded after every batch, so memory stays bounded by the batch.
+    The schema comes from known column types, else the first batch.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Export requires pyarrow: pip install pyarrow")
+    names = [description[0] for description in cursor.description]
+    rows = cursor.fetchmany(batch_rows)
+    schema = _schema(names, rows)
+
+    sink = _Sink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    written = 0
+    try:
+        while rows:
+            arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            written += len(rows)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+            rows = cursor.fetchmany(batch_rows)
+    finally:
+        writer.close()
+        EXPORT_ROWS.inc(fmt, amount=written)
+    yield sink.drain()
+
+
+def export_to_file(cursor: sqlite3.Cursor, path: str, fmt: Optional[str] = None,
+                   batch_rows: int = EXPORT_BATCH_ROWS) -> int:
+    """Write a cursor's rows to path; returns bytes written"""
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in stream_export(cursor, fmt or format_for_path(path), batch_rows):
+            f.write(chunk)
+            size += len(chunk)
+    return size
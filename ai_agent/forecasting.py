@@ -0,0 +1,166 @@
+"""
+Batch price forecasting for the Feed Products AI Agent
+Fits seasonal naive and Holt-Winters models to every product/country series in
+one vectorized pass and stores the forecasts with confidence bands, so reads
+are plain lookups in the price_forecasts table
+"""
+
+import sqlite3
+import time
+from itertools import product as grid
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics import AnalyticsSnapshot, load_price_histories
+
+SEASON = 12
+DEFAULT_HORIZON = 6
+
+# Holt-Winters smoothing grid searched per series (alpha, beta, gamma)
+ALPHAS = (0.2, 0.5, 0.8)
+BETAS = (0.0, 0.1)
+GAMMAS = (0.1, 0.3, 0.5)
+
+# Normal quantiles for the 80% and 95% bands
+Z80, Z95 = 1.2816, 1.96
+
+
+def _holt_winters(y: np.ndarray, alpha: float, beta: float, gamma: float,
+                  horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Additive Holt-Winters over all rows of y at once.
+
+    Missing months are treated as equal to the one-step prediction, so they
+    carry the state forward without updating it. Returns the one-step
+    in-sample predictions and the out-of-sample forecasts.
+    """
+    rows, months = y.shape
+    with np.errstate(invalid="ignore"):
+        level = np.nanmean(y[:, :SEASON], axis=1)
+        trend = (np.nanmean(y[:, SEASON:2 * SEASON], axis=1) - level) / SEASON
+    season = np.nan_to_num(y[:, :SEASON] - level[:, None])
+
+    fitted = np.empty_like(y)
+    for t in range(months):
+        s = season[:, t % SEASON]
+        prediction = level + trend + s
+        fitted[:, t] = prediction
+        observed = np.where(np.isnan(y[:, t]), prediction, y[:, t])
+        new_level = alpha * (observed - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, t % SEASON] = gamma * (observed - new_level) + (1 - gamma) * s
+        level = new_level
+
+    steps = np.arange(1, horizon + 1)
+    forecast = level[:, None] + trend[:, None] * steps + season[:, (months + steps - 1) % SEASON]
+    return fitted, forecast
+
+
+def _rmse(y: np.ndarray, fitted: np.ndarray) -> np.ndarray:
+    """Root mean squared one-step error after the initialization season"""
+    errors = (y[:, SEASON:] - fitted[:, SEASON:]) ** 2
+    counts = np.sum(~np.isnan(errors), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.sqrt(np.nansum(errors, axis=1) / counts)
+
+
+def fit_forecasts(prices: np.ndarray, observations: np.ndarray, horizon: int = DEFAULT_HORIZON) -> Dict[str, np.ndarray]:
+    """
+    Forecast every row of a (series x months) price matrix.
+
+    Series with two full seasons get the better of seasonal naive and the
+    best Holt-Winters grid point (by in-sample RMSE); series with more than
+    one season get seasonal naive; the rest get a naive last-value forecast.
+    Returns forecast, sigma-scaled bands and the chosen method per series.
+    """
+    rows, months = prices.shape
+    steps = np.arange(1, horizon + 1)
+    filled = pd.DataFrame(prices.T).ffill().bfill().to_numpy().T
+
+    # Naive: last observed value, error from month-over-month changes
+    forecast = np.repeat(filled[:, -1:], horizon, axis=1)
+    with np.errstate(invalid="ignore"):
+        sigma = pd.DataFrame(np.diff(prices, axis=1).T).std().to_numpy(copy=True) if months > 1 else np.full(rows, np.nan)
+    spread = np.sqrt(steps)[None, :] * np.ones((rows, 1))
+    method = np.full(rows, "naive", dtype=object)
+
+    if months > SEASON:
+        # Seasonal naive: repeat the last observed season
+        naive_fit = np.full_like(prices, np.nan)
+        naive_fit[:, SEASON:] = filled[:, :-SEASON]
+        naive_rmse = _rmse(prices, naive_fit)
+        naive_forecast = filled[:, months - SEASON + (steps - 1) % SEASON]
+        use = (observations > SEASON) & ~np.isnan(naive_rmse)
+        forecast[use] = naive_forecast[use]
+        sigma[use] = naive_rmse[use]
+        spread[use] = np.sqrt((steps - 1) // SEASON + 1)[None, :]
+        method[use] = "seasonal_naive"
+
+        if months >= 2 * SEASON:
+            best_rmse = np.where(use, naive_rmse, np.inf)
+            eligible = observations >= 2 * SEASON
+            for alpha, beta, gamma in grid(ALPHAS, BETAS, GAMMAS):
+                fitted, hw_forecast = _holt_winters(prices, alpha, beta, gamma, horizon)
+                rmse = _rmse(prices, fitted)
+                better = eligible & (rmse < best_rmse) & ~np.isnan(hw_forecast).any(axis=1)
+                if better.any():
+                    best_rmse[better] = rmse[better]
+                    forecast[better] = hw_forecast[better]
+                    sigma[better] = rmse[better]
+                    spread[better] = np.sqrt(steps)[None, :]
+                    method[better] = "holt_winters"
+
+    sigma = np.nan_to_num(sigma)
+    width = sigma[:, None] * spread
+    return {
+        "forecast": np.maximum(forecast, 0),
+        "lower_80": np.maximum(forecast - Z80 * width, 0),
+        "upper_80": forecast + Z80 * width,
+        "lower_95": np.maximum(forecast - Z95 * width, 0),
+        "upper_95": forecast + Z95 * width,
+        "method": method,
+    }
+
+
+def run_forecasts(conn: sqlite3.Connection, horizon: int = DEFAULT_HORIZON) -> int:
+    """Refit all series and replace the price_forecasts table; returns rows written"""
+    snapshot = AnalyticsSnapshot(load_price_histories(conn))
+    if not len(snapshot.series):
+        conn.execute("DELETE FROM price_forecasts")
+        conn.commit()
+        return 0
+
+    fit = fit_forecasts(snapshot.prices, snapshot.observations, horizon)
+    last_month = pd.Period(snapshot.months[-1], freq="M")
+    months = [str(last_month + step) for step in range(1, horizon + 1)]
+
+    # Latest USD/local ratio per series converts forecasts for cross-country comparison
+    latest = snapshot.latest_index
+    index = np.arange(len(latest))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        usd_ratio = snapshot.usd[index, latest] / snapshot.prices[index, latest]
+
+    generated_at = int(time.time())
+    rows = []
+    for i, (product_name, country, currency) in enumerate(snapshot.series.itertuples(index=False)):
+        for h, month in enumerate(months):
+            usd = fit["forecast"][i, h] * usd_ratio[i]
+            rows.append((
+                product_name, country, currency, month, h + 1, fit["method"][i],
+                round(float(fit["forecast"][i, h]), 4),
+                round(float(fit["lower_80"][i, h]), 4), round(float(fit["upper_80"][i, h]), 4),
+                round(float(fit["lower_95"][i, h]), 4), round(float(fit["upper_95"][i, h]), 4),
+                None if np.isnan(usd) else round(float(usd), 4), generated_at
+            ))
+
+    conn.execute("DELETE FROM price_forecasts")
+    conn.executemany("""
+    INSERT INTO price_forecasts
+    (product_name, supplier_country, cost_currency, month, horizon, method,
+     forecast, lower_80, upper_80, lower_95, upper_95, forecast_usd, generated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    return len(rows)
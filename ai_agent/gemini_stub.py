@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Local Gemini stand-in for load tests
+Answers generateContent REST calls with canned SQL JSON after a configurable latency
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from config import EXAMPLE_QUERIES
+
+# Keyword -> index into EXAMPLE_QUERIES used to pick a plausible canned answer
+INTENT_KEYWORDS = [
+    (("cheapest", "lowest price", "best price"), 0),
+    (("average", "mean"), 2),
+    (("best time", "when to buy", "historical"), 3),
+    (("restriction", "limit"), 4),
+    (("concentrate", "list", "available"), 5),
+    (("trend",), 6),
+    (("supplier", "who sell"), 1),
+]
+
+_QUESTION = re.compile(r'Convert this question to SQL: "(.*)"')
+
+
+def canned_answer(question: str, counter: int) -> Dict[str, str]:
+    """Pick a canned SQL answer for the question, cycling when nothing matches"""
+    lowered = question.lower()
+    index = counter % len(EXAMPLE_QUERIES)
+    for keywords, example_index in INTENT_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            index = example_index
+            break
+    example = EXAMPLE_QUERIES[index]
+    return {
+        "sql": example["sql"].strip(),
+        "explanation": example["explanation"],
+        "response_template": "Results:",
+    }
+
+
+class GeminiStubServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stub's latency settings and counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.5, jitter: float = 0.0, error_rate: float = 0.0):
+        super().__init__(address, GeminiStubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def next_request(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    """Handles POST .../models/<model>:generateContent"""
+
+    server: GeminiStubServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json(200, {"status": "ok", "requests": self.server.requests})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b"{}"
+
+        if ":generateContent" not in self.path:
+            self._send_json(404, {"error": {"code": 404, "message": "Only generateContent is stubbed"}})
+            return
+
+        counter = self.server.next_request()
+        time.sleep(self.server.delay())
+
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self._send_json(503, {"error": {"code": 503, "message": "Stubbed overload", "status": "UNAVAILABLE"}})
+            return
+
+        question = extract_question(raw)
+        answer = canned_answer(question or "", counter)
+        self._send_json(200, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": "```json\n" + json.dumps(answer) + "\n```"}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": 0, "totalTokenCount": 0},
+        })
+
+
+def extract_question(raw: bytes) -> Optional[str]:
+    """Pull the user's question out of a generateContent request body"""
+    try:
+        request = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    for content in reversed(request.get("contents", [])):
+        for part in reversed(content.get("parts", [])):
+            match = _QUESTION.search(part.get("text", ""))
+            if match:
+                return match.group(1)
+    return None
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 8765, latency: float = 0.5,
+               jitter: float = 0.0, error_rate: float = 0.0) -> GeminiStubServer:
+    """Start the stub in a background thread and return the server"""
+    server = GeminiStubServer((host, port), latency=latency, jitter=jitter, error_rate=error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini stand-in returning canned SQL JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before each response (default: 0.5)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- seconds added to latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 503")
+    args = parser.parse_args()
+
+    server = GeminiStubServer((args.host, args.port), latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    print(f"🤖 Gemini stub listening on http://{args.host}:{args.port} (latency {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+GenUI component specs for the Feed Products AI Agent
+Maps the column set of a query result to a typed UI component (table, price
+comparison, time-series chart, supplier contact card) with bilingual labels,
+compiled once per column set so the response text and the spec are rendered
+in a single pass over the rows
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import COUNTRY_TRANSLATIONS
+from language_utils import BilingualFormatter
+
+SPEC_VERSION = 1
+
+# Column labels (English, Arabic)
+COLUMN_LABELS = {
+    "product_name": ("Product", "المنتج"),
+    "name": ("Name", "الاسم"),
+    "type": ("Type", "النوع"),
+    "supplier": ("Supplier", "المورد"),
+    "supplier_country": ("Country", "البلد"),
+    "supplier_email": ("Email", "البريد الإلكتروني"),
+    "supplier_phone": ("Phone", "الهاتف"),
+    "supplier_address": ("Address", "العنوان"),
+    "cost_per_kg": ("Price/kg", "السعر/كغ"),
+    "cost_currency": ("Currency", "العملة"),
+    "cost_per_kg_usd": ("USD/kg", "دولار/كغ"),
+    "avg_price": ("Avg", "المتوسط"),
+    "avg_price_usd": ("Avg USD", "المتوسط بالدولار"),
+    "min_price": ("Min", "الحد الأدنى"),
+    "max_price": ("Max", "الحد الأقصى"),
+    "month": ("Month", "الشهر"),
+    "forecast": ("Forecast", "التوقع"),
+    "lower_80": ("Low (80%)", "الأدنى (80%)"),
+    "upper_80": ("High (80%)", "الأعلى (80%)"),
+    "lower_95": ("Low (95%)", "الأدنى (95%)"),
+    "upper_95": ("High (95%)", "الأعلى (95%)"),
+    "forecast_usd": ("Forecast USD", "التوقع بالدولار"),
+    "method": ("Method", "الطريقة"),
+    "supplier_count": ("Suppliers", "عدد الموردين"),
+    "species": ("Species", "النوع الحيواني"),
+    "sex": ("Sex", "الجنس"),
+    "max_perc_feed": ("Max feed %", "الحد الأقصى من العلف %"),
+    "max_perc_conc": ("Max conc %", "الحد الأقصى من المركز %"),
+}
+
+# Value types the UI formats by; unknown columns are typed by name
+COLUMN_TYPES = {
+    "cost_per_kg": "currency", "avg_price": "currency", "min_price": "currency", "max_price": "currency",
+    "forecast": "currency", "lower_80": "currency", "upper_80": "currency",
+    "lower_95": "currency", "upper_95": "currency",
+    "cost_per_kg_usd": "usd", "avg_price_usd": "usd",
+    "max_perc_feed": "percent", "max_perc_conc": "percent",
+    "cost_currency": "currency_code", "month": "month", "supplier_country": "country", "type": "product_type",
+    "supplier_email": "email", "supplier_phone": "phone",
+}
+
+# Product type values in Arabic
+TYPE_TRANSLATIONS = {"Fodder": "علف خشن", "Concentrate": "علف مركز", "Additive": "مضافات"}
+
+# Columns that locate a row's currency and USD equivalent
+CURRENCY_KEY = "cost_currency"
+USD_KEYS = {"cost_per_kg": "cost_per_kg_usd", "avg_price": "avg_price_usd"}
+
+
+def _label(column: str, language: str) -> str:
+    english, arabic = COLUMN_LABELS.get(column, (column.replace("_", " ").capitalize(), None))
+    return arabic if language == "ar" and arabic else english
+
+
+def _column_type(column: str) -> str:
+    if column in COLUMN_TYPES:
+        return COLUMN_TYPES[column]
+    if "usd" in column:
+        return "usd"
+    if "price" in column or "cost" in column:
+        return "currency"
+    if "pct" in column or "perc" in column:
+        return "percent"
+    if "count" in column or column.startswith(("num_", "total_")):
+        return "number"
+    return "text"
+
+
+def _component(columns: Tuple[str, ...]) -> Tuple[str, Dict[str, Any]]:
+    """Component and its column bindings for a result column set"""
+    present = set(columns)
+    price = next((c for c in ("cost_per_kg", "avg_price") if c in present), None)
+    series_by = next((c for c in ("product_name", "supplier_country", "supplier") if c in present), None)
+
+    if "month" in present and ("forecast" in present or price or "min_price" in present):
+        y = "forecast" if "forecast" in present else price or "min_price"
+        band = next(((low, high) for low, high in (("lower_80", "upper_80"), ("min_price", "max_price"))
+                     if low in present and high in present and low != y), None)
+        return "time_series_chart", {
+            "x": "month", "y": y, "series_by": series_by,
+            "band": list(band) if band else None,
+            "currency_key": CURRENCY_KEY if CURRENCY_KEY in present else None,
+        }
+
+    # Supplier listings (supplier first, with contact details) are contact cards, priced or not
+    if columns[0] == "supplier" and present & {"supplier_email", "supplier_phone"}:
+        return "supplier_contact_card", {
+            **{field: column if column in present else None
+               for field, column in (("name", "supplier"), ("country", "supplier_country"),
+                                     ("email", "supplier_email"), ("phone", "supplier_phone"),
+                                     ("address", "supplier_address"), ("product", "product_name"))},
+            "price": price,
+            "price_usd": USD_KEYS[price] if price and USD_KEYS[price] in present else None,
+            "currency_key": CURRENCY_KEY if CURRENCY_KEY in present else None,
+        }
+
+    if price and present & {"supplier", "product_name", "supplier_country"}:
+        title = next(c for c in ("supplier", "product_name", "supplier_country") if c in present)
+        usd = USD_KEYS[price] if USD_KEYS[price] in present else None
+        return "price_comparison", {
+            "item_title": title,
+            "item_subtitle": [c for c in ("product_name", "supplier_country", "type") if c in present and c != title],
+            "price": price,
+            "price_usd": usd,
+            "currency_key": CURRENCY_KEY if CURRENCY_KEY in present else None,
+            "range": ["min_price", "max_price"] if {"min_price", "max_price"} <= present else None,
+            "highlight": {"key": usd or price, "rule": "min"},
+        }
+
+    return "table", {}
+
+
+def _money(value: float) -> str:
+    return f"{value:.2f}"
+
+
+def _currency(row: Dict[str, Any]) -> str:
+    return row.get(CURRENCY_KEY) or "USD"
+
+
+def _usd(row: Dict[str, Any], column: str) -> str:
+    """' (≈ USD x.xxx)' after a local-currency price, or nothing for USD prices"""
+    usd = row.get(USD_KEYS[column])
+    return f" (≈ USD {usd:.3f})" if usd is not None and _currency(row) != "USD" else ""
+
+
+class Layout:
+    """
+    A result layout compiled for one column set, response template and language.
+
+    Holds the component spec (everything but the rows) and the per-row text
+    formatters for the columns actually present, so rendering is one pass
+    that looks values up instead of probing columns or rewriting text.
+    """
+
+    def __init__(self, columns: Tuple[str, ...], template: str, language: str):
+        self.language = language
+        arabic = language == "ar"
+        present = set(columns)
+        countries = COUNTRY_TRANSLATIONS if arabic else {}
+        types = TYPE_TRANSLATIONS if arabic else {}
+        self.title = BilingualFormatter(language).format_header(template.replace(":", "").strip())
+
+        component, bindings = _component(columns)
+        self.spec: Dict[str, Any] = {
+            "version": SPEC_VERSION,
+            "component": component,
+            "title": self.title,
+            "language": language,
+            "direction": "rtl" if arabic else "ltr",
+            "columns": [{"key": c, "label": _label(c, language), "type": _column_type(c)} for c in columns],
+            **bindings,
+        }
+        value_labels = {}
+        if arabic and "supplier_country" in present:
+            value_labels["supplier_country"] = dict(COUNTRY_TRANSLATIONS)
+        if arabic and "type" in present:
+            value_labels["type"] = dict(TYPE_TRANSLATIONS)
+        if value_labels:
+            self.spec["value_labels"] = value_labels
+
+        # Text parts in the order the plain-text response has always used
+        label = lambda column: _label(column, language)
+        parts: List[Callable[[Dict[str, Any]], Optional[str]]] = []
+        if "supplier" in present:
+            parts.append(lambda row: row["supplier"] or None)
+        if "product_name" in present:
+            parts.append(lambda row: f"{row['product_name']}")
+        if "supplier_country" in present:
+            parts.append(lambda row: f"({countries.get(row['supplier_country'], row['supplier_country'])})")
+        if "cost_per_kg" in present:
+            parts.append(lambda row: f"- {_currency(row)} {_money(row['cost_per_kg'])}/kg{_usd(row, 'cost_per_kg')}"
+                         if row["cost_per_kg"] else None)
+        if "avg_price" in present:
+            avg = label("avg_price")
+            parts.append(lambda row: f"{avg}: {_currency(row)} {_money(row['avg_price'])}{_usd(row, 'avg_price')}"
+                         if row["avg_price"] is not None else None)
+        if "forecast" in present:
+            forecast = label("forecast")
+            ranged = "lower_80" in present and "upper_80" in present
+
+            def forecast_part(row):
+                if row["forecast"] is None:
+                    return None
+                text = f"{forecast}: {_currency(row)} {_money(row['forecast'])}"
+                if ranged and row["lower_80"] is not None and row["upper_80"] is not None:
+                    text += f" ({_money(row['lower_80'])}–{_money(row['upper_80'])})"
+                return text
+            parts.append(forecast_part)
+        for column in ("min_price", "max_price"):
+            if column in present:
+                parts.append(lambda row, column=column, text=label(column):
+                             f"{text}: {_money(row[column])}" if row[column] is not None else None)
+        if "type" in present:
+            parts.append(lambda row: f"[{types.get(row['type'], row['type'])}]")
+        if "species" in present:
+            species = label("species")
+            parts.append(lambda row: f"{species}: {row['species']}")
+        for column in ("max_perc_feed", "max_perc_conc"):
+            if column in present:
+                parts.append(lambda row, column=column, text=label(column): f"{text}: {row[column]}" if row[column] else None)
+        if "supplier_email" in present:
+            parts.append(lambda row: f"📧 {row['supplier_email']}" if row["supplier_email"] else None)
+        if "supplier_phone" in present:
+            parts.append(lambda row: f"📞 {row['supplier_phone']}" if row["supplier_phone"] else None)
+        if "month" in present:
+            parts.insert(0, lambda row: f"{row['month']}")
+        self.parts = parts
+
+    def render_text(self, rows: Sequence[Dict[str, Any]]) -> str:
+        lines = [self.title + ":", ""]
+        for i, row in enumerate(rows, 1):
+            values = [text for text in (part(row) for part in self.parts) if text]
+            lines.append(f"{i}. " + " ".join(values))
+        return "\n".join(lines)
+
+
+@lru_cache(maxsize=256)
+def compile_layout(columns: Tuple[str, ...], template: str, language: str) -> Layout:
+    """Layout for a column set, compiled on first use and reused afterwards"""
+    return Layout(columns, template, language)
+
+
+def render(rows: Sequence[Dict[str, Any]], template: str, language: str) -> Tuple[str, Dict[str, Any]]:
+    """Plain-text response and component spec for a query result"""
+    if not rows:
+        message = BilingualFormatter(language).format_no_results()
+        return message, {
+            "version": SPEC_VERSION, "component": "message", "title": message,
+            "language": language, "direction": "rtl" if language == "ar" else "ltr",
+        }
+    layout = compile_layout(tuple(rows[0]), template or "Results", language)
+    return layout.render_text(rows), dict(layout.spec)
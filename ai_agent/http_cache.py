@@ -0,0 +1,150 @@
+"""
+HTTP caching helpers for the catalogue endpoints
+ETags tied to the database data version, conditional GET and compression
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+from config import HTTP_CACHE_MAX_AGE, HTTP_CACHE_MAX_ENTRIES, HTTP_COMPRESSION_MIN_BYTES
+from metrics import CACHE_REQUESTS
+
+# Try to import brotli for better compression ratios
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+class CachedPayload:
+    """A serialized response body and its encodings for one data version"""
+
+    __slots__ = ("version", "etag", "body", "encoded")
+
+    def __init__(self, version: str, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.encoded: Dict[str, bytes] = {}
+
+    def get_encoded(self, encoding: str) -> bytes:
+        """Compress the body once per encoding and keep the result"""
+        if encoding not in self.encoded:
+            if encoding == "br":
+                self.encoded[encoding] = brotli.compress(self.body, quality=5)
+            else:
+                self.encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self.encoded[encoding]
+
+
+class ResponseCache:
+    """
+    Caches JSON payloads per endpoint key until the data version changes.
+
+    Repeated polls at the same version skip the database entirely, and
+    clients that send a matching If-None-Match get an empty 304. Keys carry
+    client-supplied parameters, so at most max_entries payloads are kept
+    (least recently used dropped first), and once a new data version is seen
+    every payload built at the version it replaces is dropped.
+    """
+
+    def __init__(self, max_age: int = HTTP_CACHE_MAX_AGE, min_compress_bytes: int = HTTP_COMPRESSION_MIN_BYTES,
+                 max_entries: int = HTTP_CACHE_MAX_ENTRIES):
+        self.max_age = max_age
+        self.min_compress_bytes = min_compress_bytes
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, CachedPayload]" = OrderedDict()
+        # Handlers run on the event loop and on threadpool threads
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Drop all cached payloads"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, entry: CachedPayload, replaced: Optional[CachedPayload]):
+        """Insert entry as most recently used (caller holds the lock)"""
+        if replaced is not None and replaced.version != entry.version:
+            # The data changed: nothing built at the old version can be served again
+            for stale in [k for k, e in self._entries.items() if e.version == replaced.version]:
+                del self._entries[stale]
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _choose_encoding(self, request: Request, body_size: int) -> Optional[str]:
+        """Pick the best compression the client accepts for large bodies"""
+        if body_size < self.min_compress_bytes:
+            return None
+
+        accepted = set()
+        for part in request.headers.get("accept-encoding", "").split(","):
+            name, _, params = part.strip().partition(";")
+            if params.replace(" ", "") in ("q=0", "q=0.0"):
+                continue
+            accepted.add(name.strip().lower())
+
+        if BROTLI_AVAILABLE and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def respond(
+        self,
+        request: Request,
+        key: str,
+        version: str,
+        build: Callable[[], Any]
+    ) -> Response:
+        """
+        Return a cached, conditional and compressed JSON response.
+
+        Args:
+            request: Incoming request (for If-None-Match and Accept-Encoding)
+            key: Cache key identifying the endpoint and its parameters
+            version: Current data version; a change invalidates the entry
+            build: Callable producing the JSON-serializable payload
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+        if entry is None or entry.version != version:
+            CACHE_REQUESTS.inc("http", "miss")
+            body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            replaced, entry = entry, CachedPayload(version, body)
+            with self._lock:
+                self._store(key, entry, replaced)
+        else:
+            CACHE_REQUESTS.inc("http", "hit")
+
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"public, max-age={self.max_age}, must-revalidate",
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match:
+            candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if entry.etag in candidates or "*" in candidates:
+                return Response(status_code=304, headers=headers)
+
+        encoding = self._choose_encoding(request, len(entry.body))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(content=entry.get_encoded(encoding), media_type="application/json", headers=headers)
+
+        return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -2,7 +2,7 @@
 Language detection and translation utilities for bilingual support (Arabic/English)
 """
 
-from typing import Tuple, Optional
+from typing import Any, Dict, Tuple, Optional
 import re
 
 # Try to import language detection library
@@ -249,6 +249,71 @@ def extract_country_from_query(query: str) -> Optional[str]:
     return None
 
 
+# Animal profile terms (English words are matched whole, Arabic as substrings)
+ANIMAL_SPECIES_TERMS = {
+    "cattle": ["cattle", "cow", "cows", "heifer", "heifers", "bull", "bulls", "calf", "calves", "steer", "steers",
+               "ماشية", "أبقار", "ابقار", "بقر", "عجول", "عجل"],
+    "sheep": ["sheep", "ewe", "ewes", "lamb", "lambs", "ram", "rams", "أغنام", "اغنام", "خراف", "نعاج", "حملان"],
+    "goat": ["goat", "goats", "kid", "kids", "ماعز"],
+    "camel": ["camel", "camels", "إبل", "ابل", "جمال", "نوق"],
+}
+
+ANIMAL_SEX_TERMS = {
+    "female": ["female", "females", "cow", "cows", "heifer", "heifers", "ewe", "ewes", "doe", "does",
+               "أنثى", "اناث", "إناث", "نعاج"],
+    "male": ["male", "males", "bull", "bulls", "steer", "steers", "ram", "rams", "buck", "bucks",
+             "ذكر", "ذكور", "ثيران"],
+}
+
+PRODUCTION_FOCUS_TERMS = {
+    "dairy": ["dairy", "milking", "lactating", "حلوب", "ألبان", "البان"],
+    "beef": ["beef", "feedlot", "تسمين"],
+    "meat": ["meat", "لحم", "لحوم"],
+    "wool": ["wool", "صوف"],
+}
+
+
+def _has_term(query: str, terms) -> bool:
+    query_lower = query.lower()
+    for term in terms:
+        if term.isascii():
+            if re.search(rf"\b{re.escape(term)}\b", query_lower):
+                return True
+        elif term in query:
+            return True
+    return False
+
+
+def extract_animal_profile_from_query(query: str) -> Dict[str, Any]:
+    """
+    Extract an animal profile (species, sex, age_months, lactation_cycle,
+    production_focus) from a query; keys that are not mentioned are omitted
+    """
+    query_lower = query.lower()
+    profile: Dict[str, Any] = {}
+    
+    for field, table in (("species", ANIMAL_SPECIES_TERMS), ("sex", ANIMAL_SEX_TERMS),
+                         ("production_focus", PRODUCTION_FOCUS_TERMS)):
+        for value, terms in table.items():
+            if _has_term(query, terms):
+                profile[field] = value
+                break
+    
+    # Ages: "18 months", "18-month", "2 years", "18 شهر"
+    months = re.search(r"(\d+(?:\.\d+)?)\s*-?\s*(?:months?|mo\b|شهر|أشهر|اشهر|شهور)", query_lower)
+    years = re.search(r"(\d+(?:\.\d+)?)\s*-?\s*(?:years?|yrs?\b|سنة|سنوات|عام)", query_lower)
+    if months:
+        profile["age_months"] = float(months.group(1))
+    elif years:
+        profile["age_months"] = float(years.group(1)) * 12
+    
+    cycle = re.search(r"\b(early|mid|late)[\s-]*(?:lactation|lactating)", query_lower)
+    if cycle:
+        profile["lactation_cycle"] = cycle.group(1)
+    
+    return profile
+
+
 def format_response_bilingual(response: str, target_language: str) -> str:
     """
     Format response in the target language
@@ -307,6 +372,15 @@ class BilingualFormatter:
             "Suppliers": "الموردين",
             "Products": "المنتجات",
             "Restrictions": "القيود",
+            "Eligible products (cheapest offer)": "المنتجات المسموحة (أرخص عرض)",
+            "Here are the cheapest suppliers": "أرخص الموردين",
+            "Average prices by country": "متوسط الأسعار حسب البلد",
+            "Price forecast (80% range)": "توقعات الأسعار (نطاق 80%)",
+            "Best months to buy (lowest prices)": "أفضل أشهر الشراء (أقل الأسعار)",
+            "Here are the suppliers": "الموردين",
+            "Available products": "المنتجات المتوفرة",
+            "Product restrictions": "قيود المنتجات",
+            "Search results": "نتائج البحث",
         }
         
         if self.language == 'ar':
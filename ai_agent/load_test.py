@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+HTTP load-testing harness for the Feed Products AI Agent API
+Replays a weighted mix of endpoints at a target rate against a locally
+started server (backed by the Gemini stand-in) and reports throughput
+and p50/p95/p99 latency per endpoint
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from config import BASE_DIR
+
+# Try to import aiohttp for the async HTTP client
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+DEFAULT_MIX = {"query": 4, "search": 3, "history": 1, "catalogue": 2}
+
+QUESTIONS = [
+    "Who is selling the cheapest Wheat Straw?",
+    "What is the average price of Barley in UAE?",
+    "Which suppliers sell Alfalfa hay in Saudi Arabia?",
+    "When is the best time to buy Corn?",
+    "List all concentrates in Egypt",
+    "What restrictions apply to Urea for cattle?",
+    "من يبيع أرخص قش القمح؟",
+    "ما هو متوسط سعر الشعير في الإمارات؟",
+]
+
+PRODUCTS = ["Wheat Straw", "Barley", "Alfalfa", "Corn", "Soya Bean Meal", "Molasses"]
+COUNTRIES = ["UAE", "Saudi Arabia", "Egypt", "Qatar", None]
+TYPES = ["Fodder", "Concentrate", "Additive", None]
+CATALOGUE_PATHS = ["/products/types", "/products/countries", "/products/suppliers", "/stats", "/examples"]
+
+# (label, method, path, json body)
+Request = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+
+def build_request(kind: str, rng: random.Random) -> Request:
+    """Create one request of the given kind with randomized parameters"""
+    if kind == "query":
+        return "POST /query", "POST", "/query", {"query": rng.choice(QUESTIONS)}
+
+    if kind == "search":
+        body = {"limit": rng.choice([10, 20, 50])}
+        for key, choices in (("product_name", PRODUCTS + [None]), ("country", COUNTRIES), ("product_type", TYPES)):
+            value = rng.choice(choices)
+            if value:
+                body[key] = value
+        if rng.random() < 0.3:
+            body["max_price"] = round(rng.uniform(1, 5), 2)
+        return "POST /search/products", "POST", "/search/products", body
+
+    if kind == "history":
+        path = f"/products/{quote(rng.choice(PRODUCTS))}/history"
+        country = rng.choice(COUNTRIES)
+        if country:
+            path += f"?country={quote(country)}"
+        return "GET /products/{name}/history", "GET", path, None
+
+    path = rng.choice(CATALOGUE_PATHS)
+    return f"GET {path}", "GET", path, None
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse 'query=4,search=3,...' into weights"""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown request kind '{name}' (expected one of {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def run_load(base_url: str, rate: float, duration: float, mix: Dict[str, float],
+                   concurrency: int, seed: int = 42) -> Tuple[List[Tuple[str, int, float]], float]:
+    """
+    Send requests open-loop at `rate` per second for `duration` seconds.
+
+    Latency is measured from each request's scheduled start, so time spent
+    waiting for a free connection counts against the server rather than
+    silently lowering the offered load.
+    """
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    total = int(rate * duration)
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[Tuple[str, int, float]] = []
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=timeout) as session:
+
+        async def fire(request: Request, scheduled: float):
+            label, method, path, body = request
+            async with semaphore:
+                try:
+                    async with session.request(method, path, json=body) as response:
+                        await response.read()
+                        status = response.status
+                except Exception:
+                    status = 0
+            samples.append((label, status, time.perf_counter() - scheduled))
+
+        tasks = []
+        started = time.perf_counter()
+        for i in range(total):
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            request = build_request(rng.choices(kinds, weights=weights)[0], rng)
+            tasks.append(asyncio.create_task(fire(request, scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return samples, elapsed
+
+
+def summarize(samples: List[Tuple[str, int, float]], elapsed: float) -> Dict[str, Dict[str, float]]:
+    """Per-endpoint and overall throughput and latency percentiles"""
+    groups: Dict[str, List[Tuple[int, float]]] = {}
+    for label, status, latency in samples:
+        groups.setdefault(label, []).append((status, latency))
+        groups.setdefault("ALL", []).append((status, latency))
+
+    report = {}
+    for label in sorted(groups, key=lambda name: (name == "ALL", name)):
+        entries = groups[label]
+        latencies = sorted(latency for _, latency in entries)
+        errors = sum(1 for status, _ in entries if not 200 <= status < 400)
+        report[label] = {
+            "requests": len(entries),
+            "errors": errors,
+            "throughput_rps": round(len(entries) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, float]], rate: float, elapsed: float):
+    print(f"\n📈 Load test results (offered {rate:g} req/s for {elapsed:.1f}s)")
+    print("-" * 100)
+    print(f"{'endpoint':<36}{'reqs':>7}{'errors':>8}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for label, values in report.items():
+        print(f"{label:<36}{values['requests']:>7}{values['errors']:>8}{values['throughput_rps']:>9.1f}"
+              f"{values['p50_ms']:>8.1f}ms{values['p95_ms']:>8.1f}ms{values['p99_ms']:>8.1f}ms{values['max_ms']:>8.0f}ms")
+
+
+def start_api_server(port: int, env_overrides: Dict[str, str], workers: int = 1) -> subprocess.Popen:
+    """Start `main.py --api` on localhost and wait until /health answers"""
+    from urllib.request import urlopen
+
+    env = dict(os.environ, **env_overrides)
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "--api", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            with urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return process
+        except Exception:
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("API server did not become healthy within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Feed Products AI Agent API")
+    parser.add_argument("--url", type=str, help="Target an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8100, help="Port for the locally started server (default: 8100)")
+    parser.add_argument("--rate", type=float, default=20, help="Offered load in requests per second (default: 20)")
+    parser.add_argument("--duration", type=float, default=30, help="Test duration in seconds (default: 30)")
+    parser.add_argument("--concurrency", type=int, default=256, help="Maximum requests in flight (default: 256)")
+    parser.add_argument("--mix", type=str, default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="Weighted request mix (default: query=4,search=3,history=1,catalogue=2)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Gemini stub latency in seconds (default: 0.5)")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="Gemini stub latency jitter in seconds")
+    parser.add_argument("--stub-port", type=int, default=8765, help="Port for the Gemini stub (default: 8765)")
+    parser.add_argument("--no-llm", action="store_true", help="Run the server without Gemini (pattern fallback only)")
+    parser.add_argument("--db-path", type=str, help="DATABASE_PATH for the locally started server")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the locally started server")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the request mix")
+    parser.add_argument("--output", "-o", type=str, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    if not AIOHTTP_AVAILABLE:
+        print("❌ aiohttp is required for load testing: pip install aiohttp")
+        sys.exit(1)
+
+    mix = parse_mix(args.mix)
+    stub = None
+    server = None
+    base_url = args.url
+    cache_dir = tempfile.TemporaryDirectory()
+
+    try:
+        if not base_url:
+            # Start from an empty query cache so earlier runs do not skew the results
+            env = {"QUERY_CACHE_PATH": str(Path(cache_dir.name) / "query_cache.db")}
+            # All load comes from one client: measure capacity, not per-client rate limits
+            env.update(RATE_LIMIT_LLM_PER_MINUTE="0", RATE_LIMIT_DIRECT_PER_SECOND="0")
+            if args.no_llm:
+                env["GOOGLE_API_KEY"] = ""
+            else:
+                from gemini_stub import start_stub
+                stub = start_stub(port=args.stub_port, latency=args.llm_latency, jitter=args.llm_jitter)
+                env["GOOGLE_API_KEY"] = "load-test-stub"
+                env["GEMINI_API_ENDPOINT"] = f"http://127.0.0.1:{args.stub_port}"
+                print(f"🤖 Gemini stub on port {args.stub_port} ({args.llm_latency}s ± {args.llm_jitter}s)")
+            if args.db_path:
+                env["DATABASE_PATH"] = args.db_path
+            print(f"🚀 Starting API server on port {args.port} ({args.workers} worker(s))...")
+            server = start_api_server(args.port, env, args.workers)
+            base_url = f"http://127.0.0.1:{args.port}"
+
+        print(f"🔥 Offering {args.rate:g} req/s for {args.duration:g}s to {base_url} (mix: {args.mix})")
+        samples, elapsed = asyncio.run(run_load(base_url, args.rate, args.duration, mix, args.concurrency, args.seed))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        if stub:
+            stub.shutdown()
+        cache_dir.cleanup()
+
+    report = summarize(samples, elapsed)
+    print_report(report, args.rate, elapsed)
+    if stub:
+        print(f"\n🤖 Gemini stub served {stub.requests} calls")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"rate": args.rate, "duration_s": round(elapsed, 2), "mix": mix, "endpoints": report}, f, indent=2)
+        print(f"✅ Wrote report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,36 @@ Feed Products AI Agent - Main Entry Point
 Run the CLI or API server
 """
 
+import os
 import sys
 import argparse
 
 
+def print_metrics_summary(host: str, port: int):
+    """Fetch /metrics from a running API server and print a latency summary"""
+    from urllib.request import urlopen
+    from metrics import summarize
+    
+    url = f"http://{host if host != '0.0.0.0' else 'localhost'}:{port}/metrics"
+    try:
+        with urlopen(url, timeout=2) as response:
+            summary = summarize(response.read().decode("utf-8"))
+    except Exception:
+        print(f"\n⏱️  No API server reachable at {url}; latency metrics unavailable.")
+        return
+    
+    print(f"\n⏱️  Query Latency ({url}):")
+    print("-" * 40)
+    print(f"{'stage':<16}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, values in summary["stages"].items():
+        print(f"{stage:<16}{values['count']:>8}{values['mean_ms']:>8.1f}ms"
+              f"{values['p50_ms']:>8.1f}ms{values['p95_ms']:>8.1f}ms{values['p99_ms']:>8.1f}ms")
+    
+    print("\n🔢 Counters:")
+    for name, value in summary["counters"].items():
+        print(f"  {name}: {value:g}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Feed Products AI Agent - Query feed products data using natural language",
@@ -18,8 +44,19 @@ Examples:
   python main.py --cli              # Start interactive CLI
   python main.py --api              # Start REST API server
   python main.py --api --port 8080  # Start API on custom port
+  python main.py --forecast --horizon 6  # Refit price forecasts for all series
+  python main.py --ingest-prices prices.csv  # Upsert price observations (CSV/JSON, - for stdin)
+  python main.py --export prices.parquet --export-filter country=Egypt  # Catalogue slice to Parquet
+  python main.py --query "wheat straw price history" --export history.arrows  # Query result as Arrow IPC
+  python main.py --ration groups.json   # Least-cost rations for a JSON list of animal groups
+  python main.py --api --workers 4   # Prefork 4 API workers sharing one query cache
+  python main.py --api --read-only  # Serve a replica from a read-only, memory-mapped database
   python main.py --init-db          # Initialize/reset database
+  python main.py --generate 10000000 --seed 7   # Synthetic catalogue for scale testing
   python main.py --query "Who sells cheapest wheat straw?"
+  python main.py --daemon           # Keep a warm agent on a Unix socket for instant CLI queries
+  python main.py --batch questions.jsonl --batch-output answers.jsonl  # Many questions, one agent per worker
+  python main.py --stats --port 8000  # DB stats plus latency from a running API
 
 Environment Variables:
   GOOGLE_API_KEY    - Google Gemini API key for AI-powered queries
@@ -46,6 +83,12 @@ Environment Variables:
         help="API server port (default: 8000)"
     )
     
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        help="API worker processes sharing the plan/result cache (default: 1), or --batch/--daemon worker threads (default: BATCH_WORKERS/AGENT_DAEMON_WORKERS)"
+    )
+    
     parser.add_argument(
         "--host",
         type=str,
@@ -53,26 +96,131 @@ Environment Variables:
         help="API server host (default: 0.0.0.0)"
     )
     
+    parser.add_argument(
+        "--read-only",
+        action="store_true",
+        help="Open the database read-only with mmap (for API replicas that never write)"
+    )
+    
     parser.add_argument(
         "--init-db",
         action="store_true",
         help="Initialize or reset the database"
     )
     
+    parser.add_argument(
+        "--generate",
+        type=int,
+        metavar="ROWS",
+        help="Generate a synthetic catalogue of about ROWS price rows and exit"
+    )
+    
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Random seed for --generate (default: 42)"
+    )
+    
+    parser.add_argument(
+        "--months",
+        type=int,
+        default=25,
+        help="Months of price history per series for --generate (default: 25)"
+    )
+    
+    parser.add_argument(
+        "--db-path",
+        type=str,
+        help="Database file for --generate (default: feed_products_synthetic.db) or --forecast/--ration/--ingest-prices/--export (default: DATABASE_PATH)"
+    )
+    
+    parser.add_argument(
+        "--forecast",
+        action="store_true",
+        help="Refit price forecasts for every product/country series and exit"
+    )
+    
+    parser.add_argument(
+        "--horizon",
+        type=int,
+        default=6,
+        help="Months ahead to forecast with --forecast (default: 6)"
+    )
+    
+    parser.add_argument(
+        "--ingest-prices",
+        type=str,
+        metavar="FILE",
+        help="Upsert price observations from a CSV or JSON file ('-' for stdin) and exit"
+    )
+    
+    parser.add_argument(
+        "--export",
+        type=str,
+        metavar="FILE",
+        help="Export --query results, or else a catalogue slice, to a Parquet (.parquet) or Arrow IPC file and exit"
+    )
+    
+    parser.add_argument(
+        "--export-filter",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Catalogue slice filter for --export: product_name, product_type, country, supplier or include_inactive (repeatable)"
+    )
+    
+    parser.add_argument(
+        "--ration",
+        type=str,
+        metavar="FILE",
+        help="Solve least-cost rations for the animal groups in a JSON file and exit"
+    )
+    
     parser.add_argument(
         "--query", "-q",
         type=str,
         help="Run a single query and exit"
     )
     
+    parser.add_argument(
+        "--batch", "-b",
+        type=str,
+        metavar="FILE",
+        help="Answer the questions in a JSONL file ('-' for stdin) and write JSONL results"
+    )
+    
+    parser.add_argument(
+        "--batch-output",
+        type=str,
+        metavar="FILE",
+        help="Where --batch writes its results (default: stdout)"
+    )
+    
+    parser.add_argument(
+        "--daemon", "-d",
+        action="store_true",
+        help="Run a resident agent on AGENT_SOCKET_PATH; the CLI and --query use it while it runs"
+    )
+    
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Start a fresh agent even if the daemon is running"
+    )
+    
     parser.add_argument(
         "--stats",
         action="store_true",
-        help="Show database statistics and exit"
+        help="Show database statistics (and latency metrics from a running API) and exit"
     )
     
     args = parser.parse_args()
     
+    # Set before config is imported so the agent (and any worker processes) see it
+    if args.read_only:
+        os.environ["DATABASE_READ_ONLY"] = "1"
+    
     # Initialize database if requested
     if args.init_db:
         print("🔄 Initializing database...")
@@ -82,6 +230,128 @@ Environment Variables:
         print("✅ Database initialized successfully!")
         return
     
+    # Generate a synthetic catalogue if requested
+    if args.generate:
+        from config import BASE_DIR
+        from catalogue_generator import generate_database
+        db_path = args.db_path or str(BASE_DIR / "feed_products_synthetic.db")
+        print(f"🏭 Generating synthetic catalogue in {db_path}...")
+        generate_database(db_path, args.generate, seed=args.seed, months=args.months)
+        print(f"✅ Done. Serve it with: DATABASE_PATH={db_path} python main.py --api")
+        return
+    
+    # Refresh the precomputed forecasts if requested
+    if args.forecast:
+        from database import initialize_database
+        from forecasting import run_forecasts
+        conn = initialize_database(db_path=args.db_path)
+        print(f"📈 Forecasting {args.horizon} months ahead...")
+        count = run_forecasts(conn, horizon=args.horizon)
+        conn.close()
+        print(f"✅ Stored {count} forecast points.")
+        return
+    
+    # Ingest price observations if requested
+    if args.ingest_prices:
+        from database import initialize_database
+        from price_ingest import apply_price_updates, read_observations
+        if args.ingest_prices == "-":
+            text, fmt = sys.stdin.read(), None
+        else:
+            with open(args.ingest_prices, encoding="utf-8") as f:
+                text = f.read()
+            fmt = "csv" if args.ingest_prices.lower().endswith(".csv") else None
+        try:
+            observations = read_observations(text, fmt)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        conn = initialize_database(db_path=args.db_path)
+        summary = apply_price_updates(conn, [observations])[0]
+        conn.close()
+        print(f"💾 {summary['received']} observations: {summary['inserted']} new offers, "
+              f"{summary['rolled_over']} rolled over, {summary['updated']} updated, "
+              f"{summary['historical']} historical, {summary['stale']} stale, {len(summary['rejected'])} rejected")
+        for rejected in summary["rejected"][:10]:
+            print(f"  ⚠️ #{rejected['index']}: {rejected['error']}")
+        return
+    
+    # Export query results or a catalogue slice if requested
+    if args.export:
+        import time
+        from config import DATABASE_PATH
+        from export import (
+            PYARROW_AVAILABLE, catalogue_query, export_to_file, format_for_path,
+            guarded_cursor, open_export_connection
+        )
+        from sql_governor import QueryRejected
+        if not PYARROW_AVAILABLE:
+            print("❌ Export requires pyarrow: pip install pyarrow")
+            return
+        started = time.perf_counter()
+        if args.query:
+            from agent import create_agent
+            from price_ingest import database_file
+            agent = create_agent()
+            plan = agent.plan_query(args.query)
+            db_file = database_file(agent.db)
+            agent.close()
+            if not plan.get("sql"):
+                print("❌ This query is answered from the eligibility index and has no SQL to export")
+                return
+            conn = open_export_connection(db_file)
+            try:
+                cursor = guarded_cursor(conn, plan["sql"])
+            except QueryRejected as e:
+                print(f"❌ {e}")
+                conn.close()
+                return
+        else:
+            filters = dict(item.split("=", 1) for item in args.export_filter if "=" in item)
+            unknown = set(filters) - {"product_name", "product_type", "country", "supplier", "include_inactive"}
+            if unknown:
+                print(f"❌ Unknown export filter: {', '.join(sorted(unknown))}")
+                return
+            include_inactive = filters.pop("include_inactive", "").lower() in ("1", "true", "yes")
+            sql, params = catalogue_query(**filters, include_inactive=include_inactive)
+            conn = open_export_connection(args.db_path or str(DATABASE_PATH))
+            cursor = conn.execute(sql, params)
+        size = export_to_file(cursor, args.export)
+        conn.close()
+        print(f"📦 Wrote {args.export} ({format_for_path(args.export)}, {size / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - started:.1f}s")
+        return
+    
+    # Solve a batch of rations if requested
+    if args.ration:
+        import json
+        from database import initialize_database
+        from ration_optimizer import RationOptimizer, SCIPY_AVAILABLE
+        if not SCIPY_AVAILABLE:
+            print("❌ Ration optimization requires scipy: pip install scipy")
+            return
+        with open(args.ration, encoding="utf-8") as f:
+            spec = json.load(f)
+        # Either a list of groups or {"country": ..., "groups": [...]}
+        groups = spec if isinstance(spec, list) else spec.get("groups", [])
+        country = None if isinstance(spec, list) else spec.get("country")
+        conn = initialize_database(db_path=args.db_path)
+        results = RationOptimizer().solve_batch(conn, groups, country)
+        conn.close()
+        for i, result in enumerate(results, 1):
+            label = result["group"] or f"group {i}"
+            if not result["feasible"]:
+                print(f"\n❌ {label}: infeasible ({result['status']})")
+                continue
+            nutrients = ", ".join(f"{k.split('_')[0].upper()} {v}%" for k, v in result["nutrients"].items())
+            print(f"\n🐄 {label}: USD {result['cost_per_kg_dm_usd']:.4f}/kg DM "
+                  f"(USD {result['cost_per_ton_as_fed_usd']:.2f}/t as fed) — {nutrients}")
+            for item in result["ingredients"]:
+                print(f"  {item['share_dm_pct']:>6.2f}% DM  {item['product_name']} "
+                      f"({item['supplier'] or 'unknown supplier'}, {item['supplier_country']})")
+        print(f"\n✅ Solved {len(results)} groups, {sum(r['feasible'] for r in results)} feasible.")
+        return
+    
     # Show stats if requested
     if args.stats:
         from agent import create_agent
@@ -97,33 +367,96 @@ Environment Variables:
             else:
                 print(f"{key}: {value}")
         agent.close()
+        print_metrics_summary(args.host, args.port)
+        return
+    
+    # Answer a batch of questions if requested
+    if args.batch:
+        import contextlib
+        from batch import BatchRunner, read_questions
+        from config import BATCH_WORKERS
+        from database import initialize_database
+        # Create/seed the database once, before workers open their own connections
+        with contextlib.redirect_stdout(sys.stderr):
+            from agent import create_agent
+            initialize_database().close()
+        source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+        out = open(args.batch_output, "w", encoding="utf-8") if args.batch_output else sys.stdout
+        runner = BatchRunner(create_agent, workers=args.workers or BATCH_WORKERS)
+        try:
+            # Agent and progress messages go to stderr so stdout stays pure JSONL
+            with contextlib.redirect_stdout(sys.stderr):
+                print(f"📚 Answering questions with {runner.workers} workers...")
+                summary = runner.run(read_questions(source), out, progress=sys.stderr)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if out is not sys.stdout:
+                out.close()
+        print(f"✅ {summary['questions']} questions in {summary['seconds']:.1f}s: "
+              f"{summary['succeeded']} answered, {summary['failed']} failed ({summary['invalid']} invalid lines)",
+              file=sys.stderr)
+        return
+    
+    # Run the resident agent daemon if requested
+    if args.daemon:
+        from agent import create_agent
+        from config import AGENT_DAEMON_WORKERS, AGENT_SOCKET_PATH
+        from daemon import AgentDaemon
+        if not AGENT_SOCKET_PATH:
+            print("❌ Set AGENT_SOCKET_PATH to run the agent daemon")
+            return
+        print(f"🔥 Warming {args.workers or AGENT_DAEMON_WORKERS} agents...")
+        try:
+            server = AgentDaemon(create_agent, AGENT_SOCKET_PATH, workers=args.workers or AGENT_DAEMON_WORKERS)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return
+        print(f"✅ Agent daemon listening on {AGENT_SOCKET_PATH} (Ctrl+C to stop)")
+        server.serve()
+        print("👋 Agent daemon stopped")
         return
     
     # Run single query if provided
     if args.query:
-        from agent import create_agent
-        agent = create_agent()
+        from daemon import DaemonUnavailable, connect as connect_daemon
         print(f"\n❓ Query: {args.query}\n")
-        result = agent.process_query(args.query)
+        result = None
+        client = None if args.no_daemon else connect_daemon()
+        if client:
+            try:
+                result = client.process_query(args.query)
+            except DaemonUnavailable:
+                pass
+            finally:
+                client.close()
+        if result is None:
+            from agent import create_agent
+            agent = create_agent()
+            try:
+                result = agent.process_query(args.query)
+            finally:
+                agent.close()
         print(f"🌐 Language: {result['language']}")
         if result['success']:
             print(f"\n📝 Response:\n{result['response']}")
         else:
             print(f"❌ Error: {result.get('error', 'Unknown error')}")
-        agent.close()
         return
     
     # Start API server if requested
     if args.api:
-        print(f"🚀 Starting API server on {args.host}:{args.port}...")
+        args.workers = args.workers or 1
+        workers = f" with {args.workers} workers" if args.workers > 1 else ""
+        print(f"🚀 Starting API server on {args.host}:{args.port}{workers}...")
         print(f"📚 API Documentation: http://{args.host if args.host != '0.0.0.0' else 'localhost'}:{args.port}/docs")
         from api import run_server
-        run_server(host=args.host, port=args.port)
+        run_server(host=args.host, port=args.port, workers=args.workers)
         return
     
     # Default: Start CLI
     from cli import main as cli_main
-    cli_main()
+    cli_main(use_daemon=not args.no_daemon)
 
 
 if __name__ == "__main__":
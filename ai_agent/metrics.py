@@ -0,0 +1,304 @@
+"""
+Lightweight in-process metrics for the Feed Products AI Agent
+Counters and histograms rendered in the Prometheus text exposition format
+"""
+
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Latency buckets in seconds (LLM calls can take several seconds)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Result size buckets in rows
+ROW_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500, 1000)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        """Increment the counter for the given label values"""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        """Current value for the given label values"""
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.labels = labels
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[label_values] = series
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values: str):
+        """Context manager observing the wall time of its block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = _format_labels(self.labels + ("le",), label_values + (_format_value(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+                cumulative += series[len(self.buckets)]
+                labels = _format_labels(self.labels + ("le",), label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+                plain = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{plain} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{plain} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+# Global registry and the agent's metrics
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "feed_agent_stage_duration_seconds",
+    "Wall time of each process_query stage",
+    LATENCY_BUCKETS,
+    labels=("stage",)
+))
+
+SQL_GENERATION = REGISTRY.register(Counter(
+    "feed_agent_sql_generation_total",
+    "SQL statements generated, by source (gemini, fallback, cache or index)",
+    labels=("source",)
+))
+
+LLM_ERRORS = REGISTRY.register(Counter(
+    "feed_agent_llm_errors_total",
+    "Gemini calls that failed and fell back to pattern matching"
+))
+
+QUERIES = REGISTRY.register(Counter(
+    "feed_agent_queries_total",
+    "Natural language queries processed, by detected language",
+    labels=("language",)
+))
+
+SQL_ERRORS = REGISTRY.register(Counter(
+    "feed_agent_sql_errors_total",
+    "Generated SQL statements that failed to execute"
+))
+
+SQL_REJECTED = REGISTRY.register(Counter(
+    "feed_agent_sql_rejected_total",
+    "Generated SQL refused or aborted by the governor, by reason",
+    labels=("reason",)
+))
+
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "feed_agent_cache_requests_total",
+    "Cache lookups, by cache name and result (hit or miss)",
+    labels=("cache", "result")
+))
+
+PRICE_UPDATES = REGISTRY.register(Counter(
+    "feed_agent_price_updates_total",
+    "Ingested price observations, by outcome (inserted, updated, rolled_over, historical, rejected)",
+    labels=("outcome",)
+))
+
+PRICE_COMMITS = REGISTRY.register(Counter(
+    "feed_agent_price_commits_total",
+    "Transactions committed by the price ingestion writer (one per group of batches)"
+))
+
+PRICE_FEED_EVENTS = REGISTRY.register(Counter(
+    "feed_agent_price_feed_events_total",
+    "Price changes sent to /subscribe clients, by path (live or replay)",
+    labels=("path",)
+))
+
+PRICE_FEED_SUBSCRIPTIONS = REGISTRY.register(Counter(
+    "feed_agent_price_feed_subscriptions_total",
+    "/subscribe streams by event (opened, closed, lagged)",
+    labels=("event",)
+))
+
+EXPORT_ROWS = REGISTRY.register(Counter(
+    "feed_agent_export_rows_total",
+    "Rows written by Arrow/Parquet exports, by format",
+    labels=("format",)
+))
+
+ADMISSION = REGISTRY.register(Counter(
+    "feed_agent_admission_total",
+    "API requests by admission lane (llm or direct) and outcome (admitted, rate_limited, queue_full, queue_timeout)",
+    labels=("lane", "outcome")
+))
+
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "feed_agent_admission_wait_seconds",
+    "Time admitted requests waited for a slot in their lane",
+    LATENCY_BUCKETS,
+    labels=("lane",)
+))
+
+QUERIES_COALESCED = REGISTRY.register(Counter(
+    "feed_agent_queries_coalesced_total",
+    "Queries answered by joining an identical query already in flight"
+))
+
+RESULT_ROWS = REGISTRY.register(Histogram(
+    "feed_agent_result_rows",
+    "Rows returned per query",
+    ROW_BUCKETS
+))
+
+
+# Stages in the order process_query runs them
+STAGES = ("detect_language", "translate", "generate_sql", "execute_sql", "format", "total")
+
+_SAMPLE_PATTERN = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_prometheus_text(text: str) -> List[Tuple[str, Dict[str, str], float]]:
+    """Parse Prometheus text format into (name, labels, value) samples"""
+    samples = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_PATTERN.match(line)
+        if not match:
+            continue
+        name, raw_labels, value = match.groups()
+        labels = dict(_LABEL_PATTERN.findall(raw_labels or ""))
+        samples.append((name, labels, float(value)))
+    return samples
+
+
+def _bucket_quantile(quantile: float, buckets: List[Tuple[float, float]]) -> Optional[float]:
+    """Estimate a quantile from cumulative (upper bound, count) buckets"""
+    if not buckets or buckets[-1][1] == 0:
+        return None
+    rank = quantile * buckets[-1][1]
+    previous_bound, previous_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return previous_bound
+            if count == previous_count:
+                return bound
+            return previous_bound + (bound - previous_bound) * (rank - previous_count) / (count - previous_count)
+        previous_bound, previous_count = bound, count
+    return previous_bound
+
+
+def summarize(text: str) -> Dict[str, Dict]:
+    """
+    Summarize a Prometheus text payload produced by this module.
+
+    Returns per-stage latency (count, mean, p50, p95, p99 in milliseconds)
+    and the plain counters keyed by name and labels.
+    """
+    samples = parse_prometheus_text(text)
+    stage_buckets: Dict[str, List[Tuple[float, float]]] = {}
+    stage_sums: Dict[str, float] = {}
+    counters: Dict[str, float] = {}
+
+    for name, labels, value in samples:
+        if name == f"{STAGE_LATENCY.name}_bucket":
+            stage_buckets.setdefault(labels.get("stage", ""), []).append((float(labels["le"]), value))
+        elif name == f"{STAGE_LATENCY.name}_sum":
+            stage_sums[labels.get("stage", "")] = value
+        elif name.endswith("_total"):
+            label_text = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+            counters[f"{name}{{{label_text}}}" if label_text else name] = value
+
+    stages = {}
+    for stage, buckets in stage_buckets.items():
+        buckets.sort()
+        count = buckets[-1][1]
+        stages[stage] = {
+            "count": int(count),
+            "mean_ms": round(stage_sums.get(stage, 0.0) / count * 1000, 2) if count else 0.0,
+            "p50_ms": round((_bucket_quantile(0.50, buckets) or 0.0) * 1000, 2),
+            "p95_ms": round((_bucket_quantile(0.95, buckets) or 0.0) * 1000, 2),
+            "p99_ms": round((_bucket_quantile(0.99, buckets) or 0.0) * 1000, 2),
+        }
+
+    ordered = {stage: stages[stage] for stage in STAGES if stage in stages}
+    ordered.update({stage: value for stage, value in stages.items() if stage not in ordered})
+    return {"stages": ordered, "counters": counters}
@@ -0,0 +1,205 @@
+"""
+Live price-change feed for the Feed Products AI Agent
+Tails the price_changes table written by bulk ingestion and fans each change
+out to the in-process subscribers whose product/country/supplier filters match
+"""
+
+import asyncio
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import quote
+
+from config import PRICE_FEED_POLL_MS, PRICE_FEED_QUEUE_SIZE
+from metrics import PRICE_FEED_EVENTS, PRICE_FEED_SUBSCRIPTIONS
+from price_ingest import CHANGE_COLUMNS
+
+# Changes read per poll or replay
+FETCH_LIMIT = 5000
+
+
+def _sse(change: Dict[str, Any]) -> str:
+    """One change as a server-sent event; its id doubles as the client's Last-Event-ID"""
+    return f"id: {change['id']}\nevent: price\ndata: {json.dumps(change, separators=(',', ':'))}\n\n"
+
+
+def _event(row: sqlite3.Row) -> Dict[str, Any]:
+    """A price_changes row as sent to subscribers"""
+    change = dict(zip(("id",) + CHANGE_COLUMNS, row))
+    old, new = change["old_cost_per_kg"], change["new_cost_per_kg"]
+    change["change_pct"] = round((new - old) / old * 100, 2) if old else None
+    return change
+
+
+class Subscription:
+    """
+    One subscriber's filters and pending changes.
+
+    Products and suppliers match case-insensitively by substring, countries
+    exactly; an empty filter matches everything. When the queue is full the
+    change is dropped and the subscription marked lagged, so the stream
+    catches up from the table instead of buffering without bound.
+    """
+
+    def __init__(self, products: Optional[List[str]] = None, countries: Optional[List[str]] = None,
+                 suppliers: Optional[List[str]] = None, queue_size: int = PRICE_FEED_QUEUE_SIZE):
+        self.products = [p.lower() for p in products or [] if p]
+        self.countries = set(c for c in countries or [] if c)
+        self.suppliers = [s.lower() for s in suppliers or [] if s]
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=queue_size)
+        self.lagged = False
+
+    def matches(self, change: Dict[str, Any]) -> bool:
+        if self.countries and change["supplier_country"] not in self.countries:
+            return False
+        if self.products and not any(p in (change["product_name"] or "").lower() for p in self.products):
+            return False
+        if self.suppliers and not any(s in (change["supplier"] or "").lower() for s in self.suppliers):
+            return False
+        return True
+
+    def offer(self, change: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            if not self.lagged:
+                PRICE_FEED_SUBSCRIPTIONS.inc("lagged")
+            self.lagged = True
+
+
+class PriceChangeFeed:
+    """
+    In-process pub/sub over the price_changes table.
+
+    One poller per API process checks PRAGMA data_version (a no-op read
+    unless another connection committed) and reads only the rows after the
+    last id it has seen, so changes from any writer - this process, another
+    worker or the CLI - reach every subscriber, however many are connected.
+    """
+
+    def __init__(self, db_path: str, poll_ms: float = PRICE_FEED_POLL_MS):
+        self.db_path = db_path
+        self.poll_ms = poll_ms
+        self.subscribers: Set[Subscription] = set()
+        self.last_id = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._version: Optional[int] = None
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def start(self):
+        """Open the feed's own read-only connection and start polling (inside the event loop)"""
+        conn = sqlite3.connect(f"file:{quote(self.db_path)}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            self.last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM price_changes").fetchone()[0]
+        except sqlite3.OperationalError as e:
+            # Databases created before the feed existed, opened read-only
+            print(f"⚠️  Price feed disabled: {e}")
+            conn.close()
+            return
+        self._conn = conn
+        self._version = conn.execute("PRAGMA data_version").fetchone()[0]
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def subscribe(self, products: Optional[List[str]] = None, countries: Optional[List[str]] = None,
+                  suppliers: Optional[List[str]] = None) -> Subscription:
+        subscription = Subscription(products, countries, suppliers)
+        self.subscribers.add(subscription)
+        PRICE_FEED_SUBSCRIPTIONS.inc("opened")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self.subscribers:
+            self.subscribers.discard(subscription)
+            PRICE_FEED_SUBSCRIPTIONS.inc("closed")
+
+    def changes_since(self, last_id: int, limit: int = FETCH_LIMIT) -> List[Dict[str, Any]]:
+        """Recorded changes after last_id, oldest first"""
+        rows = self._conn.execute(f"""
+        SELECT id, {', '.join(CHANGE_COLUMNS)} FROM price_changes
+        WHERE id > ? ORDER BY id LIMIT ?
+        """, (last_id, limit)).fetchall()
+        return [_event(row) for row in rows]
+
+    def poll(self) -> int:
+        """Publish changes committed since the last poll; returns how many were read"""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return 0
+        self._version = version
+        read = 0
+        while True:
+            changes = self.changes_since(self.last_id)
+            for change in changes:
+                for subscription in self.subscribers:
+                    if subscription.matches(change):
+                        subscription.offer(change)
+            if changes:
+                self.last_id = changes[-1]["id"]
+                read += len(changes)
+            if len(changes) < FETCH_LIMIT:
+                return read
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_ms / 1000)
+            try:
+                self.poll()
+            except sqlite3.Error as e:
+                print(f"⚠️  Price feed poll failed: {e}")
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+        self.subscribers.clear()
+
+
+async def stream_changes(feed: PriceChangeFeed, subscription: Subscription,
+                         since: Optional[int], heartbeat_seconds: float):
+    """
+    Server-sent events for one subscription.
+
+    Changes after `since` (the client's Last-Event-ID) are replayed from the
+    table first; live changes already replayed are skipped by id. A lagged
+    subscription is caught up from the table the same way.
+    """
+    last_sent = since if since is not None else feed.last_id
+    replay = since is not None
+    try:
+        while True:
+            if replay or subscription.lagged:
+                path = "replay" if replay else "live"
+                replay, subscription.lagged = False, False
+                while True:
+                    changes = feed.changes_since(last_sent)
+                    for change in changes:
+                        if subscription.matches(change):
+                            PRICE_FEED_EVENTS.inc(path)
+                            yield _sse(change)
+                    if changes:
+                        last_sent = changes[-1]["id"]
+                    if len(changes) < FETCH_LIMIT:
+                        break
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if change["id"] <= last_sent:
+                continue
+            last_sent = change["id"]
+            PRICE_FEED_EVENTS.inc("live")
+            yield _sse(change)
+    finally:
+        feed.unsubscribe(subscription)
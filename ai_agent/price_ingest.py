@@ -0,0 +1,347 @@
+"""
+Bulk price ingestion for the Feed Products AI Agent
+Upserts batches of price observations (JSON or CSV) and rolls each offer's
+previous current row over to history in the same transaction; concurrent
+batches are group-committed by a single writer thread
+"""
+
+import csv
+import io
+import json
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import PRICE_INGEST_COMMIT_WINDOW_MS, PRICE_INGEST_MAX_GROUP_ROWS, PRICE_FEED_RETENTION
+from database import PRODUCT_COLUMNS
+from metrics import PRICE_UPDATES, PRICE_COMMITS
+
+# Fields accepted per observation; observed_at defaults to now
+OBSERVATION_FIELDS = (
+    "product_name", "product_code", "name", "type", "cost_per_kg", "cost_currency",
+    "supplier", "supplier_country", "supplier_email", "supplier_phone", "supplier_address", "observed_at",
+)
+REQUIRED_FIELDS = ("product_name", "supplier_country", "cost_per_kg", "cost_currency")
+
+# Per-observation outcomes reported back to the caller
+OUTCOMES = ("inserted", "updated", "rolled_over", "historical", "stale")
+
+# An offer is one product from one supplier in one country
+OFFER_WHERE = "product_name = ? AND supplier IS ? AND supplier_country = ?"
+
+# Rows written to price_changes when an offer's current price moves
+CHANGE_COLUMNS = (
+    "product_name", "supplier", "supplier_country", "cost_currency",
+    "old_cost_per_kg", "new_cost_per_kg", "cost_per_kg_usd", "observed_at", "changed_at",
+)
+
+
+def _timestamp(value: Any) -> int:
+    """Unix seconds from an epoch number or an ISO date/datetime (YYYY-MM, YYYY-MM-DD, ...), UTC"""
+    if value is None or value == "":
+        return int(time.time())
+    if isinstance(value, (int, float)) or str(value).strip().isdigit():
+        return int(float(value))
+    text = str(value).strip()
+    if len(text) == 7:
+        text += "-01"
+    parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _month_bounds(ts: int) -> Tuple[int, int]:
+    """[start, end) of the UTC calendar month containing ts"""
+    moment = datetime.fromtimestamp(ts, tz=timezone.utc)
+    start = moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def parse_observation(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate and normalize one observation; raises ValueError when unusable"""
+    if not isinstance(raw, dict):
+        raise ValueError("observation must be an object")
+    observation = {
+        field: (raw.get(field).strip() or None) if isinstance(raw.get(field), str) else raw.get(field)
+        for field in OBSERVATION_FIELDS
+    }
+    missing = [field for field in REQUIRED_FIELDS if observation[field] in (None, "")]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    try:
+        observation["cost_per_kg"] = float(observation["cost_per_kg"])
+    except (TypeError, ValueError):
+        raise ValueError(f"cost_per_kg is not a number: {observation['cost_per_kg']!r}")
+    if not observation["cost_per_kg"] > 0:
+        raise ValueError("cost_per_kg must be positive")
+    try:
+        observation["observed_at"] = _timestamp(observation["observed_at"])
+    except (TypeError, ValueError):
+        raise ValueError(f"observed_at is not a date or epoch: {raw.get('observed_at')!r}")
+    observation["cost_currency"] = observation["cost_currency"].upper()
+    return observation
+
+
+def read_observations(text: str, fmt: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Raw observations from a JSON or CSV document.
+
+    JSON may be a list of objects or {"observations": [...]}; CSV needs a
+    header row naming OBSERVATION_FIELDS. The format is sniffed when not given.
+    """
+    fmt = fmt or ("json" if text.lstrip()[:1] in ("[", "{") else "csv")
+    if fmt == "json":
+        try:
+            document = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        observations = document.get("observations") if isinstance(document, dict) else document
+        if not isinstance(observations, list):
+            raise ValueError('Expected a JSON list or {"observations": [...]}')
+        return observations
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(text)))
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _change(conn: sqlite3.Connection, observation: Dict[str, Any], row_id: int,
+            old_price: Optional[float]) -> Optional[Tuple]:
+    """price_changes row for an offer whose current price is now the observation's, or None if unchanged"""
+    if old_price == observation["cost_per_kg"]:
+        return None
+    usd = conn.execute("SELECT cost_per_kg_usd FROM feed_products_sample WHERE id = ?", (row_id,)).fetchone()[0]
+    return (
+        observation["product_name"], observation["supplier"], observation["supplier_country"],
+        observation["cost_currency"], old_price, observation["cost_per_kg"], usd,
+        observation["observed_at"], int(time.time()),
+    )
+
+
+def _apply(conn: sqlite3.Connection, observation: Dict[str, Any]) -> Tuple[str, Optional[Tuple]]:
+    """
+    Upsert one observation inside the caller's transaction.
+
+    Returns its outcome and, when the offer's current price changed, the
+    row to record in price_changes.
+    """
+    offer = (observation["product_name"], observation["supplier"], observation["supplier_country"])
+    observed_at = observation["observed_at"]
+    start, end = _month_bounds(observed_at)
+
+    # Same offer, same month: update in place (last observation wins)
+    same_month = conn.execute(f"""
+    SELECT id, cost_per_kg, is_active FROM feed_products_sample
+    WHERE {OFFER_WHERE} AND created_at >= ? AND created_at < ?
+    ORDER BY is_active DESC, created_at DESC LIMIT 1
+    """, offer + (start, end)).fetchone()
+    if same_month:
+        cursor = conn.execute("""
+        UPDATE feed_products_sample
+        SET cost_per_kg = ?, cost_currency = ?, created_at = ?,
+            supplier_email = COALESCE(?, supplier_email),
+            supplier_phone = COALESCE(?, supplier_phone),
+            supplier_address = COALESCE(?, supplier_address)
+        WHERE id = ? AND COALESCE(created_at, 0) <= ?
+        """, (observation["cost_per_kg"], observation["cost_currency"], observed_at,
+              observation["supplier_email"], observation["supplier_phone"], observation["supplier_address"],
+              same_month[0], observed_at))
+        if not cursor.rowcount:
+            return "stale", None
+        return "updated", _change(conn, observation, same_month[0], same_month[1]) if same_month[2] else None
+
+    # Latest row of the offer supplies the metadata the observation leaves out
+    template = conn.execute(f"""
+    SELECT {', '.join(PRODUCT_COLUMNS)} FROM feed_products_sample
+    WHERE {OFFER_WHERE}
+    ORDER BY is_active DESC, created_at DESC, id DESC LIMIT 1
+    """, offer).fetchone()
+    previous = dict(zip(PRODUCT_COLUMNS, template)) if template else {}
+    current = previous if previous.get("is_active") else None
+
+    # A second month turns the offer into a price series (product_code ...-HIST)
+    code = observation["product_code"] or previous.get("product_code")
+    if previous and code and "HIST" not in code:
+        code = f"{code}-HIST"
+        conn.execute(f"""
+        UPDATE feed_products_sample SET product_code = ?
+        WHERE {OFFER_WHERE} AND product_code IS ?
+        """, (code,) + offer + (previous["product_code"],))
+
+    newer = current is None or observed_at > (current["created_at"] or 0)
+    if current and newer:
+        conn.execute(f"UPDATE feed_products_sample SET is_active = 0 WHERE {OFFER_WHERE} AND is_active = 1", offer)
+
+    row = {
+        **previous,
+        **{k: v for k, v in observation.items() if k in PRODUCT_COLUMNS and v is not None},
+        "product_code": code,
+        "created_at": observed_at,
+        "is_active": 1 if newer else 0,
+    }
+    row["name"] = row.get("name") or row["product_name"]
+    row["is_standard_product"] = row.get("is_standard_product") or 0
+    cursor = conn.execute(f"""
+    INSERT INTO feed_products_sample ({', '.join(PRODUCT_COLUMNS)})
+    VALUES ({', '.join('?' * len(PRODUCT_COLUMNS))})
+    """, tuple(row.get(column) for column in PRODUCT_COLUMNS))
+
+    if not newer:
+        return "historical", None
+    change = _change(conn, observation, cursor.lastrowid, current["cost_per_kg"] if current else None)
+    return ("rolled_over" if current else "inserted"), change
+
+
+def apply_price_updates(conn: sqlite3.Connection, batches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Apply one or more batches of raw observations in a single transaction.
+
+    Observations are applied oldest first so out-of-order batches still
+    leave the latest price of every offer as its only active row. Every
+    change to a current price is recorded in price_changes in the same
+    transaction, for the live feed. Invalid observations are rejected
+    individually; anything else rolls the whole group back. Returns one
+    summary per batch.
+    """
+    summaries = [{"received": len(batch), **{outcome: 0 for outcome in OUTCOMES}, "rejected": []} for batch in batches]
+    work = []
+    for b, batch in enumerate(batches):
+        for i, raw in enumerate(batch):
+            try:
+                work.append((parse_observation(raw), b))
+            except ValueError as e:
+                summaries[b]["rejected"].append({"index": i, "error": str(e)})
+    work.sort(key=lambda item: item[0]["observed_at"])
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        changes = []
+        for observation, b in work:
+            outcome, change = _apply(conn, observation)
+            summaries[b][outcome] += 1
+            if change:
+                changes.append(change)
+        if changes:
+            conn.executemany(f"""
+            INSERT INTO price_changes ({', '.join(CHANGE_COLUMNS)})
+            VALUES ({', '.join('?' * len(CHANGE_COLUMNS))})
+            """, changes)
+            conn.execute("DELETE FROM price_changes WHERE id <= (SELECT MAX(id) FROM price_changes) - ?",
+                         (PRICE_FEED_RETENTION,))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    PRICE_COMMITS.inc()
+
+    for summary in summaries:
+        for outcome in OUTCOMES:
+            if summary[outcome]:
+                PRICE_UPDATES.inc(outcome, amount=summary[outcome])
+        if summary["rejected"]:
+            PRICE_UPDATES.inc("rejected", amount=len(summary["rejected"]))
+    return summaries
+
+
+def database_file(conn: sqlite3.Connection) -> Optional[str]:
+    """Path of a connection's main database file, or None for in-memory databases"""
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1] == "main":
+            return row[2] or None
+    return None
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread that group-commits price batches.
+
+    Requests submit batches and wait on a future. The writer takes every
+    batch queued behind the one it is working on (waiting at most the
+    commit window for stragglers) and applies them in one BEGIN IMMEDIATE
+    ... COMMIT, so concurrent scrapers share a commit instead of queueing
+    for the write lock one by one. If a group fails, its batches are
+    retried one per transaction so only the failing batch reports the
+    error. The database runs in WAL mode, so readers keep their snapshot
+    and never see half an update.
+    """
+
+    def __init__(self, db_path: str, window_ms: float = PRICE_INGEST_COMMIT_WINDOW_MS,
+                 max_group_rows: int = PRICE_INGEST_MAX_GROUP_ROWS):
+        self.db_path = db_path
+        self.window_ms = window_ms
+        self.max_group_rows = max_group_rows
+        self._queue: "queue.Queue[Optional[Tuple[List[Dict[str, Any]], Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, observations: List[Dict[str, Any]]) -> Future:
+        """Queue a batch; the future resolves to its summary once committed"""
+        future: Future = Future()
+        self._queue.put((observations, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="price-ingest", daemon=True)
+                self._thread.start()
+        return future
+
+    def _next_group(self) -> Optional[List[Tuple[List[Dict[str, Any]], Future]]]:
+        item = self._queue.get()
+        if item is None:
+            return None
+        group, rows = [item], len(item[0])
+        deadline = time.monotonic() + self.window_ms / 1000
+        while rows < self.max_group_rows:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this group, then stop
+                self._queue.put(None)
+                break
+            group.append(item)
+            rows += len(item[0])
+        return group
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        while True:
+            group = self._next_group()
+            if group is None:
+                break
+            try:
+                summaries = apply_price_updates(conn, [observations for observations, _ in group])
+            except Exception as e:
+                if len(group) == 1:
+                    group[0][1].set_exception(e)
+                    continue
+                # One bad batch must not fail the others it was grouped with
+                for observations, future in group:
+                    self._commit_alone(conn, observations, future)
+            else:
+                for (_, future), summary in zip(group, summaries):
+                    future.set_result(summary)
+        conn.close()
+
+    @staticmethod
+    def _commit_alone(conn: sqlite3.Connection, observations: List[Dict[str, Any]], future: Future):
+        try:
+            future.set_result(apply_price_updates(conn, [observations])[0])
+        except Exception as e:
+            future.set_exception(e)
+
+    def close(self):
+        """Commit what is queued and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread:
+            self._queue.put(None)
+            thread.join()
@@ -0,0 +1,195 @@
+"""
+Shared plan and result cache for the Feed Products AI Agent
+A small SQLite key/value store with per-entry expiry that every API worker
+process opens, so an answer generated by one worker is reused by the others
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from config import (
+    QUERY_CACHE_PATH,
+    QUERY_PLAN_CACHE_TTL,
+    QUERY_RESULT_CACHE_TTL,
+    QUERY_CACHE_MAX_ENTRIES
+)
+from metrics import CACHE_REQUESTS
+
+# Prune expired/excess entries once every this many writes
+PRUNE_INTERVAL = 200
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _file_state(path: str, header: slice) -> Optional[str]:
+    """inode, mtime, size and one header field of a file, or None if it does not exist"""
+    try:
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            field = f.read(header.stop)[header].hex()
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}:{field}"
+
+
+def database_fingerprint(conn: sqlite3.Connection) -> Optional[str]:
+    """
+    Identify the current contents of a connection's main database file.
+
+    Built from file state every process sees the same way, unlike PRAGMA
+    data_version, which is per connection. Returns None for in-memory
+    databases, whose results are never shared.
+
+    mtime alone is not enough: it is only as fine as the kernel's clock tick,
+    and a copied or restored file can carry an old one. Every commit still
+    changes something else here. In rollback-journal mode the header's file
+    change counter (offset 24) goes up by one. In WAL mode the WAL only
+    grows (new size) until it is reset. A reset rewrites its salts (WAL
+    header offset 16), and a checkpoint that truncates or removes the WAL
+    changes or drops its part. A file replaced on disk gets a new inode.
+    Any of these can cause a miss but never a stale match. A restart with
+    unchanged files keeps the fingerprint, so the cached results stay valid.
+    """
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1] != "main":
+            continue
+        path = row[2]
+        main = _file_state(path, slice(24, 28)) if path else None
+        if main is None:
+            return None
+        wal = _file_state(path + "-wal", slice(16, 24))
+        return main if wal is None else f"{main}/{wal}"
+    return None
+
+
+class QueryCache:
+    """
+    Namespaced key/value cache stored in a SQLite file.
+
+    The file runs in WAL mode so readers in one worker never block writers
+    in another. Values are JSON; keys are hashed. Lookups count towards the
+    feed_agent_cache_requests_total metric with the namespace as the
+    cache label.
+    """
+
+    def __init__(self, path: Path, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS query_cache (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_cache_expires ON query_cache(expires_at)")
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM query_cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (namespace, _digest(key), time.time())
+                ).fetchone()
+        except sqlite3.Error:
+            row = None
+        CACHE_REQUESTS.inc(namespace, "hit" if row else "miss")
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable value for ttl seconds"""
+        try:
+            payload = json.dumps(value, ensure_ascii=False, default=str)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, _digest(key), payload, time.time() + ttl)
+                )
+                self._writes += 1
+                if self._writes % PRUNE_INTERVAL == 0:
+                    self._prune()
+        except sqlite3.Error:
+            # Another worker holding the write lock past the timeout only costs a cache miss
+            pass
+
+    def _prune(self):
+        self._conn.execute("DELETE FROM query_cache WHERE expires_at <= ?", (time.time(),))
+        self._conn.execute("""
+        DELETE FROM query_cache WHERE rowid IN (
+            SELECT rowid FROM query_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+        )
+        """, (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM query_cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PlanResultCache:
+    """
+    The agent's two caches on top of one QueryCache.
+
+    Plans map (language, normalized question) to the generated SQL and
+    response template, and live for hours since the LLM call is the slow
+    part. Results map (database fingerprint, SQL) to rows for a short TTL
+    and are skipped entirely for in-memory databases.
+    """
+
+    def __init__(self, store: QueryCache, plan_ttl: float = QUERY_PLAN_CACHE_TTL,
+                 result_ttl: float = QUERY_RESULT_CACHE_TTL):
+        self.store = store
+        self.plan_ttl = plan_ttl
+        self.result_ttl = result_ttl
+
+    @staticmethod
+    def _plan_key(question: str, language: str) -> str:
+        return f"{language}\0{' '.join(question.lower().split())}"
+
+    def get_plan(self, question: str, language: str) -> Optional[dict]:
+        return self.store.get("query_plan", self._plan_key(question, language))
+
+    def set_plan(self, question: str, language: str, plan: dict):
+        self.store.set("query_plan", self._plan_key(question, language), plan, self.plan_ttl)
+
+    def get_result(self, fingerprint: Optional[str], sql: str) -> Optional[list]:
+        if fingerprint is None or self.result_ttl <= 0:
+            return None
+        return self.store.get("query_result", f"{fingerprint}\0{sql}")
+
+    def set_result(self, fingerprint: Optional[str], sql: str, rows: list):
+        if fingerprint is None or self.result_ttl <= 0:
+            return
+        self.store.set("query_result", f"{fingerprint}\0{sql}", rows, self.result_ttl)
+
+
+def open_query_cache(path: str = QUERY_CACHE_PATH) -> Optional[PlanResultCache]:
+    """Open the shared cache, or return None when disabled or unavailable"""
+    if not path:
+        return None
+    try:
+        return PlanResultCache(QueryCache(Path(path)))
+    except sqlite3.Error as e:
+        print(f"⚠️ Query cache disabled ({e})")
+        return None
@@ -0,0 +1,274 @@
+"""
+Least-cost ration formulation for the Feed Products AI Agent
+Solves the cheapest feed mix for an animal group from current supplier prices,
+reference nutrient values and the inclusion limits in feed_product_restrictions
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import FEED_NUTRIENTS, RATION_TARGETS
+from database import get_data_version
+from eligibility_index import RULE_COLUMNS, load_restriction_rules, restriction_applies
+
+# Try to import SciPy for the linear-programming solver
+try:
+    from scipy.optimize import linprog
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+NUTRIENTS = ("cp", "tdn", "ndf")
+
+# Per-group target fields; None means "use the species default" (or no limit)
+TARGET_FIELDS = (
+    "min_cp", "max_cp", "min_tdn", "max_tdn", "min_ndf", "max_ndf",
+    "min_forage_pct", "max_concentrate_pct",
+)
+
+# Shares below this are solver noise, not ingredients
+MIN_SHARE = 1e-6
+
+
+def nutrient_profile(product_name: str) -> Optional[Tuple[float, float, float, float]]:
+    """Reference (DM %, CP %, TDN %, NDF %) for a product, or None when unknown"""
+    lowered = (product_name or "").lower()
+    for keyword, values in FEED_NUTRIENTS:
+        if keyword in lowered:
+            return values
+    return None
+
+
+class FeedMatrix:
+    """
+    Candidate feeds and the static half of the linear program.
+
+    One column per distinct product name with reference nutrients, priced at
+    its cheapest current USD offer (optionally within one country). Costs,
+    nutrient rows and feed classes are built once and reused for every
+    animal group solved against the matrix; only bounds and a few
+    group-specific rows change between solves. Without a connection the
+    matrix is empty (a country the catalogue has no offers from).
+    """
+
+    def __init__(self, conn: Optional[sqlite3.Connection], country: Optional[str] = None):
+        self.country = country
+        sql = """
+        SELECT product_name, type, cost_per_kg_usd, cost_per_kg, cost_currency, supplier, supplier_country
+        FROM feed_products_sample
+        WHERE is_active = 1 AND cost_per_kg_usd > 0
+        """
+        params: List[Any] = []
+        if country:
+            sql += " AND supplier_country = ?"
+            params.append(country)
+
+        cheapest: Dict[str, Tuple] = {}
+        for row in (conn.execute(sql, params).fetchall() if conn else []):
+            row = tuple(row)
+            if nutrient_profile(row[0]) is None:
+                continue
+            if row[0] not in cheapest or row[2] < cheapest[row[0]][2]:
+                cheapest[row[0]] = row
+
+        self.feeds = [cheapest[name] for name in sorted(cheapest)]
+        self.names = [feed[0] for feed in self.feeds]
+        composition = np.array([nutrient_profile(name) for name in self.names], dtype=float).reshape(-1, 4)
+        self.dry_matter = composition[:, 0] / 100
+        self.nutrients = composition[:, 1:].T
+        self.price_usd = np.array([feed[2] for feed in self.feeds], dtype=float)
+        self.cost = self.price_usd / self.dry_matter if len(self.feeds) else self.price_usd
+        self.is_forage = np.array([feed[1] == "Fodder" for feed in self.feeds], dtype=float)
+        self.is_concentrate = np.array([feed[1] == "Concentrate" for feed in self.feeds], dtype=float)
+
+        # Active restrictions keyed by product name (they are stored per product row)
+        self.restrictions: Dict[str, List[Dict[str, Any]]] = {}
+        names = set(self.names)
+        seen = set()
+        for row in (load_restriction_rules(conn) if names else []):
+            row = tuple(row)
+            if row[0] not in names or row in seen:
+                continue
+            seen.add(row)
+            self.restrictions.setdefault(row[0], []).append(dict(zip(RULE_COLUMNS, row)))
+
+    def targets(self, group: Dict[str, Any]) -> Dict[str, float]:
+        """Species/focus defaults overridden by the group's own targets"""
+        species = group.get("species") or "cattle"
+        targets = dict(RATION_TARGETS.get((species, group.get("production_focus")))
+                       or RATION_TARGETS.get((species, None), {}))
+        targets.update({field: group[field] for field in TARGET_FIELDS if group.get(field) is not None})
+        return targets
+
+    def solve(self, group: Dict[str, Any]) -> Dict[str, Any]:
+        """Least-cost ration (dry-matter shares) for one animal group"""
+        if not SCIPY_AVAILABLE:
+            raise RuntimeError("Ration optimization requires scipy: pip install scipy")
+
+        targets = self.targets(group)
+        result: Dict[str, Any] = {"group": group.get("name"), "targets": targets, "country": self.country}
+        count = len(self.names)
+        if not count:
+            return {**result, "feasible": False, "status": "No priced feeds with nutrient data"}
+
+        # Inclusion limits from restrictions and the request
+        upper = np.ones(count)
+        concentrate_limits = []
+        applied = []
+        for j, name in enumerate(self.names):
+            for restriction in self.restrictions.get(name, ()):
+                if not restriction_applies(restriction, group):
+                    continue
+                applied.append(restriction)
+                if not restriction["is_eligible"]:
+                    upper[j] = 0
+                if restriction["max_perc_feed"] is not None:
+                    upper[j] = min(upper[j], restriction["max_perc_feed"] / 100)
+                if restriction["max_perc_conc"] is not None:
+                    concentrate_limits.append((j, restriction["max_perc_conc"] / 100))
+        lowered = [name.lower() for name in self.names]
+        for name, pct in (group.get("max_inclusion") or {}).items():
+            for j, candidate in enumerate(lowered):
+                if name.lower() in candidate:
+                    upper[j] = min(upper[j], pct / 100)
+        for name in group.get("exclude") or []:
+            for j, candidate in enumerate(lowered):
+                if name.lower() in candidate:
+                    upper[j] = 0
+
+        # Group-specific inequality rows on top of the shared nutrient matrix
+        rows, bounds = [], []
+        for k, nutrient in enumerate(NUTRIENTS):
+            if targets.get(f"min_{nutrient}") is not None:
+                rows.append(-self.nutrients[k])
+                bounds.append(-targets[f"min_{nutrient}"])
+            if targets.get(f"max_{nutrient}") is not None:
+                rows.append(self.nutrients[k])
+                bounds.append(targets[f"max_{nutrient}"])
+        if targets.get("min_forage_pct") is not None:
+            rows.append(-self.is_forage)
+            bounds.append(-targets["min_forage_pct"] / 100)
+        if targets.get("max_concentrate_pct") is not None:
+            rows.append(self.is_concentrate)
+            bounds.append(targets["max_concentrate_pct"] / 100)
+        for j, limit in concentrate_limits:
+            row = -limit * self.is_concentrate
+            row[j] += 1
+            rows.append(row)
+            bounds.append(0.0)
+
+        solution = linprog(
+            self.cost,
+            A_ub=np.vstack(rows) if rows else None,
+            b_ub=np.array(bounds) if rows else None,
+            A_eq=np.ones((1, count)),
+            b_eq=np.array([1.0]),
+            bounds=np.column_stack([np.zeros(count), upper]),
+            method="highs"
+        )
+        result["applied_restrictions"] = applied
+        if not solution.success:
+            return {**result, "feasible": False, "status": solution.message}
+
+        share = np.where(solution.x > MIN_SHARE, solution.x, 0.0)
+        as_fed = share / self.dry_matter
+        as_fed = as_fed / as_fed.sum()
+        ingredients = []
+        for j in np.argsort(-share):
+            if share[j] <= 0:
+                break
+            name, ptype, price_usd, price, currency, supplier, country = self.feeds[j]
+            ingredients.append({
+                "product_name": name,
+                "type": ptype,
+                "share_dm_pct": round(float(share[j]) * 100, 2),
+                "share_as_fed_pct": round(float(as_fed[j]) * 100, 2),
+                "cost_per_kg_usd": price_usd,
+                "cost_per_kg": price,
+                "cost_currency": currency,
+                "supplier": supplier,
+                "supplier_country": country,
+                "at_limit": bool(upper[j] < 1 and share[j] >= upper[j] - MIN_SHARE),
+            })
+
+        achieved = self.nutrients @ share
+        return {
+            **result,
+            "feasible": True,
+            "status": "optimal",
+            "cost_per_kg_dm_usd": round(float(solution.fun), 4),
+            "cost_per_ton_as_fed_usd": round(float(as_fed @ self.price_usd) * 1000, 2),
+            "nutrients": {f"{n}_pct_dm": round(float(v), 2) for n, v in zip(NUTRIENTS, achieved)},
+            "forage_pct_dm": round(float(self.is_forage @ share) * 100, 2),
+            "ingredients": ingredients,
+        }
+
+    def solve_batch(self, groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Solve many animal groups against the same feed matrix.
+
+        Groups that differ only by name build the same program, so each
+        distinct profile is solved once and its result shared.
+        """
+        solved: Dict[str, Dict[str, Any]] = {}
+        results = []
+        for group in groups:
+            key = json.dumps({k: v for k, v in group.items() if k != "name"}, sort_keys=True, default=str)
+            if key not in solved:
+                solved[key] = self.solve(group)
+            results.append({**solved[key], "group": group.get("name")})
+        return results
+
+
+class RationOptimizer:
+    """
+    Caches one FeedMatrix per catalogue country for the current data version.
+
+    Requested countries are matched case-insensitively against the countries
+    in the catalogue, so the cache is bounded by the catalogue rather than by
+    what clients send; a country with no offers gets an empty matrix that is
+    neither built from the database nor cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._countries: Dict[str, str] = {}
+        self._matrices: Dict[Optional[str], FeedMatrix] = {}
+
+    def matrix(self, conn: sqlite3.Connection, country: Optional[str] = None) -> FeedMatrix:
+        version = get_data_version(conn)
+        with self._lock:
+            if self._version != version:
+                self._matrices = {}
+                self._countries = {
+                    name.strip().lower(): name for (name,) in conn.execute(
+                        "SELECT DISTINCT supplier_country FROM feed_products_sample WHERE supplier_country IS NOT NULL"
+                    )
+                }
+                self._version = version
+            if country:
+                known = self._countries.get(country.strip().lower())
+                if known is None:
+                    return FeedMatrix(None, country)
+                country = known
+            if country not in self._matrices:
+                self._matrices[country] = FeedMatrix(conn, country)
+            return self._matrices[country]
+
+    def solve_batch(self, conn: sqlite3.Connection, groups: List[Dict[str, Any]],
+                    country: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Solve groups, sharing one matrix (and its solved profiles) per country"""
+        by_country: Dict[Optional[str], List[int]] = {}
+        for i, group in enumerate(groups):
+            by_country.setdefault(group.get("country") or country, []).append(i)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(groups)
+        for group_country, indices in by_country.items():
+            solved = self.matrix(conn, group_country).solve_batch([groups[i] for i in indices])
+            for i, result in zip(indices, solved):
+                results[i] = result
+        return results
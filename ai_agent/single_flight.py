@@ -0,0 +1,64 @@
+"""
+Single-flight coalescing for the Feed Products AI Agent
+Concurrent identical questions (same normalized text and language) share one
+in-flight process_query, so Gemini calls and SQL executions during a spike
+scale with distinct questions rather than with users
+"""
+
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from language_utils import detect_language
+from metrics import QUERIES_COALESCED
+
+
+@lru_cache(maxsize=4096)
+def query_key(user_query: str) -> Tuple[str, str]:
+    """
+    (normalized question, language): case and whitespace do not make a
+    question distinct. Memoized, since a spike repeats the same texts and
+    language detection would otherwise run once per request.
+    """
+    return " ".join(user_query.lower().split()), detect_language(user_query)
+
+
+class SingleFlight:
+    """
+    In-flight computations by key, shared by every caller that asks meanwhile.
+
+    Only work that is running is shared: a key is forgotten as soon as its
+    computation finishes, so later callers start afresh (and see new data),
+    while the plan and result caches handle reuse over time. Thread-safe, so
+    it can front agent pools from the event loop and from handler threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Any] = {}
+
+    def submit(self, key: Hashable, start: Callable[[], Any]) -> Any:
+        """
+        The future of the in-flight computation for key, or of a new one.
+
+        `start` launches the computation and returns its future - a
+        concurrent.futures.Future (e.g. an AgentPool submission) or an
+        asyncio task; it is only called when nothing is in flight. Callers
+        must not cancel the returned future, which others may share.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                QUERIES_COALESCED.inc()
+                return future
+            future = self._calls[key] = start()
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: Hashable, future: Any):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
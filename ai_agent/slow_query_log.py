@@ -0,0 +1,132 @@
+"""
+Slow-query log for SQL executed against the feed products database
+Records statements over a time threshold with their EXPLAIN QUERY PLAN
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import (
+    SLOW_QUERY_LOG_PATH,
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_LOG_MAX_BYTES,
+    SLOW_QUERY_LOG_BACKUPS
+)
+
+
+def explain_query_plan(conn: sqlite3.Connection, query: str, params: Sequence = ()) -> List[str]:
+    """Return the EXPLAIN QUERY PLAN rows for a statement, indented by depth"""
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(plan unavailable: {e})"]
+
+    depths = {0: -1}
+    plan = []
+    for row in rows:
+        node_id, parent_id, detail = row[0], row[1], row[3]
+        depth = depths.get(parent_id, -1) + 1
+        depths[node_id] = depth
+        plan.append("  " * depth + detail)
+    return plan
+
+
+class SlowQueryLog:
+    """
+    Rotating JSON-lines log of statements slower than a threshold.
+
+    Each entry holds the SQL text, its origin (gemini, fallback or
+    endpoint), wall time, rows returned and the captured query plan.
+    """
+
+    def __init__(
+        self,
+        path: Path = SLOW_QUERY_LOG_PATH,
+        threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES,
+        backup_count: int = SLOW_QUERY_LOG_BACKUPS
+    ):
+        self.path = Path(path)
+        self.threshold_ms = threshold_ms
+        self.backup_count = backup_count
+        self._max_bytes = max_bytes
+        self._logger: Optional[logging.Logger] = None
+        self._lock = threading.Lock()
+
+    def _get_logger(self) -> logging.Logger:
+        """Create the rotating file logger on first use"""
+        with self._lock:
+            if self._logger is None:
+                logger = logging.getLogger(f"feed_agent.slow_queries.{self.path}")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(
+                    self.path, maxBytes=self._max_bytes, backupCount=self.backup_count, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+    def is_slow(self, elapsed_ms: float) -> bool:
+        return self.threshold_ms >= 0 and elapsed_ms >= self.threshold_ms
+
+    def record(
+        self,
+        conn: sqlite3.Connection,
+        query: str,
+        origin: str,
+        elapsed_ms: float,
+        row_count: int,
+        error: Optional[str] = None,
+        params: Sequence = ()
+    ) -> Dict[str, Any]:
+        """Capture the plan for a slow statement and append it to the log"""
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "origin": origin,
+            "elapsed_ms": round(elapsed_ms, 3),
+            "rows": row_count,
+            "sql": query.strip(),
+            "plan": explain_query_plan(conn, query, params),
+        }
+        if params:
+            entry["params"] = [str(p) for p in params]
+        if error:
+            entry["error"] = error
+        self._get_logger().info(json.dumps(entry, ensure_ascii=False))
+        return entry
+
+    def read(self, limit: int = 50, origin: Optional[str] = None, min_ms: float = 0.0) -> List[Dict[str, Any]]:
+        """Return the most recent entries, newest first, across rotated files"""
+        entries: List[Dict[str, Any]] = []
+        files = [self.path] + [Path(f"{self.path}.{i}") for i in range(1, self.backup_count + 1)]
+
+        for log_file in files:
+            if not log_file.exists():
+                continue
+            with open(log_file, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            for line in reversed(lines):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if origin and entry.get("origin") != origin:
+                    continue
+                if entry.get("elapsed_ms", 0.0) < min_ms:
+                    continue
+                entries.append(entry)
+                if len(entries) >= limit:
+                    return entries
+        return entries
+
+
+# Global slow-query log used by database.execute_query
+slow_query_log = SlowQueryLog()
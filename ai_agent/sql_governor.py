@@ -0,0 +1,228 @@
+"""
+SQL governor for generated queries
+Enforces read-only single statements, row caps, a time/VM-step budget and
+a full-scan limit before LLM or fallback SQL reaches the database
+"""
+
+import re
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import SQL_MAX_ROWS, SQL_TIME_BUDGET_MS, SQL_MAX_VM_STEPS, SQL_MAX_FULL_SCANS
+from database import execute_query
+from metrics import SQL_REJECTED
+from slow_query_log import explain_query_plan
+
+# Strings, quoted identifiers, comments, words and single characters
+_TOKEN = re.compile(
+    r"'(?:[^']|'')*'"
+    r'|"(?:[^"]|"")*"'
+    r"|`[^`]*`"
+    r"|\[[^\]]*\]"
+    r"|--[^\n]*"
+    r"|/\*.*?(?:\*/|$)"
+    r"|\w+"
+    r"|\S",
+    re.DOTALL
+)
+
+# Authorizer actions a read-only query may need
+_ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33),
+}
+
+# How often (in VM instructions) the progress handler checks the budget
+PROGRESS_INTERVAL = 1000
+
+
+class QueryRejected(Exception):
+    """Raised when a statement violates the governor's rules"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _tokens(sql: str) -> List[str]:
+    """Tokenize SQL, dropping comments"""
+    return [t for t in _TOKEN.findall(sql) if not t.startswith("--") and not t.startswith("/*")]
+
+
+def _read_only_authorizer(action, arg1, arg2, db_name, trigger):
+    return sqlite3.SQLITE_OK if action in _ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def count_full_scans(plan: List[str]) -> int:
+    """Count table scans in an EXPLAIN QUERY PLAN, ignoring materialized subqueries"""
+    intermediates = set()
+    for line in plan:
+        match = re.match(r"\s*(?:MATERIALIZE|CO-ROUTINE)\s+(\S+)", line)
+        if match:
+            intermediates.add(match.group(1))
+
+    scans = 0
+    for line in plan:
+        match = re.match(r"\s*SCAN\s+(\S+)", line)
+        if not match or match.group(1) == "CONSTANT":
+            continue
+        if match.group(1) in intermediates or match.group(1).startswith("("):
+            continue
+        scans += 1
+    return scans
+
+
+class SQLGovernor:
+    """
+    Guards execution of generated SQL.
+
+    Statements must be a single SELECT/WITH; a LIMIT is appended when the
+    top level has none; plans with more than the allowed number of full
+    table scans are refused; and execution is aborted once it exceeds the
+    time or VM-step budget. At most max_rows rows are fetched, unless the
+    caller grants a larger allowance for one statement.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = SQL_MAX_ROWS,
+        time_budget_ms: float = SQL_TIME_BUDGET_MS,
+        max_vm_steps: int = SQL_MAX_VM_STEPS,
+        max_full_scans: int = SQL_MAX_FULL_SCANS
+    ):
+        self.max_rows = max_rows
+        self.time_budget_ms = time_budget_ms
+        self.max_vm_steps = max_vm_steps
+        self.max_full_scans = max_full_scans
+
+    def prepare(self, sql: str, max_rows: Optional[int] = None) -> str:
+        """Validate a statement and return it with a top-level LIMIT enforced (max_rows overrides the cap)"""
+        statement = sql.strip()
+        tokens = _tokens(statement)
+        while tokens and tokens[-1] == ";":
+            tokens.pop()
+        if not tokens:
+            raise QueryRejected("empty", "No SQL statement was generated")
+        if ";" in tokens:
+            raise QueryRejected("multiple_statements", "Only a single SQL statement is allowed")
+        if tokens[0].upper() not in ("SELECT", "WITH"):
+            raise QueryRejected("not_read_only", "Only read-only SELECT queries are allowed")
+
+        # Strip trailing semicolons from the text itself
+        statement = re.sub(r"[;\s]+$", "", statement)
+
+        depth = 0
+        has_limit = False
+        for token in tokens:
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif depth == 0 and token.upper() == "LIMIT":
+                has_limit = True
+
+        if not has_limit:
+            statement = f"{statement}\nLIMIT {max_rows or self.max_rows}"
+        return statement
+
+    def check_plan(self, conn: sqlite3.Connection, sql: str) -> List[str]:
+        """Reject statements whose plan scans too many tables in full"""
+        plan = explain_query_plan(conn, sql)
+        if plan and plan[0].startswith("(plan unavailable"):
+            if "not authorized" in plan[0]:
+                raise QueryRejected("not_read_only", "Only read-only queries are allowed")
+            raise QueryRejected("invalid", plan[0].strip("()"))
+        scans = count_full_scans(plan)
+        if scans > self.max_full_scans:
+            raise QueryRejected(
+                "full_scans",
+                f"Query plan needs {scans} full table scans (max {self.max_full_scans}); add filters on indexed columns"
+            )
+        return plan
+
+    def guard(self, conn: sqlite3.Connection, sql: str) -> str:
+        """
+        Validate a statement for streaming from a dedicated connection.
+        
+        Unlike execute, the read-only authorizer and the time/VM-step budget
+        stay installed on conn for the caller's cursor, and rows are not
+        fetched here. Returns the prepared statement; raises QueryRejected.
+        """
+        conn.set_authorizer(_read_only_authorizer)
+        try:
+            statement = self.prepare(sql)
+            self.check_plan(conn, statement)
+        except QueryRejected as e:
+            conn.set_authorizer(None)
+            SQL_REJECTED.inc(e.reason)
+            raise
+        except sqlite3.DatabaseError as e:
+            conn.set_authorizer(None)
+            SQL_REJECTED.inc("not_read_only")
+            raise QueryRejected("not_read_only", f"Only read-only queries are allowed ({e})")
+
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        max_calls = max(1, self.max_vm_steps // PROGRESS_INTERVAL)
+        calls = 0
+
+        def progress():
+            nonlocal calls
+            calls += 1
+            return 1 if calls > max_calls or time.perf_counter() > deadline else 0
+
+        conn.set_progress_handler(progress, PROGRESS_INTERVAL)
+        return statement
+
+    def execute(self, conn: sqlite3.Connection, sql: str, origin: str = "gemini",
+                max_rows: Optional[int] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Run a generated statement under the governor; same contract as execute_query.
+        
+        max_rows raises the row cap for plans whose rows are reduced after
+        fetching (e.g. month series downsampled for charts); the caller is
+        then responsible for bringing the result back under the cap.
+        """
+        max_rows = max_rows or self.max_rows
+        conn.set_authorizer(_read_only_authorizer)
+        try:
+            statement = self.prepare(sql, max_rows)
+            self.check_plan(conn, statement)
+        except QueryRejected as e:
+            SQL_REJECTED.inc(e.reason)
+            return [], str(e)
+        except sqlite3.DatabaseError as e:
+            SQL_REJECTED.inc("not_read_only")
+            return [], f"Only read-only queries are allowed ({e})"
+        finally:
+            conn.set_authorizer(None)
+
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        max_calls = max(1, self.max_vm_steps // PROGRESS_INTERVAL)
+        calls = 0
+
+        def progress():
+            nonlocal calls
+            calls += 1
+            return 1 if calls > max_calls or time.perf_counter() > deadline else 0
+
+        conn.set_authorizer(_read_only_authorizer)
+        conn.set_progress_handler(progress, PROGRESS_INTERVAL)
+        try:
+            results, error = execute_query(conn, statement, origin=origin, max_rows=max_rows)
+        finally:
+            conn.set_progress_handler(None, 0)
+            conn.set_authorizer(None)
+
+        if error and "interrupted" in error:
+            reason = "vm_steps" if calls > max_calls else "time_budget"
+            SQL_REJECTED.inc(reason)
+            return [], (f"Query aborted: exceeded the {self.time_budget_ms:g} ms time budget"
+                        if reason == "time_budget" else
+                        f"Query aborted: exceeded the {self.max_vm_steps:,} VM-step budget")
+        if error and "not authorized" in error:
+            SQL_REJECTED.inc("not_read_only")
+            return [], "Only read-only queries are allowed"
+        return results, error
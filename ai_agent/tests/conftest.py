@@ -0,0 +1,38 @@
+"""
+Shared test setup for the Feed Products AI Agent
+Modules are imported flat (as main.py does) and configuration is read at
+import time, so the environment is pinned here before anything imports config:
+no Gemini, no shared cache or slow-query log, no daemon, and a scratch database
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AGENT_DIR))
+
+_SCRATCH = tempfile.mkdtemp(prefix="feed-agent-tests-")
+os.environ.update({
+    "GOOGLE_API_KEY": "",
+    "QUERY_CACHE_PATH": "",
+    "SLOW_QUERY_THRESHOLD_MS": "-1",
+    "AGENT_SOCKET_PATH": "",
+    "DATABASE_PATH": os.path.join(_SCRATCH, "feed_products.db"),
+})
+
+from database import create_schema  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """An empty database with the full schema"""
+    conn = sqlite3.connect(str(tmp_path / "feed_products.db"), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    create_schema(conn)
+    yield conn
+    conn.close()
@@ -0,0 +1,91 @@
+"""Tests for admission control: rate limits, lane queues and the 429 middleware"""
+
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from admission import AdmissionController, AdmissionMiddleware, Lane, RateLimiter, Rejected, TokenBucket
+
+
+def test_token_bucket_allows_a_burst_then_reports_the_wait():
+    bucket = TokenBucket(rate=2, burst=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(now) == pytest.approx(0.5)
+    assert bucket.take(now + 0.5) == 0.0
+
+
+def test_rate_limiter_keeps_clients_apart_and_bounded():
+    limiter = RateLimiter(rate=0.001, burst=1, max_clients=2)
+    assert limiter.check("a") == 0 and limiter.check("a") > 0
+    assert limiter.check("b") == 0
+    limiter.check("a")
+    limiter.check("c")
+    # b was seen least recently, so its bucket is the one dropped
+    assert list(limiter.buckets) == ["a", "c"]
+    assert limiter.check("b") == 0
+
+
+def test_rate_limiter_is_disabled_by_a_zero_rate():
+    limiter = RateLimiter(rate=0, burst=1)
+    assert all(limiter.check("a") == 0 for _ in range(100))
+    assert not limiter.buckets
+
+
+def test_lane_queues_then_rejects_and_recovers():
+    lane = Lane("direct", concurrency=1, queue_size=1, queue_timeout_s=0.05)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with lane.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        async def take():
+            async with lane.slot():
+                pass
+
+        queued = asyncio.create_task(take())
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as full:
+            await take()
+        with pytest.raises(Rejected) as timed_out:
+            await queued
+        release.set()
+        await holder
+        await take()
+        return full.value, timed_out.value
+
+    full, timed_out = asyncio.run(scenario())
+    assert full.reason == "queue_full" and full.retry_after >= 1
+    assert timed_out.reason == "queue_timeout"
+    assert lane.active == 0 and lane.waiting == 0
+
+
+def test_paths_map_to_lanes():
+    controller = AdmissionController()
+    assert controller.lane_for("/query") == "llm"
+    assert controller.lane_for("/products/search") == "direct"
+    assert controller.lane_for("/health") is None and controller.lane_for("/") is None
+
+
+def test_middleware_answers_429_with_retry_after():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    controller = AdmissionController()
+    controller.limiters["direct"] = RateLimiter(rate=0.1, burst=2)
+    client = TestClient(AdmissionMiddleware(app, controller))
+
+    assert [client.get("/stats").status_code for _ in range(2)] == [200, 200]
+    rejected = client.get("/stats")
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "10"
+    assert rejected.json()["lane"] == "direct"
+    assert client.get("/health").status_code == 200
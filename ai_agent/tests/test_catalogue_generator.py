@@ -0,0 +1,30 @@
+"""Tests for the synthetic catalogue used by --generate and the benchmarks"""
+
+import sqlite3
+
+from catalogue_generator import RESTRICTION_RULES, generate_catalogue
+
+
+def test_generated_catalogue_loads_its_restrictions(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "catalogue.db"))
+    stats = generate_catalogue(conn, 3000, seed=1)
+
+    assert stats["products"] == conn.execute("SELECT COUNT(*) FROM feed_products_sample").fetchone()[0] > 0
+    assert stats["restrictions"] == conn.execute("SELECT COUNT(*) FROM feed_product_restrictions").fetchone()[0]
+
+    # Every current concentrate/additive named after a rule gets at least that rule
+    keywords = {rule[0] for rule in RESTRICTION_RULES}
+    restricted = conn.execute("""
+    SELECT p.product_name FROM feed_products_sample p
+    WHERE p.is_active = 1 AND p.type IN ('Concentrate', 'Additive')
+    """).fetchall()
+    expected = sum(1 for (name,) in restricted for keyword in keywords if keyword in name.lower())
+    assert stats["restrictions"] >= expected > 0
+
+    # Columns land where bulk_insert_restrictions says they do
+    orphans, inactive = conn.execute("""
+    SELECT SUM(p.id IS NULL), SUM(r.is_active != 1) FROM feed_product_restrictions r
+    LEFT JOIN feed_products_sample p ON p.id = r.product_id
+    """).fetchone()
+    assert orphans == 0 and inactive == 0
+    conn.close()
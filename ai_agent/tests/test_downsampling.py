@@ -0,0 +1,99 @@
+"""Tests for chart downsampling and the trend intent's row handling"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from downsampling import downsample, downsample_rows, lttb, min_max, time_series_value
+
+
+def _months(count):
+    return [f"{2000 + i // 12:04d}-{i % 12 + 1:02d}" for i in range(count)]
+
+
+@pytest.mark.parametrize("count,target", [(10, 3), (100, 7), (1000, 120), (1001, 64)])
+def test_lttb_keeps_endpoints_and_target(count, target):
+    x = np.arange(count, dtype=float)
+    y = np.sin(x / 7)
+    kept = lttb(x, y, target)
+    assert len(kept) == target
+    assert kept[0] == 0 and kept[-1] == count - 1
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_lttb_returns_everything_when_short():
+    assert list(lttb(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+
+
+def test_min_max_keeps_endpoints_and_spikes():
+    y = np.ones(1000)
+    y[333], y[777] = 50.0, -50.0
+    kept = min_max(y, 20)
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 333 in kept and 777 in kept
+    assert len(kept) <= 20
+
+
+def test_downsample_skips_missing_values():
+    y = [None if i % 2 else float(i) for i in range(400)]
+    kept = downsample(_months(400), y, 50)
+    assert all(y[i] is not None for i in kept)
+    assert kept[0] == 0 and kept[-1] == 398
+
+
+def test_downsample_rows_per_series_and_total_cap():
+    months = _months(300)
+    rows = [
+        {"month": month, "supplier_country": country, "cost_currency": "USD", "avg_price": float(i % 17)}
+        for i, month in enumerate(months) for country in ("Egypt", "Qatar", "Saudi Arabia", "UAE")
+    ]
+    kept, summaries = downsample_rows(rows, 120)
+    assert len(summaries) == 4
+    assert all(s["points"] == 120 and s["original_points"] == 300 for s in summaries)
+
+    kept, summaries = downsample_rows(rows, 120, max_rows=200)
+    assert len(kept) <= 200
+    for country in ("Egypt", "Qatar", "Saudi Arabia", "UAE"):
+        series = [row["month"] for row in kept if row["supplier_country"] == country]
+        assert series[0] == months[0] and series[-1] == months[-1]
+    # Original order is kept, so the result is still a chartable month series
+    assert time_series_value(kept) == "avg_price"
+
+
+def test_time_series_value_needs_ascending_months():
+    rows = [{"month": "2024-02", "avg_price": 1.0}, {"month": "2024-01", "avg_price": 2.0}]
+    assert time_series_value(rows) is None
+    assert time_series_value(rows[::-1]) == "avg_price"
+    assert time_series_value([{"product_name": "Barley", "avg_price": 1.0}]) is None
+
+
+def test_trend_intent_keeps_the_latest_month(db):
+    """More history groups than SQL_MAX_ROWS: the newest month must survive to the chart"""
+    from agent import FeedProductsAgent
+
+    countries = (("Egypt", "EGP"), ("Qatar", "QAR"), ("Saudi Arabia", "SAR"), ("UAE", "AED"))
+    months = 160
+    rows = []
+    for m in range(months):
+        created_at = int(datetime(2010 + m // 12, m % 12 + 1, 15, tzinfo=timezone.utc).timestamp())
+        for country, currency in countries:
+            rows.append(("Barley", "BARLEY-HIST", "Concentrate", 1.0 + (m % 12) / 10, currency,
+                         "Supplier", country, created_at))
+    db.executemany(
+        "INSERT INTO feed_products_sample (product_name, product_code, type, cost_per_kg, cost_currency,"
+        " supplier, supplier_country, created_at, is_active) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)", rows
+    )
+    db.commit()
+    assert len(rows) > 500
+
+    agent = FeedProductsAgent(db_connection=db)
+    result = agent.process_query("Show the barley price trend over time")
+
+    assert result["success"], result["error"]
+    assert len(result["data"]) <= agent.governor.max_rows
+    latest = f"{2010 + (months - 1) // 12:04d}-{(months - 1) % 12 + 1:02d}"
+    for country, _ in countries:
+        series = [row["month"] for row in result["data"] if row["supplier_country"] == country]
+        assert series[0] == "2010-01"
+        assert series[-1] == latest
@@ -0,0 +1,32 @@
+"""Tests for USD-normalized prices in cross-country rankings"""
+
+from agent import FeedProductsAgent
+
+
+def _seed(db):
+    rows = [
+        # 20 EGP is about 0.65 USD, 2 AED about 0.54 USD: local prices would rank Egypt first
+        ("Barley", "Supplier A", "Egypt", 20.0, "EGP"),
+        ("Barley", "Supplier B", "UAE", 2.0, "AED"),
+        # No FX rate for XYZ, so no USD price
+        ("Barley", "Supplier C", "Nowhere", 0.01, "XYZ"),
+    ]
+    db.executemany(
+        "INSERT INTO feed_products_sample (product_name, type, supplier, supplier_country, cost_per_kg,"
+        " cost_currency, created_at, is_active) VALUES (?, 'Fodder', ?, ?, ?, ?, 1700000000, 1)", rows
+    )
+    db.commit()
+
+
+def test_cheapest_ranks_by_usd_and_skips_unconverted(db):
+    _seed(db)
+    result = FeedProductsAgent(db_connection=db).process_query("Who sells the cheapest barley?")
+    assert result["success"], result["error"]
+    assert [row["supplier"] for row in result["data"]] == ["Supplier B", "Supplier A"]
+
+
+def test_average_puts_unconverted_countries_last(db):
+    _seed(db)
+    result = FeedProductsAgent(db_connection=db).process_query("What is the average price of barley?")
+    assert result["success"], result["error"]
+    assert [row["supplier_country"] for row in result["data"]] == ["UAE", "Egypt", "Nowhere"]
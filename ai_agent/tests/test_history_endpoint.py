@@ -0,0 +1,24 @@
+"""Tests for the price history endpoint's filters"""
+
+import asyncio
+
+import api
+from agent import FeedProductsAgent
+
+
+def test_history_filters_are_bound_not_interpolated(db, monkeypatch):
+    db.executemany(
+        "INSERT INTO feed_products_sample (product_name, product_code, type, supplier_country, cost_per_kg,"
+        " cost_currency, created_at, is_active) VALUES (?, 'FP-1-HIST', 'Fodder', ?, ?, 'AED', ?, 1)",
+        [("Farmer's Mix", "UAE", 1.0, 1704067200), ("Farmer's Mix", "UAE", 1.2, 1706745600),
+         ("Farmer's Mix", "Oman", 0.9, 1704067200)]
+    )
+    db.commit()
+    monkeypatch.setattr(api, "agent", FeedProductsAgent(db_connection=db))
+
+    def history(product_name, country=None):
+        return asyncio.run(api.get_price_history(product_name, country=country, points=100, method="lttb"))
+
+    assert history("farmer's mix")["count"] == 3
+    assert [row["supplier_country"] for row in history("farmer's", country="UAE")["history"]] == ["UAE", "UAE"]
+    assert history("mix", country="x' OR '1'='1")["count"] == 0
@@ -0,0 +1,36 @@
+"""Tests for the catalogue response cache"""
+
+from starlette.requests import Request
+
+from http_cache import ResponseCache
+
+
+def _request(headers=()):
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(k.encode(), v.encode()) for k, v in headers]})
+
+
+def test_conditional_get_returns_304():
+    cache = ResponseCache()
+    first = cache.respond(_request(), "stats", "1.0", lambda: {"total": 1})
+    again = cache.respond(_request([("if-none-match", first.headers["etag"])]), "stats", "1.0", lambda: {"total": 1})
+    assert first.status_code == 200 and again.status_code == 304
+
+
+def test_entries_are_bounded_least_recently_used_first():
+    cache = ResponseCache(max_entries=3)
+    for country in ("a", "b", "c"):
+        cache.respond(_request(), f"suppliers:{country}", "1.0", lambda: {"suppliers": []})
+    cache.respond(_request(), "suppliers:a", "1.0", lambda: {"suppliers": []})
+    cache.respond(_request(), "suppliers:d", "1.0", lambda: {"suppliers": []})
+    assert len(cache) == 3
+    assert set(cache._entries) == {"suppliers:a", "suppliers:c", "suppliers:d"}
+
+
+def test_new_data_version_drops_payloads_of_the_old_one():
+    cache = ResponseCache()
+    for key in ("stats", "types", "suppliers:x"):
+        cache.respond(_request(), key, "1.0", lambda: {})
+    cache.respond(_request(), "examples", "app-1", lambda: {})
+    cache.respond(_request(), "stats", "2.0", lambda: {})
+    assert set(cache._entries) == {"stats", "examples"}
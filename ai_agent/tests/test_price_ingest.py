@@ -0,0 +1,83 @@
+"""Tests for bulk price ingestion and the group-commit writer"""
+
+import pytest
+
+from metrics import PRICE_COMMITS
+from price_ingest import GroupCommitWriter, apply_price_updates
+
+
+def _observation(product, price, observed_at, supplier="Supplier A"):
+    return {"product_name": product, "supplier": supplier, "supplier_country": "UAE",
+            "cost_per_kg": price, "cost_currency": "AED", "observed_at": observed_at}
+
+
+def _offer_rows(db, product):
+    return [tuple(row) for row in db.execute(
+        "SELECT cost_per_kg, is_active, product_code FROM feed_products_sample"
+        " WHERE product_name = ? ORDER BY created_at", (product,)
+    )]
+
+
+@pytest.fixture
+def writer(db):
+    path = db.execute("PRAGMA database_list").fetchone()[2]
+    writer = GroupCommitWriter(path, window_ms=300)
+    yield writer
+    writer.close()
+
+
+def test_new_month_rolls_the_current_price_over_to_history(db):
+    apply_price_updates(db, [[_observation("Barley", 1.0, "2024-01-15")]])
+    [summary] = apply_price_updates(db, [[_observation("Barley", 1.2, "2024-02-15")]])
+    assert summary["rolled_over"] == 1
+    assert [row[:2] for row in _offer_rows(db, "Barley")] == [(1.0, 0), (1.2, 1)]
+    changes = db.execute("SELECT old_cost_per_kg, new_cost_per_kg FROM price_changes ORDER BY id").fetchall()
+    assert [tuple(row) for row in changes] == [(None, 1.0), (1.0, 1.2)]
+
+
+def test_same_month_updates_in_place_and_late_arrivals_stay_historical(db):
+    apply_price_updates(db, [[_observation("Barley", 1.0, "2024-02-01")]])
+    [summary] = apply_price_updates(db, [[
+        _observation("Barley", 1.1, "2024-02-20"),
+        _observation("Barley", 0.9, "2024-01-10"),
+    ]])
+    assert summary["updated"] == 1 and summary["historical"] == 1
+    assert [row[:2] for row in _offer_rows(db, "Barley")] == [(0.9, 0), (1.1, 1)]
+    [summary] = apply_price_updates(db, [[_observation("Barley", 5.0, "2024-02-05")]])
+    assert summary["stale"] == 1
+    assert _offer_rows(db, "Barley")[-1][:2] == (1.1, 1)
+
+
+def test_invalid_observations_are_rejected_individually(db):
+    [summary] = apply_price_updates(db, [[_observation("Barley", 1.0, "2024-01-15"),
+                                          _observation("Oats", -1, "2024-01-15"),
+                                          {"product_name": "Hay"}]])
+    assert summary["inserted"] == 1
+    assert [r["index"] for r in summary["rejected"]] == [1, 2]
+
+
+def test_concurrent_batches_share_one_commit(db, writer):
+    commits = PRICE_COMMITS.value()
+    futures = [writer.submit([_observation(product, 1.0, "2024-01-15")]) for product in ("Barley", "Oats", "Hay")]
+    assert [future.result(timeout=10)["inserted"] for future in futures] == [1, 1, 1]
+    assert PRICE_COMMITS.value() - commits == 1
+    assert db.execute("SELECT COUNT(*) FROM feed_products_sample WHERE is_active = 1").fetchone()[0] == 3
+
+
+def test_failing_batch_does_not_fail_the_batches_grouped_with_it(db, writer):
+    db.execute("""
+    CREATE TRIGGER poison BEFORE INSERT ON feed_products_sample WHEN NEW.product_name = 'Poison'
+    BEGIN SELECT RAISE(ABORT, 'poisoned batch'); END
+    """)
+    db.commit()
+    good = writer.submit([_observation("Barley", 1.0, "2024-01-15")])
+    bad = writer.submit([_observation("Oats", 1.0, "2024-01-15"), _observation("Poison", 1.0, "2024-01-15")])
+    other = writer.submit([_observation("Hay", 1.0, "2024-01-15")])
+
+    assert good.result(timeout=10)["inserted"] == 1
+    assert other.result(timeout=10)["inserted"] == 1
+    with pytest.raises(Exception, match="poisoned batch"):
+        bad.result(timeout=10)
+    # The failing batch is rolled back as a whole
+    names = {row[0] for row in db.execute("SELECT product_name FROM feed_products_sample")}
+    assert names == {"Barley", "Hay"}
@@ -0,0 +1,89 @@
+"""Tests for the database fingerprint keying shared query results"""
+
+import os
+import sqlite3
+
+import pytest
+
+from query_cache import database_fingerprint
+
+
+def _open(path, journal_mode):
+    conn = sqlite3.connect(str(path))
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute("CREATE TABLE IF NOT EXISTS prices (id INTEGER PRIMARY KEY, price REAL)")
+    conn.commit()
+    return conn
+
+
+def _pin_mtime(*paths):
+    """Give files a fixed mtime, as a coarse clock tick or a restored copy would"""
+    for path in paths:
+        if os.path.exists(path):
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+
+def test_in_memory_databases_have_no_fingerprint():
+    assert database_fingerprint(sqlite3.connect(":memory:")) is None
+
+
+def test_same_size_update_in_the_same_tick_changes_fingerprint(tmp_path):
+    path = tmp_path / "db.sqlite"
+    conn = _open(path, "DELETE")
+    conn.execute("INSERT INTO prices VALUES (1, 1.0)")
+    conn.commit()
+    _pin_mtime(path)
+    before = database_fingerprint(conn)
+
+    conn.execute("UPDATE prices SET price = 2.0")
+    conn.commit()
+    _pin_mtime(path)
+    assert os.path.getsize(path) == int(before.split(":")[2])
+    assert database_fingerprint(conn) != before
+
+
+@pytest.mark.parametrize("checkpoint", ["PASSIVE", "RESTART", "TRUNCATE"])
+def test_wal_commits_across_checkpoints_change_fingerprint(tmp_path, checkpoint):
+    path = tmp_path / "db.sqlite"
+    wal = f"{path}-wal"
+    conn = _open(path, "WAL")
+    seen = set()
+    for i in range(6):
+        conn.execute("INSERT OR REPLACE INTO prices VALUES (1, ?)", (float(i),))
+        conn.commit()
+        _pin_mtime(path, wal)
+        fingerprint = database_fingerprint(conn)
+        assert fingerprint not in seen, f"commit {i} looked like an earlier state"
+        seen.add(fingerprint)
+        # The WAL is reset (same size, new salts) or truncated before the next commit
+        conn.execute(f"PRAGMA wal_checkpoint({checkpoint})")
+
+
+def test_restart_with_unchanged_files_keeps_fingerprint(tmp_path):
+    path = tmp_path / "db.sqlite"
+    conn = _open(path, "DELETE")
+    conn.execute("INSERT INTO prices VALUES (1, 1.0)")
+    conn.commit()
+    before = database_fingerprint(conn)
+    conn.close()
+    assert database_fingerprint(sqlite3.connect(str(path))) == before
+
+
+def test_replaced_file_with_same_size_and_mtime_changes_fingerprint(tmp_path):
+    path = tmp_path / "db.sqlite"
+    conn = _open(path, "DELETE")
+    conn.execute("INSERT INTO prices VALUES (1, 1.0)")
+    conn.commit()
+    conn.close()
+    _pin_mtime(path)
+    before = database_fingerprint(sqlite3.connect(str(path)))
+
+    # Restore an older copy over it (same size, same mtime, different content)
+    restored = tmp_path / "restored.sqlite"
+    other = _open(restored, "DELETE")
+    other.execute("INSERT INTO prices VALUES (1, 9.0)")
+    other.commit()
+    other.close()
+    os.replace(restored, path)
+    _pin_mtime(path)
+    assert database_fingerprint(sqlite3.connect(str(path))) != before
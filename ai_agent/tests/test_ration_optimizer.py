@@ -0,0 +1,49 @@
+"""Tests for the per-country feed matrix cache behind the ration endpoints"""
+
+import pytest
+
+from ration_optimizer import SCIPY_AVAILABLE, RationOptimizer
+
+
+@pytest.fixture
+def catalogue(db):
+    db.executemany(
+        "INSERT INTO feed_products_sample (product_name, type, supplier_country, cost_per_kg, cost_currency,"
+        " created_at, is_active) VALUES (?, ?, ?, ?, 'USD', 1700000000, 1)",
+        [("Barley", "Concentrate", "UAE", 0.3), ("Alfalfa Hay", "Fodder", "UAE", 0.25),
+         ("Barley", "Concentrate", "Oman", 0.28)]
+    )
+    db.commit()
+    return db
+
+
+def test_countries_share_a_matrix_whatever_their_case(catalogue):
+    optimizer = RationOptimizer()
+    matrix = optimizer.matrix(catalogue, "uae ")
+    assert matrix is optimizer.matrix(catalogue, "UAE")
+    assert matrix.country == "UAE" and matrix.names == ["Alfalfa Hay", "Barley"]
+
+
+def test_unknown_countries_are_not_cached(catalogue):
+    optimizer = RationOptimizer()
+    optimizer.matrix(catalogue)
+    for i in range(50):
+        assert optimizer.matrix(catalogue, f"Atlantis {i}").names == []
+    assert set(optimizer._matrices) == {None}
+
+
+@pytest.mark.skipif(not SCIPY_AVAILABLE, reason="ration optimizer requires scipy")
+def test_unknown_country_solves_as_infeasible(catalogue):
+    result = RationOptimizer().matrix(catalogue, "Atlantis").solve({"species": "cattle"})
+    assert result["feasible"] is False and result["country"] == "Atlantis"
+
+
+def test_new_data_version_refreshes_the_known_countries(catalogue):
+    optimizer = RationOptimizer()
+    assert optimizer.matrix(catalogue, "Qatar").names == []
+    catalogue.execute(
+        "INSERT INTO feed_products_sample (product_name, type, supplier_country, cost_per_kg, cost_currency,"
+        " created_at, is_active) VALUES ('Barley', 'Concentrate', 'Qatar', 0.31, 'USD', 1700000000, 1)"
+    )
+    catalogue.commit()
+    assert optimizer.matrix(catalogue, "qatar").names == ["Barley"]
@@ -0,0 +1,79 @@
+"""Tests that the eligibility index and the ration optimizer apply the same restrictions"""
+
+import itertools
+import random
+
+import pytest
+
+from eligibility_index import (
+    PROFILE_DIMENSIONS, RULE_COLUMNS, EligibilitySnapshot, _bits, restriction_applies
+)
+from ration_optimizer import SCIPY_AVAILABLE, FeedMatrix
+
+VALUES = {
+    "species": ["cattle", "Cattle", "sheep", "goat"],
+    "sex": ["female", "male"],
+    "breeding_cycle": ["early", "late"],
+    "lactation_cycle": ["early", "mid", "late"],
+    "production_focus": ["dairy", "beef", "MEAT"],
+}
+
+
+def _random_rules(rng, count):
+    rules = []
+    for i in range(count):
+        values = [rng.choice([None, None, "", *VALUES[d]]) for d in PROFILE_DIMENSIONS]
+        low = rng.choice([None, 0, 6, 12, 24])
+        high = rng.choice([None, 12, 24, 36]) if low is None or low < 12 else rng.choice([None, 36])
+        rules.append((f"Feed {i % 12}", *values, low, high, rng.choice([0, 1, 1]),
+                      rng.choice([None, 10.0, 30.0]), rng.choice([None, 50.0])))
+    return rules
+
+
+def test_index_matches_exactly_the_rules_restriction_applies_accepts():
+    rng = random.Random(7)
+    rules = _random_rules(rng, 80)
+    # In catalogue_snapshot.RESULT_FIELDS order
+    offers = [(f"Feed {j}", "Fodder", "Supplier", "UAE", 1.0, "AED", 0.27, None, None) for j in range(12)]
+    snapshot = EligibilitySnapshot(rules, offers)
+
+    profiles = [
+        {"species": species, "sex": sex, "breeding_cycle": breeding, "lactation_cycle": lactation,
+         "production_focus": focus, "age_months": age}
+        for species, sex, breeding, lactation, focus, age in itertools.product(
+            ["cattle", "CATTLE ", "sheep", None], ["female", None], ["early", "Late", None],
+            ["mid", None], ["dairy", "meat", None], [None, 0, 6, 12, 18, 36, 40]
+        )
+    ]
+    for profile in profiles:
+        indexed = {snapshot.rules[i] for i in _bits(snapshot.matching_rules(profile))}
+        applied = {rule for rule in snapshot.rules if restriction_applies(dict(zip(RULE_COLUMNS, rule)), profile)}
+        assert indexed == applied, profile
+
+
+def test_restriction_applies_normalizes_case_and_honours_breeding_cycle():
+    rule = dict(zip(RULE_COLUMNS, ("Barley", "Cattle", None, "early", None, "Dairy", 6, 24, 1, 30.0, None)))
+    assert restriction_applies(rule, {"species": "cattle", "breeding_cycle": "EARLY",
+                                      "production_focus": "dairy", "age_months": 6})
+    assert not restriction_applies(rule, {"species": "cattle", "breeding_cycle": "late",
+                                          "production_focus": "dairy", "age_months": 12})
+    assert not restriction_applies(rule, {"species": "cattle", "production_focus": "dairy", "age_months": 12})
+    assert not restriction_applies(rule, {"species": "cattle", "breeding_cycle": "early", "production_focus": "dairy"})
+
+
+@pytest.mark.skipif(not SCIPY_AVAILABLE, reason="ration optimizer requires scipy")
+def test_ration_applies_restrictions_case_insensitively(db):
+    db.execute(
+        "INSERT INTO feed_products_sample (product_name, type, cost_per_kg, cost_currency, supplier_country,"
+        " created_at, is_active) VALUES ('Barley', 'Concentrate', 1.0, 'USD', 'UAE', 1700000000, 1)"
+    )
+    product_id = db.execute("SELECT id FROM feed_products_sample").fetchone()[0]
+    db.execute(
+        "INSERT INTO feed_product_restrictions (product_id, species, breeding_cycle, max_perc_feed, is_eligible,"
+        " is_active) VALUES (?, 'Cattle', 'Early', 25, 1, 1)", (product_id,)
+    )
+    db.commit()
+    matrix = FeedMatrix(db)
+    applied = matrix.solve({"species": "cattle", "breeding_cycle": "early"})["applied_restrictions"]
+    assert [r["product_name"] for r in applied] == ["Barley"]
+    assert matrix.solve({"species": "cattle", "breeding_cycle": "late"})["applied_restrictions"] == []
@@ -0,0 +1,72 @@
+"""Tests that set-based restriction loading matches running the seed INSERTs one by one"""
+
+import re
+
+import pytest
+
+from database import (
+    DB_DIR, SEED_FILES, SEED_RESTRICTION_DEFAULTS, load_restrictions, load_seed_data_simple, parse_seed_restrictions
+)
+
+STATEMENT = re.compile(r"INSERT INTO public\.feed_product_restrictions.*?;", re.DOTALL)
+ROW_SQL = f"SELECT product_id, {', '.join(SEED_RESTRICTION_DEFAULTS)} FROM feed_product_restrictions"
+
+
+def _statements(content, keep_limit=True):
+    """The seed's own restriction INSERTs, in SQLite's dialect"""
+    for statement in STATEMENT.findall(content):
+        statement = statement.replace("public.", "")
+        yield statement if keep_limit else re.sub(r"\s+LIMIT\s+\d+\s*;", ";", statement)
+
+
+def _rows(conn):
+    return sorted(tuple(row) for row in conn.execute(ROW_SQL))
+
+
+@pytest.fixture
+def seeded(db):
+    load_seed_data_simple(db)
+    return db
+
+
+def test_shipped_seed_loads_the_same_rows_as_one_insert_per_statement(seeded):
+    inserted = load_restrictions(seeded)
+    loaded = _rows(seeded)
+    seeded.execute("DELETE FROM feed_product_restrictions")
+    for name in SEED_FILES:
+        for statement in _statements((DB_DIR / name).read_text(encoding="utf-8")):
+            seeded.execute(statement)
+    assert inserted == len(loaded) > 0
+    assert loaded == _rows(seeded)
+
+
+def test_rules_cover_every_matching_product(db, tmp_path, monkeypatch):
+    db.executemany(
+        "INSERT INTO feed_products_sample (product_name, product_code, type, supplier_country, created_at, is_active)"
+        " VALUES (?, ?, 'Concentrate', ?, ?, ?)",
+        [("Barley", "FP-1", "UAE", 1700000000, 0), ("Barley", "FP-1", "UAE", 1710000000, 1),
+         ("Barley", "FP-1", "Oman", 1710000000, 1), ("Urea", "FP-2", "UAE", 1710000000, 1)]
+    )
+    content = """
+    INSERT INTO public.feed_product_restrictions (product_id, species, min_age_months, max_perc_feed, is_eligible)
+    SELECT id, 'cattle', 12, 1.0, false FROM public.feed_products_sample WHERE product_code = 'FP-2' LIMIT 1;
+    INSERT INTO public.feed_product_restrictions (product_id, species, max_perc_feed)
+    SELECT id, 'sheep', 20.0 FROM public.feed_products_sample
+    WHERE product_code = 'FP-1' AND supplier_country = 'UAE' LIMIT 1;
+    """
+    (tmp_path / SEED_FILES[0]).write_text(content, encoding="utf-8")
+    monkeypatch.setattr("database.DB_DIR", tmp_path)
+
+    assert load_restrictions(db) == 3
+    loaded = _rows(db)
+    db.execute("DELETE FROM feed_product_restrictions")
+    for statement in _statements(content, keep_limit=False):
+        db.execute(statement)
+    assert loaded == _rows(db)
+
+
+def test_extended_seed_parses_without_skipping(capsys):
+    content = (DB_DIR / "seed_data_market_products_extended.sql").read_text(encoding="utf-8")
+    rules = parse_seed_restrictions(content)
+    assert len(rules) == len(STATEMENT.findall(content)) > 0
+    assert "skipping" not in capsys.readouterr().out
@@ -0,0 +1,97 @@
+"""Tests for coalescing identical in-flight queries"""
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from metrics import QUERIES_COALESCED
+from single_flight import SingleFlight, query_key
+
+
+def test_callers_share_the_computation_in_flight():
+    flight = SingleFlight()
+    pending = Future()
+    starts = []
+
+    def start():
+        starts.append(1)
+        return pending
+
+    coalesced = QUERIES_COALESCED.value()
+    futures = [flight.submit("barley", start) for _ in range(3)]
+    assert starts == [1] and all(f is pending for f in futures)
+    assert QUERIES_COALESCED.value() - coalesced == 2
+    assert flight.in_flight() == 1
+
+    pending.set_result("answer")
+    assert flight.in_flight() == 0
+    # Finished work is not reused
+    assert flight.submit("barley", Future) is not pending
+
+
+def test_failed_and_cancelled_computations_are_forgotten():
+    flight = SingleFlight()
+    failing = flight.submit("a", Future)
+    failing.set_exception(RuntimeError("gemini down"))
+    cancelled = flight.submit("b", Future)
+    cancelled.cancel()
+    assert flight.in_flight() == 0
+
+    done = Future()
+    done.set_result(1)
+    assert flight.submit("c", lambda: done) is done
+    assert flight.in_flight() == 0
+
+
+def test_start_failure_leaves_nothing_in_flight():
+    flight = SingleFlight()
+
+    def start():
+        raise RuntimeError("pool closed")
+
+    with pytest.raises(RuntimeError):
+        flight.submit("a", start)
+    assert flight.in_flight() == 0
+
+
+def test_threads_coalesce_onto_one_pool_submission():
+    flight = SingleFlight()
+    gate = Future()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return gate.result(timeout=10)
+
+    with ThreadPoolExecutor(max_workers=1) as pool, ThreadPoolExecutor(max_workers=8) as callers:
+        futures = list(callers.map(lambda _: flight.submit("q", lambda: pool.submit(compute)), range(8)))
+        gate.set_result("rows")
+        assert [future.result(timeout=10) for future in futures] == ["rows"] * 8
+    assert len({id(future) for future in futures}) == 1
+    assert calls == [1] and flight.in_flight() == 0
+
+
+def test_asyncio_tasks_are_shared_too():
+    async def scenario():
+        flight = SingleFlight()
+        runs = []
+
+        async def compute():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "rows"
+
+        tasks = [flight.submit("q", lambda: asyncio.ensure_future(compute())) for _ in range(5)]
+        results = await asyncio.gather(*tasks)
+        await asyncio.sleep(0)
+        return runs, results, flight.in_flight()
+
+    runs, results, in_flight = asyncio.run(scenario())
+    assert runs == [1] and results == ["rows"] * 5 and in_flight == 0
+
+
+def test_query_key_ignores_case_and_whitespace_but_not_language():
+    assert query_key("  Cheapest   BARLEY?\n") == query_key("cheapest barley?")
+    assert query_key("cheapest barley?")[0] == "cheapest barley?"
+    assert query_key("ما هو أرخص شعير؟")[1] != query_key("cheapest barley?")[1]
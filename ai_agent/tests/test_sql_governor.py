@@ -0,0 +1,133 @@
+"""Tests for the SQL governor guarding generated statements"""
+
+import pytest
+
+from sql_governor import QueryRejected, SQLGovernor, _tokens, count_full_scans
+
+
+@pytest.fixture
+def governor():
+    return SQLGovernor(max_rows=5, time_budget_ms=2000, max_vm_steps=50_000_000, max_full_scans=1)
+
+
+@pytest.fixture
+def products(db):
+    db.executemany(
+        "INSERT INTO feed_products_sample (product_name, type, cost_per_kg, cost_currency, is_active)"
+        " VALUES (?, 'Fodder', ?, 'USD', 1)",
+        [(f"Feed {i}", float(i)) for i in range(20)]
+    )
+    db.commit()
+    return db
+
+
+def test_tokenizer_keeps_strings_whole_and_drops_comments():
+    tokens = _tokens("SELECT 'a;b', \"x y\" -- LIMIT 1; DROP\n/* ; */ FROM t")
+    assert tokens == ["SELECT", "'a;b'", ",", '"x y"', "FROM", "t"]
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM t",
+    "SELECT * FROM t WHERE name = 'LIMIT 3'",
+    "SELECT * FROM (SELECT * FROM t LIMIT 3)",
+    "SELECT * FROM t -- LIMIT 3",
+    "WITH x AS (SELECT 1 LIMIT 2) SELECT * FROM x",
+])
+def test_limit_is_appended_when_the_top_level_has_none(governor, sql):
+    assert governor.prepare(sql).endswith("\nLIMIT 5")
+
+
+@pytest.mark.parametrize("sql", ["SELECT * FROM t LIMIT 3", "SELECT * FROM t limit 3;;", "SELECT * FROM t LIMIT 3 OFFSET 2"])
+def test_existing_top_level_limit_is_kept(governor, sql):
+    prepared = governor.prepare(sql)
+    assert "LIMIT 5" not in prepared and not prepared.endswith(";")
+
+
+def test_row_allowance_overrides_the_cap(governor):
+    assert governor.prepare("SELECT * FROM t", max_rows=100).endswith("\nLIMIT 100")
+
+
+@pytest.mark.parametrize("sql,reason", [
+    ("", "empty"),
+    (";", "empty"),
+    ("SELECT 1; SELECT 2", "multiple_statements"),
+    ("SELECT 1; DROP TABLE t", "multiple_statements"),
+    ("DELETE FROM t", "not_read_only"),
+    ("PRAGMA writable_schema = 1", "not_read_only"),
+])
+def test_prepare_rejects(governor, sql, reason):
+    with pytest.raises(QueryRejected) as rejected:
+        governor.prepare(sql)
+    assert rejected.value.reason == reason
+
+
+def test_semicolon_inside_a_string_is_not_a_second_statement(governor):
+    assert governor.prepare("SELECT ';' AS x").startswith("SELECT ';' AS x")
+
+
+def test_execute_caps_rows(governor, products):
+    rows, error = governor.execute(products, "SELECT product_name FROM feed_products_sample WHERE is_active = 1")
+    assert error is None and len(rows) == 5
+    rows, error = governor.execute(products, "SELECT product_name FROM feed_products_sample WHERE is_active = 1",
+                                   max_rows=15)
+    assert error is None and len(rows) == 15
+
+
+def test_authorizer_denies_what_the_tokenizer_lets_through(governor, products):
+    # Starts with WITH, so only the authorizer stands between it and the table
+    rows, error = governor.execute(products, "WITH x AS (SELECT 1) DELETE FROM feed_products_sample")
+    assert rows == [] and "read-only" in error
+    rows, error = governor.execute(products, "SELECT * FROM pragma_table_info('feed_products_sample')")
+    assert rows == [] and "read-only" in error
+    assert products.execute("SELECT COUNT(*) FROM feed_products_sample").fetchone()[0] == 20
+
+
+def test_guard_rejects_writes_and_leaves_the_connection_usable(governor, products):
+    with pytest.raises(QueryRejected) as rejected:
+        governor.guard(products, "WITH x AS (SELECT 1) DELETE FROM feed_products_sample")
+    assert rejected.value.reason == "not_read_only"
+    products.execute("UPDATE feed_products_sample SET cost_per_kg = cost_per_kg WHERE id = 1")
+    products.rollback()
+
+
+def test_authorizer_is_removed_after_execute(governor, products):
+    governor.execute(products, "SELECT 1")
+    products.execute("UPDATE feed_products_sample SET cost_per_kg = cost_per_kg WHERE id = 1")
+    products.rollback()
+
+
+def test_full_scan_limit(governor, products):
+    rows, error = governor.execute(
+        products,
+        "SELECT a.product_name FROM feed_products_sample a, feed_product_restrictions b"
+    )
+    assert rows == [] and "full table scans" in error
+
+
+def test_vm_step_budget_aborts_runaway_queries(products):
+    governor = SQLGovernor(max_rows=5, time_budget_ms=60_000, max_vm_steps=10_000, max_full_scans=1)
+    rows, error = governor.execute(
+        products,
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+    )
+    assert rows == [] and "VM-step budget" in error
+
+
+def test_time_budget_aborts_slow_queries(products):
+    governor = SQLGovernor(max_rows=5, time_budget_ms=50, max_vm_steps=10**12, max_full_scans=1)
+    rows, error = governor.execute(
+        products,
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+    )
+    assert rows == [] and "time budget" in error
+
+
+def test_count_full_scans_ignores_materialized_subqueries():
+    plan = [
+        "MATERIALIZE sub",
+        "  SCAN feed_products_sample",
+        "SCAN sub",
+        "SEARCH feed_product_restrictions USING INDEX idx_restrictions_product (product_id=?)",
+        "SCAN CONSTANT ROW",
+    ]
+    assert count_full_scans(plan) == 1